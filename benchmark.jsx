@@ -0,0 +1,291 @@
+import React from 'react';
+import { flushSync } from 'react-dom';
+import { createRoot } from 'react-dom/client';
+
+// --- Benchmark reproducible (modo coach), cargado con import() ---
+// Generador con semilla: mismas auditorías en cada ejecución
+const BENCHMARK_SIZES = [1000, 10000, 100000];
+const BENCHMARK_SEED = 20240501;
+const BENCHMARK_TRADERS = 40;
+const BENCHMARK_SEARCH_QUERY = 'venganza miedo';
+
+const createSeededRandom = (seed) => {
+  let state = seed >>> 0;
+  return () => {
+    state = (state + 0x6d2b79f5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+};
+
+const BENCHMARK_ESTADOS = ['🟢 Vagal Ventral (Calma Activa)', '🟡 Simpático (Lucha/Caza)', '🔴 Dorsal Vagal (Parálisis)'];
+const BENCHMARK_ESTADOS_FINAL = ['🟢 Vagal (Calma/Regulación)', '🟡 Simpático (Activado/Ansioso)', '🔴 Dorsal (Agotado/Colapsado)'];
+const BENCHMARK_CREENCIAS = ['Soy paciente y espero mi setup perfecto', 'Confío en mi sistema y en mi criterio', 'Las pérdidas son información, no fracasos'];
+const BENCHMARK_PROTOCOLOS = ['🫁 Respiración 4-7-8 (3 minutos)', '🚶 Caminata consciente', '❌ Ninguna (omití el cierre)'];
+const BENCHMARK_FRASES = [
+  'Entré por venganza después del primer stop y doblé el tamaño.',
+  'Sesión tranquila, esperé mi setup y respeté el plan.',
+  'Sentí miedo a perder y cerré las operaciones antes de tiempo.',
+  'Sobreoperé en la apertura por ansiedad.',
+  'Revenge trading tras la noticia, lo vi venir y no paré.',
+  'Buena lectura del volumen, paciencia en las entradas.',
+  'Me costó aceptar la pérdida; la respiración me ayudó a volver.',
+  'Operé cansado y sin foco, demasiadas entradas fuera del plan.'
+];
+const BENCHMARK_SENSACIONES = ['Tensión en el pecho', 'Calor en la cara', 'Hombros relajados', 'Nudo en el estómago', ''];
+
+const toTimestampLike = (date) => ({ seconds: Math.floor(date.getTime() / 1000), nanoseconds: 0 });
+
+const averageJsonBytes = (items) => Math.round(items.reduce((total, item) => total + JSON.stringify(item).length, 0) / Math.max(items.length, 1));
+
+const summarizeTimings = (samples) => {
+  const sorted = samples.slice().sort((a, b) => a - b);
+  const round = (ms) => Math.round(ms * 1000) / 1000;
+  return {
+    runs: sorted.length,
+    medianMs: round(sorted[Math.floor(sorted.length / 2)]),
+    minMs: round(sorted[0]),
+    maxMs: round(sorted[sorted.length - 1])
+  };
+};
+
+const timeRuns = (runs, fn) => {
+  const samples = [];
+  let result;
+  for (let i = 0; i < runs; i++) {
+    const t0 = performance.now();
+    result = fn();
+    samples.push(performance.now() - t0);
+  }
+  return { timing: summarizeTimings(samples), result };
+};
+
+export const createBenchmarkSuite = (app) => {
+  const {
+    MS_PER_DAY,
+    AUDITS_PAGE_SIZE,
+    EMPTY_LIST,
+    EMPTY_AUDIT_STORE,
+    EMPTY_OVERLAYS,
+    EMPTY_ANALYTICS,
+    createInitialFormState,
+    normalizeTraderName,
+    pad2,
+    formatDayKey,
+    dayNumberFromKey,
+    buildAuditSummary,
+    normalizeAudit,
+    applyAuditChanges,
+    selectDayRange,
+    buildSeriesView,
+    queryTraderHeatmap,
+    createRollingState,
+    updateRollingState,
+    createAttributionColumns,
+    updateAttributionColumns,
+    analyzeAttribution,
+    applyTraderChanges,
+    createSearchIndex,
+    indexSearchRecord,
+    searchAuditIndex,
+    estimateRecordBytes,
+    loadRecharts,
+    EvolutionChart,
+    AuditHistoryTable,
+    ReprogrammingHistoryTable,
+    TemporalHeatmap,
+    AttributionPanel
+  } = app;
+
+  // Ingesta como en la app: snapshot de Firestore → registro normalizado
+  const toAuditRecord = (snap) => normalizeAudit(snap.id, snap.data({ serverTimestamps: 'estimate' }));
+
+  const toAuditChanges = (docs, type = 'added') => docs.map(snap => ({ type, record: toAuditRecord(snap) }));
+
+  // Historias de varios años con la mezcla de formatos de producción
+  const generateSyntheticAudits = (count, seed = BENCHMARK_SEED, traderCount = BENCHMARK_TRADERS) => {
+    const random = createSeededRandom(seed);
+    const pick = (list) => list[Math.floor(random() * list.length)];
+    const int = (min, max) => min + Math.floor(random() * (max - min + 1));
+    const start = new Date(2021, 0, 4).getTime();
+    const spanDays = 4 * 365;
+    const audits = new Array(count);
+    for (let i = 0; i < count; i++) {
+      const trader = `Trader ${String(i % traderCount).padStart(3, '0')}`;
+      const session = new Date(start + int(0, spanDays) * MS_PER_DAY);
+      session.setHours(int(7, 17), pick([0, 15, 30, 45]));
+      const total = int(0, 12);
+      const enPlan = int(0, total);
+      const data = {
+        ...createInitialFormState(),
+        nombreTrader: trader,
+        energiaMetabolica: int(1, 10),
+        ritualCoherencia: pick(['Sí', 'No']),
+        revisadoPlan: pick(['Sí', 'Sí', 'No']),
+        estadoSistemaNervioso: pick(BENCHMARK_ESTADOS),
+        indiceCoherenciaIC: int(20, 100),
+        nivelPresencia: int(1, 10),
+        numEntradasTotales: total,
+        numEntradasPlan: enPlan,
+        numEntradasFueraPlan: total - enPlan,
+        pnlDia: Math.round((random() - 0.45) * 2000),
+        respetoStopTP: int(1, 10),
+        estadoSistemaNerviosoFinal: pick(BENCHMARK_ESTADOS_FINAL),
+        anclajeIdentidad: int(1, 10),
+        creenciasInstaladas: BENCHMARK_CREENCIAS.filter(() => random() < 0.4),
+        protocoloReactivacionVagal: pick(BENCHMARK_PROTOCOLOS),
+        compromisoManana: random() < 0.5 ? 'Respetar el stop' : '',
+        detallesSesion: BENCHMARK_FRASES.filter(() => random() < 0.3).join(' '),
+        reescrituraNarrativa: random() < 0.4 ? pick(BENCHMARK_FRASES) : '',
+        aprendizajeMentor: random() < 0.2 ? pick(BENCHMARK_FRASES) : '',
+        sensacionCorporal: pick(BENCHMARK_SENSACIONES)
+      };
+      const legacy = random();
+      if (legacy < 0.7) {
+        data.nombreTraderKey = normalizeTraderName(trader);
+        data.fechaAuditoria = formatDayKey(session);
+        data.horaInicioSesion = `${pad2(session.getHours())}:${pad2(session.getMinutes())}`;
+        data.timestampSesion = toTimestampLike(session);
+        data.createdAt = toTimestampLike(new Date(session.getTime() + 8 * 3600000));
+        data.fechaLocal = session.toLocaleDateString();
+      } else {
+        delete data.fechaAuditoria;
+        if (legacy < 0.8) data.timestampSesion = toTimestampLike(session);
+        else if (legacy < 0.9) data.createdAt = toTimestampLike(session);
+        else data.fechaLocal = session.toLocaleDateString();
+      }
+      audits[i] = { id: `bench-${seed}-${i}`, data };
+    }
+    return audits;
+  };
+
+  // Las vistas se suscriben a los resúmenes, así que el snapshot simulado también trae resúmenes
+  const toBenchmarkSnapshotDocs = (audits) => audits.map(({ id, data }) => {
+    const summary = buildAuditSummary(data);
+    return { id, data: () => summary };
+  });
+
+  // Render síncrono fuera de pantalla, incluido el commit al DOM
+  const timeAnalyticsRender = async (runs, props) => {
+    const container = document.createElement('div');
+    container.style.cssText = 'position:fixed;left:-10000px;top:0;width:1152px;';
+    document.body.appendChild(container);
+    const root = createRoot(container);
+    const views = (
+      <React.Fragment>
+        <EvolutionChart series={props.series} overlays={EMPTY_OVERLAYS} coverage={EMPTY_ANALYTICS.coverage} selectedOverlays={EMPTY_LIST} onOverlaysChange={() => {}} onWidthChange={() => {}} />
+        <AuditHistoryTable audits={props.recentFirstAudits} coverage={EMPTY_ANALYTICS.coverage} onOpenDetail={() => {}} />
+        <ReprogrammingHistoryTable audits={props.recentFirstAudits} onOpenDetail={() => {}} />
+        <TemporalHeatmap heatmapData={props.heatmapData} coverage={EMPTY_ANALYTICS.coverage} filterActive={true} onConfigChange={() => {}} />
+        <AttributionPanel attribution={props.attribution} coverage={EMPTY_ANALYTICS.coverage} />
+      </React.Fragment>
+    );
+    try {
+      // Calentamiento: resuelve los componentes diferidos para medir el render, no la descarga del chunk
+      await loadRecharts();
+      flushSync(() => root.render(views));
+      await new Promise(resolve => setTimeout(resolve, 0));
+      flushSync(() => root.render(null));
+      return timeRuns(runs, () => {
+        flushSync(() => root.render(views));
+        flushSync(() => root.render(null));
+      }).timing;
+    } finally {
+      root.unmount();
+      container.remove();
+    }
+  };
+
+  // Mide cada etapa del pipeline de App con los mismos helpers que usa la aplicación.
+  const runBenchmarkSuite = async ({ sizes = BENCHMARK_SIZES, seed = BENCHMARK_SEED, onProgress } = {}) => {
+    const results = [];
+    for (const size of sizes) {
+      if (onProgress) onProgress(size);
+      await new Promise(resolve => setTimeout(resolve, 0)); // deja pintar el progreso entre tamaños
+      const runs = size >= 100000 ? 3 : 5;
+      const audits = generateSyntheticAudits(size, seed);
+      const docs = toBenchmarkSnapshotDocs(audits);
+
+      const ingest = timeRuns(runs, () => applyAuditChanges(EMPTY_AUDIT_STORE, toAuditChanges(docs)));
+      const store = ingest.result;
+      const liveDocs = docs.slice(0, AUDITS_PAGE_SIZE);
+      const liveUpdate = timeRuns(runs, () => applyAuditChanges(store, toAuditChanges(liveDocs, 'modified')));
+
+      // Trader con más historial y el último trimestre de su rango como filtro
+      let traderKey = null;
+      store.byTrader.forEach((list, key) => {
+        if (!traderKey || list.length > store.byTrader.get(traderKey).length) traderKey = key;
+      });
+      const traderAudits = store.byTrader.get(traderKey);
+      const endDate = traderAudits[traderAudits.length - 1].dayKey;
+      const startDate = formatDayKey(new Date(dayNumberFromKey(endDate) * MS_PER_DAY - 90 * MS_PER_DAY));
+
+      const filtered = timeRuns(runs, () => selectDayRange(traderAudits, startDate, endDate));
+      // Mismo trabajo que hace el worker por resultado (con LTTB al ancho del contenedor de render)
+      const chart = timeRuns(runs, () => buildSeriesView(filtered.result, startDate, endDate, 1152));
+      const heatmap = timeRuns(runs, () => queryTraderHeatmap(store.heatmaps.get(traderKey), traderAudits, startDate, endDate));
+      // Columnas de métricas móviles del historial completo del trader
+      const rolling = timeRuns(runs, () => updateRollingState(createRollingState(), traderAudits));
+      // Columnas de atribución y análisis sobre todos los registros (peor caso: el rango abarca el histórico)
+      const allAudits = Array.from(store.byId.values());
+      const attributionColumns = timeRuns(runs, () => updateAttributionColumns(createAttributionColumns(), allAudits));
+      const attribution = timeRuns(runs, () => analyzeAttribution(attributionColumns.result, 0, allAudits.length));
+      const traderChanges = Array.from(store.byTrader.keys(), key => ({
+        type: 'added',
+        doc: { id: key, data: () => ({ nombreTrader: store.byTrader.get(key)[0].nombreTrader }) }
+      }));
+      const traders = timeRuns(runs, () => applyTraderChanges(EMPTY_LIST, traderChanges));
+      // El índice de texto se alimenta de documentos completos (candidatos de búsqueda)
+      const records = audits.map(({ id, data }) => normalizeAudit(id, data));
+      const searchIndex = timeRuns(runs, () => {
+        const index = createSearchIndex();
+        records.forEach(record => indexSearchRecord(index, record));
+        return index;
+      });
+      const search = timeRuns(runs, () => searchAuditIndex(searchIndex.result, { query: BENCHMARK_SEARCH_QUERY, startDate, endDate }));
+      const traderSearch = timeRuns(runs, () => searchAuditIndex(searchIndex.result, { query: BENCHMARK_SEARCH_QUERY, traderKey }));
+      const render = await timeAnalyticsRender(runs, {
+        series: chart.result,
+        recentFirstAudits: filtered.result.slice().reverse(),
+        heatmapData: heatmap.result,
+        attribution: attribution.result
+      });
+
+      results.push({
+        size,
+        traders: store.byTrader.size,
+        selectedTraderRecords: traderAudits.length,
+        filteredRecords: filtered.result.length,
+        selectedTraderCacheBytes: traderAudits.reduce((total, record) => total + estimateRecordBytes(record), 0),
+        avgDocumentBytes: averageJsonBytes(audits.slice(0, 1000).map(audit => audit.data)),
+        avgSummaryBytes: averageJsonBytes(docs.slice(0, 1000).map(snap => snap.data())),
+        metrics: {
+          snapshotIngest: ingest.timing,
+          liveUpdate: liveUpdate.timing,
+          filteredAudits: filtered.timing,
+          chartData: chart.timing,
+          heatmapData: heatmap.timing,
+          rollingState: rolling.timing,
+          attributionColumns: attributionColumns.timing,
+          attribution: attribution.timing,
+          uniqueTradersList: traders.timing,
+          searchIndexBuild: searchIndex.timing,
+          search: search.timing,
+          traderSearch: traderSearch.timing,
+          analyticsRender: render
+        }
+      });
+    }
+    return {
+      schema: 'hipnotrading-benchmark/1',
+      seed,
+      generatedAt: new Date().toISOString(),
+      userAgent: navigator.userAgent,
+      results
+    };
+  };
+
+  return { generateSyntheticAudits, runBenchmarkSuite };
+};
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useContext, useRef, useSyncExternalStore } from 'react';
 import { initializeApp } from 'firebase/app';
 import { 
   getAuth, 
@@ -7,1209 +7,5188 @@ import {
   onAuthStateChanged 
 } from 'firebase/auth';
 import { 
-  getFirestore, 
+  initializeFirestore,
+  persistentLocalCache,
+  persistentMultipleTabManager,
+  connectFirestoreEmulator,
   collection, 
-  addDoc, 
+  doc,
+  getDoc,
+  getDocFromServer,
+  getDocs,
+  getDocsFromCache,
+  getCountFromServer,
   onSnapshot, 
   serverTimestamp,
-  query
+  writeBatch,
+  runTransaction,
+  increment,
+  deleteField,
+  waitForPendingWrites,
+  documentId,
+  query,
+  where,
+  orderBy,
+  limit,
+  startAfter
 } from 'firebase/firestore';
-import {
-  LineChart,
-  Line,
-  XAxis,
-  YAxis,
-  CartesianGrid,
-  Tooltip,
-  ResponsiveContainer,
-  BarChart,
-  Bar,
-  Cell
-} from 'recharts';
 
 // Firebase configuration
 const firebaseConfig = JSON.parse(__firebase_config);
 const app = initializeApp(firebaseConfig);
 const auth = getAuth(app);
-const db = getFirestore(app);
+// Caché persistente en IndexedDB con cola de escrituras sin conexión
+const db = initializeFirestore(app, {
+  localCache: persistentLocalCache({ tabManager: persistentMultipleTabManager() })
+});
 const appId = typeof __app_id !== 'undefined' ? __app_id : 'hipnotrading-audit-v1';
 
-const App = () => {
-  const [user, setUser] = useState(null);
-  const [allAudits, setAllAudits] = useState([]);
-  const [loading, setLoading] = useState(false);
-  const [message, setMessage] = useState(null);
-  const [accessCode, setAccessCode] = useState("");
-  
-  // Filtros de Fecha para Análisis
-  const [filterStartDate, setFilterStartDate] = useState("");
-  const [filterEndDate, setFilterEndDate] = useState("");
-  
-  // Estado para el Modal de Evaluación
-  const [showModal, setShowModal] = useState(false);
-  const [modalContent, setModalContent] = useState(null);
+// Emulador local de Firestore (opcional), p.ej. __firestore_emulator_host = "localhost:8080"
+if (typeof __firestore_emulator_host !== 'undefined' && __firestore_emulator_host) {
+  const [emulatorHost, emulatorPort] = __firestore_emulator_host.split(':');
+  connectFirestoreEmulator(db, emulatorHost, parseInt(emulatorPort) || 8080);
+}
 
-  const today = new Date().toISOString().split('T')[0];
+const AUDITS_PAGE_SIZE = 50;
+// Páginas de la descarga en segundo plano del rango seleccionado
+const RANGE_PAGE_SIZE = 500;
+const BATCH_SIZE = 400;
 
-  const initialFormState = {
-    nombreTrader: '', 
-    fechaAuditoria: today,
-    horaInicioSesion: '09:00',
-    energiaMetabolica: 7,
-    ritualCoherencia: 'No',
-    revisadoPlan: 'No', 
-    estadoSistemaNervioso: '🟢 Vagal Ventral (Calma Activa)',
-    indiceCoherenciaIC: 90,
-    sesgosNeuroCognitivos: [],
-    marcadoresSomaticos: [],
-    nivelPresencia: 9,
-    respetoStopTP: 10,
-    dejoCorrerPlan: 10,
-    numEntradasTotales: 0,
-    pnlDia: 0,
-    numEntradasPlan: 0,
-    numEntradasFueraPlan: 0,
-    resultadoConsecuenciaPlan: '', 
-    numPerdidasHoy: 0,
-    aceptoRiesgo: '', // Nuevo campo solicitado para sección 3.1
-    emocionesPorPerdida: {}, 
-    tiposPorPerdida: {},
-    sensacionCorporalPerdida: '',
-    estadoSistemaNerviosoFinal: '',
-    sensacionCorporal: '',
-    detallesSesion: '',
-    emocionesDetectadas: [], 
-    objetivoReal: 'Aprender/Proceso',
-    nivelCoherencia: 5,
-    pnlEmocional: 'He ganado disciplina',
-    anclajeIdentidad: 7,
-    creenciasInstaladas: [],
-    reescrituraNarrativa: '',
-    visualizacionesCierre: [],
-    aprendizajeMentor: '',
-    protocoloReactivacionVagal: '',
-    compromisoManana: ''
+const auditsCollection = () => collection(db, 'artifacts', appId, 'public', 'data', 'weekly_audits');
+const tradersCollection = () => collection(db, 'artifacts', appId, 'public', 'data', 'traders');
+// Proyección compacta de cada auditoría (mismo id) para gráficas, tablas y mapa de calor
+const summariesCollection = () => collection(db, 'artifacts', appId, 'public', 'data', 'weekly_audit_summaries');
+const rollupsCollection = () => collection(db, 'artifacts', appId, 'public', 'data', 'trader_rollups');
+// Una marca por lote de importación confirmado (id: importación + primer registro del lote)
+const importChunksCollection = () => collection(db, 'artifacts', appId, 'public', 'data', 'import_chunks');
+
+// Núcleo de análisis autocontenido: el worker lo ejecuta desde su código fuente
+const createAnalyticsCore = () => {
+  const normalizeTraderName = (name) => (name || '').trim().toLowerCase();
+
+  // Clave de día canónica (YYYY-MM-DD, hora local); fechaLocal es el último recurso
+  const pad2 = (n) => String(n).padStart(2, '0');
+  const formatDayKey = (date) => `${date.getFullYear()}-${pad2(date.getMonth() + 1)}-${pad2(date.getDate())}`;
+  const ISO_DAY = /^\d{4}-\d{2}-\d{2}$/;
+
+  const parseLocaleDate = (text) => {
+    const parts = String(text).split(/\D+/).filter(Boolean).map(Number);
+    if (parts.length < 3) return null;
+    let [d, m, y] = parts;
+    if (parts[0] > 31) [y, m, d] = parts; // Y/M/D
+    else if (parts[1] > 12) [m, d, y] = parts; // M/D/Y (en-US)
+    if (y < 100) y += 2000;
+    const date = new Date(y, m - 1, d);
+    return isNaN(date.getTime()) ? null : date;
   };
 
-  const [formData, setFormData] = useState(initialFormState);
+  const toDayKey = (data) => {
+    if (typeof data.fechaAuditoria === 'string' && ISO_DAY.test(data.fechaAuditoria)) return data.fechaAuditoria;
+    if (typeof data.timestampSesion?.seconds === 'number') return formatDayKey(new Date(data.timestampSesion.seconds * 1000));
+    if (typeof data.createdAt?.seconds === 'number') return formatDayKey(new Date(data.createdAt.seconds * 1000));
+    const legacy = data.fechaLocal && parseLocaleDate(data.fechaLocal);
+    return legacy ? formatDayKey(legacy) : '';
+  };
 
-  useEffect(() => {
-    const initAuth = async () => {
-      try {
-        if (typeof __initial_auth_token !== 'undefined' && __initial_auth_token) {
-          await signInWithCustomToken(auth, __initial_auth_token);
-        } else {
-          await signInAnonymously(auth);
-        }
-      } catch (error) {
-        console.error("Error de autenticación:", error);
-      }
-    };
-    initAuth();
-    const unsubscribe = onAuthStateChanged(auth, setUser);
-    return () => unsubscribe();
-  }, []);
+  // Mapa de calor configurable por trader: cada sesión se reduce a un id de celda cacheado
+  const MS_PER_DAY = 86400000;
+  const MINUTES_PER_DAY = 1440;
 
-  useEffect(() => {
-    if (!user) return;
-    const auditsRef = collection(db, 'artifacts', appId, 'public', 'data', 'weekly_audits');
-    const q = query(auditsRef);
-    const unsubscribe = onSnapshot(q, (snapshot) => {
-      const data = snapshot.docs.map(doc => ({ id: doc.id, ...doc.data() }));
-      const sorted = data.sort((a, b) => (a.createdAt?.seconds || 0) - (b.createdAt?.seconds || 0));
-      setAllAudits(sorted);
-    }, (error) => console.error("Error en Firestore:", error));
-    return () => unsubscribe();
-  }, [user, appId]);
+  const DEFAULT_HEATMAP_CONFIG = Object.freeze({
+    timeZone: '', // '' = zona horaria del navegador (comportamiento original)
+    bucketMinutes: 60,
+    days: Object.freeze([1, 2, 3, 4, 5]),
+    startMinute: 8 * 60,
+    endMinute: 17 * 60
+  });
 
-  const uniqueTradersList = useMemo(() => {
-    const names = allAudits.map(a => a.nombreTrader?.trim()).filter(Boolean);
-    return Array.from(new Set(names)).sort();
-  }, [allAudits]);
+  const dayNumberFromKey = (dayKey) => {
+    const [y, m, d] = dayKey.split('-').map(Number);
+    return Math.floor(Date.UTC(y, m - 1, d) / MS_PER_DAY);
+  };
+
+  const resolveSessionDate = (data) => {
+    let dateObj;
+    if (data.timestampSesion && data.timestampSesion.seconds) {
+      dateObj = new Date(data.timestampSesion.seconds * 1000);
+    } else if (data.createdAt && typeof data.createdAt.seconds === 'number') {
+      dateObj = new Date(data.createdAt.seconds * 1000);
+    } else if (data.fechaAuditoria) {
+      const parts = data.fechaAuditoria.split('-');
+      const hourParts = (data.horaInicioSesion || "10:00").split(':');
+      if (parts.length === 3) {
+        dateObj = new Date(parts[0], parts[1] - 1, parts[2], parseInt(hourParts[0]), parseInt(hourParts[1]));
+      }
+    }
+    return dateObj && !isNaN(dateObj.getTime()) ? dateObj : null;
+  };
+
+  // Desfase de una zona IANA, cacheado por hora UTC
+  const timeZoneFormatters = new Map();
+  const timeZoneOffsets = new Map();
 
-  // Lógica de filtrado centralizada: Nombre + Rango de Fechas
-  const filteredAudits = useMemo(() => {
-    let filtered = allAudits;
+  const timeZoneOffsetMinutes = (timeZone, ms) => {
+    const hour = Math.floor(ms / 3600000);
+    const cacheKey = `${timeZone}|${hour}`;
+    const cached = timeZoneOffsets.get(cacheKey);
+    if (cached !== undefined) return cached;
 
-    // 1. Filtro por nombre
-    const search = formData.nombreTrader.trim().toLowerCase();
-    if (search) {
-      filtered = filtered.filter(a => a.nombreTrader?.trim().toLowerCase() === search);
+    let offset;
+    if (!timeZone) {
+      offset = -new Date(hour * 3600000).getTimezoneOffset();
     } else {
-      return []; // Si no hay nombre, no mostramos nada
+      let formatter = timeZoneFormatters.get(timeZone);
+      if (!formatter) {
+        formatter = new Intl.DateTimeFormat('en-US', {
+          timeZone, hourCycle: 'h23', year: 'numeric', month: 'numeric', day: 'numeric', hour: 'numeric', minute: 'numeric'
+        });
+        timeZoneFormatters.set(timeZone, formatter);
+      }
+      const parts = {};
+      formatter.formatToParts(new Date(hour * 3600000)).forEach(({ type, value }) => { parts[type] = Number(value); });
+      offset = Math.round((Date.UTC(parts.year, parts.month - 1, parts.day, parts.hour, parts.minute) - hour * 3600000) / 60000);
     }
+    if (timeZoneOffsets.size > 100000) timeZoneOffsets.clear();
+    timeZoneOffsets.set(cacheKey, offset);
+    return offset;
+  };
 
-    // 2. Filtro por fecha inicio
-    if (filterStartDate) {
-      filtered = filtered.filter(a => {
-        const date = a.fechaAuditoria || a.fechaLocal; // Preferimos fechaAuditoria (YYYY-MM-DD)
-        return date >= filterStartDate;
-      });
-    }
+  const createHeatmapLayout = (config = DEFAULT_HEATMAP_CONFIG) => {
+    const slotsPerDay = Math.ceil((config.endMinute - config.startMinute) / config.bucketMinutes);
+    const dayIndex = new Int8Array(7).fill(-1);
+    config.days.forEach((day, i) => { dayIndex[day] = i; });
+    const cellCount = config.days.length * slotsPerDay;
+    return { config, slotsPerDay, cellCount, stride: cellCount * 3, dayIndex, buckets: new WeakMap() };
+  };
 
-    // 3. Filtro por fecha fin
-    if (filterEndDate) {
-      filtered = filtered.filter(a => {
-        const date = a.fechaAuditoria || a.fechaLocal;
-        return date <= filterEndDate;
-      });
+  const DEFAULT_HEATMAP_LAYOUT = createHeatmapLayout();
+
+  // Id de celda (0..cellCount-1) o -1 si la sesión cae fuera de la rejilla
+  const heatmapBucketOf = (layout, record) => {
+    if (record.sessionMinute === null || record.dayNumber === null) return -1;
+    const cached = layout.buckets.get(record);
+    if (cached !== undefined) return cached;
+
+    const { config } = layout;
+    const localMinute = record.sessionMinute + timeZoneOffsetMinutes(config.timeZone, record.sessionMinute * 60000);
+    const localDay = Math.floor(localMinute / MINUTES_PER_DAY);
+    const weekday = (((localDay + 4) % 7) + 7) % 7; // el día 0 (1970-01-01) fue jueves
+    const minuteOfDay = localMinute - localDay * MINUTES_PER_DAY;
+    const di = layout.dayIndex[weekday];
+    let bucket = -1;
+    if (di >= 0 && minuteOfDay >= config.startMinute && minuteOfDay < config.endMinute) {
+      bucket = di * layout.slotsPerDay + Math.floor((minuteOfDay - config.startMinute) / config.bucketMinutes);
     }
+    layout.buckets.set(record, bucket);
+    return bucket;
+  };
 
-    return filtered;
-  }, [allAudits, formData.nombreTrader, filterStartDate, filterEndDate]);
+  // Sumas [ic, pnl, count] por celda agrupadas en bloques de días
+  const HEATMAP_BLOCK_DAYS = 32;
 
-  const chartData = useMemo(() => {
-    return filteredAudits.map(audit => ({
-      fecha: audit.fechaAuditoria || audit.fechaLocal,
-      ic: parseFloat(audit.indiceCoherenciaIC) || 0,
-      presencia: parseFloat(audit.nivelPresencia) || 0,
-      energia: parseFloat(audit.energiaMetabolica) || 0
-    }));
-  }, [filteredAudits]);
+  const blockOfDay = (dayNumber) => Math.floor(dayNumber / HEATMAP_BLOCK_DAYS);
 
-  const disciplineFactor = useMemo(() => {
-    const total = parseInt(formData.numPerdidasHoy) || 0;
-    if (total === 0) return { percent: 100, color: 'bg-emerald-500', label: '100%', textColor: 'text-emerald-500' };
+  const createTraderHeatmap = (layout) => ({ layout, blocks: new Map() });
 
-    let cleanCount = 0;
-    let definedCount = 0;
+  // Copia en escritura a nivel de bloque: el agregado anterior nunca se muta
+  const addToTraderHeatmap = (heatmap, record, sign, copiedBlocks) => {
+    const bucket = heatmapBucketOf(heatmap.layout, record);
+    if (bucket < 0) return;
+    const block = blockOfDay(record.dayNumber);
+    let sums = heatmap.blocks.get(block);
+    if (!sums) {
+      sums = new Float64Array(heatmap.layout.stride);
+      copiedBlocks.add(sums);
+    } else if (!copiedBlocks.has(sums)) {
+      sums = sums.slice();
+      copiedBlocks.add(sums);
+    }
+    heatmap.blocks.set(block, sums);
+    const offset = bucket * 3;
+    sums[offset] += sign * record.ic;
+    sums[offset + 1] += sign * record.pnl;
+    sums[offset + 2] += sign;
+  };
+
+  const buildTraderHeatmap = (layout, list) => {
+    const heatmap = createTraderHeatmap(layout);
+    const copiedBlocks = new Set();
+    list.forEach(record => addToTraderHeatmap(heatmap, record, 1, copiedBlocks));
+    return heatmap;
+  };
+
+  const summarizeHeatmapCells = (layout, totals) => {
+    const cells = new Array(layout.cellCount);
+    for (let cell = 0; cell < layout.cellCount; cell++) {
+      const offset = cell * 3;
+      const count = Math.round(totals[offset + 2]);
+      cells[cell] = {
+        totalIC: totals[offset],
+        totalPnL: totals[offset + 1],
+        count,
+        avgIC: count > 0 ? Math.round(totals[offset] / count) : 0,
+        avgPnL: count > 0 ? parseFloat((totals[offset + 1] / count).toFixed(2)) : 0
+      };
+    }
+    return cells;
+  };
 
-    for (let i = 1; i <= total; i++) {
-      const type = formData.tiposPorPerdida[i];
-      if (type) {
-        definedCount++;
-        if (type === 'Limpia ✨ (Bajo Plan)') {
-          cleanCount++;
+  // Sumas planas por celda para transferirlas desde el worker
+  const aggregateTraderHeatmap = (heatmap, list, startDate, endDate, layout = heatmap ? heatmap.layout : DEFAULT_HEATMAP_LAYOUT) => {
+    const totals = new Float64Array(layout.stride);
+    if (heatmap && list.length > 0) {
+      const startDay = startDate ? dayNumberFromKey(startDate) : -Infinity;
+      const endDay = endDate ? dayNumberFromKey(endDate) : Infinity;
+      const firstFull = startDate ? blockOfDay(startDay - 1) + 1 : -Infinity;
+      const lastFull = endDate ? blockOfDay(endDay + 1) - 1 : Infinity;
+      heatmap.blocks.forEach((sums, block) => {
+        if (block < firstFull || block > lastFull) return;
+        for (let k = 0; k < sums.length; k++) totals[k] += sums[k];
+      });
+      // Registros de los bloques parciales de los extremos
+      const addRecords = (fromDay, toDay) => {
+        const from = lowerBound(list, fromDay, (record, day) => (record.dayNumber === null ? -1 : record.dayNumber - day));
+        for (let i = from; i < list.length && list[i].dayNumber !== null && list[i].dayNumber <= toDay; i++) {
+          const record = list[i];
+          const bucket = heatmapBucketOf(layout, record);
+          if (bucket < 0) continue;
+          totals[bucket * 3] += record.ic;
+          totals[bucket * 3 + 1] += record.pnl;
+          totals[bucket * 3 + 2] += 1;
         }
+      };
+      if (firstFull > lastFull) {
+        addRecords(startDay, endDay);
+      } else {
+        if (startDate && startDay < firstFull * HEATMAP_BLOCK_DAYS) addRecords(startDay, firstFull * HEATMAP_BLOCK_DAYS - 1);
+        if (endDate && endDay > (lastFull + 1) * HEATMAP_BLOCK_DAYS - 1) addRecords((lastFull + 1) * HEATMAP_BLOCK_DAYS, endDay);
       }
     }
+    return { layout, totals };
+  };
 
-    if (definedCount === 0) return { percent: 0, color: 'bg-slate-400', label: '0%', textColor: 'text-slate-400' };
-    const percentage = Math.round((cleanCount / total) * 100);
-    let color = 'bg-amber-500'; 
-    let textColor = 'text-amber-500';
-    if (percentage >= 80) { color = 'bg-emerald-500'; textColor = 'text-emerald-500'; }
-    if (percentage < 50) { color = 'bg-rose-600'; textColor = 'text-rose-600'; }
+  const queryTraderHeatmap = (heatmap, list, startDate, endDate) => {
+    const { layout, totals } = aggregateTraderHeatmap(heatmap, list, startDate, endDate);
+    return { layout, cells: summarizeHeatmapCells(layout, totals) };
+  };
 
-    return { percent: percentage, color, label: `${percentage}%`, textColor };
-  }, [formData.numPerdidasHoy, formData.tiposPorPerdida]);
+  // Store incremental: índice por id y listas por trader ordenadas por día
+  const EMPTY_AUDIT_STORE = { byId: new Map(), byTrader: new Map(), heatmaps: new Map(), heatmapLayouts: new Map() };
+  const EMPTY_LIST = [];
 
-  const correlationChartData = useMemo(() => {
-    return [
-      { name: 'IC Inicial', value: parseInt(formData.indiceCoherenciaIC) || 0, color: '#6366f1' },
-      { name: 'Disciplina Final', value: disciplineFactor.percent, color: disciplineFactor.percent < 50 ? '#e11d48' : '#10b981' }
-    ];
-  }, [formData.indiceCoherenciaIC, disciplineFactor]);
-
-  const heatmapData = useMemo(() => {
-    const grid = {};
-    const hours = [8, 9, 10, 11, 12, 13, 14, 15, 16];
-    const days = [1, 2, 3, 4, 5]; 
-
-    days.forEach(d => {
-      hours.forEach(h => {
-        grid[`${d}-${h}`] = { 
-          totalIC: 0, 
-          totalPnL: 0, 
-          count: 0,
-          avgIC: 0,
-          avgPnL: 0
-        };
-      });
+  const compareDays = (a, b) => (a.dayKey < b.dayKey ? -1 : a.dayKey > b.dayKey ? 1 : 0);
+
+  const compareAudits = (a, b) =>
+    compareDays(a, b) ||
+    (a.createdMs - b.createdMs) ||
+    (a.id < b.id ? -1 : a.id > b.id ? 1 : 0);
+
+  // Primera posición cuyo elemento no es menor que `target`
+  const lowerBound = (list, target, compare) => {
+    let lo = 0;
+    let hi = list.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >>> 1;
+      if (compare(list[mid], target) < 0) lo = mid + 1;
+      else hi = mid;
+    }
+    return lo;
+  };
+
+  // Primera posición cuyo elemento es mayor que `target`
+  const upperBound = (list, target, compare) => {
+    let lo = 0;
+    let hi = list.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >>> 1;
+      if (compare(list[mid], target) <= 0) lo = mid + 1;
+      else hi = mid;
+    }
+    return lo;
+  };
+
+  // Rango de fechas inclusivo sobre una lista ordenada por día: dos búsquedas binarias y un slice
+  const selectDayRange = (list, startDate, endDate) => {
+    if (!startDate && !endDate) return list;
+    const from = startDate ? lowerBound(list, { dayKey: startDate }, compareDays) : 0;
+    const to = endDate ? upperBound(list, { dayKey: endDate }, compareDays) : list.length;
+    return from === 0 && to === list.length ? list : list.slice(from, to);
+  };
+
+  const parseNumber = (value) => parseFloat(value) || 0;
+
+  const timestampMs = (ts) => (ts && typeof ts.seconds === 'number' ? ts.seconds * 1000 + Math.floor((ts.nanoseconds || 0) / 1e6) : 0);
+
+  // Normalización única al ingerir cada documento
+  const normalizeAudit = (id, data) => {
+    const dayKey = toDayKey(data);
+    const sessionDate = resolveSessionDate(data);
+    const entradasTotales = parseNumber(data.numEntradasTotales);
+    const entradasPlan = parseNumber(data.numEntradasPlan);
+    return Object.freeze({
+      id,
+      nombreTrader: (data.nombreTrader || '').trim(),
+      traderKey: data.nombreTraderKey || normalizeTraderName(data.nombreTrader),
+      dayKey,
+      dayNumber: dayKey ? dayNumberFromKey(dayKey) : null,
+      createdMs: timestampMs(data.createdAt),
+      sessionMs: sessionDate ? sessionDate.getTime() : null,
+      sessionMinute: sessionDate ? Math.floor(sessionDate.getTime() / 60000) : null,
+      horaInicioSesion: data.horaInicioSesion || '',
+      ic: parseNumber(data.indiceCoherenciaIC),
+      energia: parseNumber(data.energiaMetabolica),
+      presencia: parseNumber(data.nivelPresencia),
+      anclaje: parseNumber(data.anclajeIdentidad),
+      pnl: parseNumber(data.pnlDia),
+      entradasTotales,
+      entradasPlan,
+      eficiencia: entradasTotales > 0 ? Math.round((entradasPlan / entradasTotales) * 100) : 0,
+      revisadoPlan: data.revisadoPlan || '',
+      ritualCoherencia: data.ritualCoherencia || '',
+      estadoSistemaNervioso: data.estadoSistemaNervioso || '',
+      estadoSistemaNerviosoFinal: data.estadoSistemaNerviosoFinal || '',
+      protocoloReactivacionVagal: data.protocoloReactivacionVagal || '',
+      creenciasInstaladas: Object.freeze((data.creenciasInstaladas || []).slice()),
+      numCreenciasInstaladas: typeof data.numCreenciasInstaladas === 'number' ? data.numCreenciasInstaladas : (data.creenciasInstaladas || []).length,
+      protocoloVagal: typeof data.protocoloVagal === 'number' ? data.protocoloVagal : null,
+      numVisualizacionesCierre: typeof data.numVisualizacionesCierre === 'number' ? data.numVisualizacionesCierre : (data.visualizacionesCierre || []).length,
+      tieneNarrativa: typeof data.tieneNarrativa === 'boolean' ? data.tieneNarrativa : Boolean(data.reescrituraNarrativa),
+      respetoStopTP: data.respetoStopTP === undefined || data.respetoStopTP === '' ? null : parseNumber(data.respetoStopTP),
+      reescrituraNarrativa: data.reescrituraNarrativa || '',
+      compromisoManana: data.compromisoManana || '',
+      tieneCompromiso: typeof data.tieneCompromiso === 'boolean' ? data.tieneCompromiso : Boolean(data.compromisoManana),
+      detallesSesion: data.detallesSesion || '',
+      aprendizajeMentor: data.aprendizajeMentor || '',
+      sensacionCorporal: data.sensacionCorporal || ''
     });
+  };
 
-    filteredAudits.forEach(audit => {
-      let dateObj;
-      
-      if (audit.timestampSesion && audit.timestampSesion.seconds) {
-          dateObj = new Date(audit.timestampSesion.seconds * 1000);
-      } else if (audit.createdAt && typeof audit.createdAt.seconds === 'number') {
-          dateObj = new Date(audit.createdAt.seconds * 1000);
-      } else if (audit.fechaAuditoria) {
-          const parts = audit.fechaAuditoria.split('-');
-          const hourParts = (audit.horaInicioSesion || "10:00").split(':');
-          if (parts.length === 3) {
-              dateObj = new Date(parts[0], parts[1] - 1, parts[2], parseInt(hourParts[0]), parseInt(hourParts[1]));
-          }
+  const applyAuditChanges = (store, changes) => {
+    if (changes.length === 0) return store;
+    const byId = new Map(store.byId);
+    const byTrader = new Map(store.byTrader);
+    const heatmaps = new Map(store.heatmaps);
+    const copied = new Set();
+    const copiedHeatmaps = new Set();
+    const copiedBlocks = new Set();
+    const traderList = (key) => {
+      if (!copied.has(key)) {
+        byTrader.set(key, (byTrader.get(key) || EMPTY_LIST).slice());
+        copied.add(key);
       }
-      
-      if (!dateObj || isNaN(dateObj.getTime())) return;
-
-      const day = dateObj.getDay(); 
-      const hour = dateObj.getHours();
-
-      if (day >= 1 && day <= 5 && hour >= 8 && hour <= 16) {
-        const key = `${day}-${hour}`;
-        if (grid[key]) {
-          grid[key].totalIC += parseFloat(audit.indiceCoherenciaIC || 0);
-          grid[key].totalPnL += parseFloat(audit.pnlDia || 0);
-          grid[key].count += 1;
-        }
+      return byTrader.get(key);
+    };
+    const updateHeatmap = (key, record, sign) => {
+      let heatmap = heatmaps.get(key);
+      if (!heatmap) {
+        heatmap = createTraderHeatmap(store.heatmapLayouts.get(key) || DEFAULT_HEATMAP_LAYOUT);
+      } else if (!copiedHeatmaps.has(key)) {
+        heatmap = { layout: heatmap.layout, blocks: new Map(heatmap.blocks) };
       }
-    });
+      copiedHeatmaps.add(key);
+      addToTraderHeatmap(heatmap, record, sign, copiedBlocks);
+      heatmaps.set(key, heatmap);
+    };
 
-    Object.keys(grid).forEach(key => {
-      if (grid[key].count > 0) {
-        grid[key].avgIC = Math.round(grid[key].totalIC / grid[key].count);
-        grid[key].avgPnL = parseFloat((grid[key].totalPnL / grid[key].count).toFixed(2));
+    changes.forEach(({ type, record }) => {
+      const previous = byId.get(record.id);
+      if (previous) {
+        const previousKey = previous.traderKey;
+        const list = traderList(previousKey);
+        list.splice(lowerBound(list, previous, compareAudits), 1);
+        updateHeatmap(previousKey, previous, -1);
+        if (list.length === 0) {
+          byTrader.delete(previousKey);
+          heatmaps.delete(previousKey);
+          copied.delete(previousKey);
+          copiedHeatmaps.delete(previousKey);
+        }
+        byId.delete(record.id);
       }
+      if (type === 'removed') return;
+      // Un 'added' de un registro ya presente (página repetida) equivale a 'modified'
+      const key = record.traderKey;
+      const list = traderList(key);
+      list.splice(lowerBound(list, record, compareAudits), 0, record);
+      updateHeatmap(key, record, 1);
+      byId.set(record.id, record);
     });
 
-    return grid;
-  }, [filteredAudits]);
-
-  const getHeatmapColor = (cell) => {
-    if (cell.count === 0) return 'bg-[#E0E0E0]'; 
-    const { avgIC, avgPnL } = cell;
-    if (avgIC < 50 || avgPnL < 0) return 'bg-[#F44336]'; 
-    if (avgIC >= 50 && avgIC < 65) return 'bg-[#FFC107]'; 
-    if (avgIC >= 65 && avgPnL >= 0) return 'bg-[#4CAF50]'; 
-    return 'bg-[#4CAF50]'; 
-  };
-
-  const handleInputChange = (e) => {
-    const { name, value, type, checked } = e.target;
-    if (type === 'checkbox') {
-      const list = formData[name] || [];
-      setFormData(prev => ({
-        ...prev,
-        [name]: checked ? [...list, value] : list.filter(i => i !== value)
-      }));
-    } else {
-      setFormData(prev => ({ ...prev, [name]: value }));
-    }
+    return { byId, byTrader, heatmaps, heatmapLayouts: store.heatmapLayouts };
   };
 
-  const handleEmocionPerdida = (index, emocion) => {
-    setFormData(prev => ({
-      ...prev,
-      emocionesPorPerdida: { ...prev.emocionesPorPerdida, [index]: emocion }
-    }));
+  // Cambiar la rejilla de un trader recalcula su agregado una sola vez con la nueva configuración
+  const setTraderHeatmapConfig = (store, key, config) => {
+    const current = store.heatmapLayouts.get(key);
+    if (current && current.config === config) return store;
+    const layout = createHeatmapLayout(config);
+    const heatmapLayouts = new Map(store.heatmapLayouts);
+    heatmapLayouts.set(key, layout);
+    const heatmaps = new Map(store.heatmaps);
+    const list = store.byTrader.get(key);
+    if (list) heatmaps.set(key, buildTraderHeatmap(layout, list));
+    return { ...store, heatmaps, heatmapLayouts };
   };
 
-  const handleTipoPerdida = (index, tipo) => {
-    setFormData(prev => ({
-      ...prev,
-      tiposPorPerdida: { ...prev.tiposPorPerdida, [index]: tipo }
-    }));
+  // Caché LRU de historiales por trader con presupuesto de memoria
+  // maxSearchBytes: índice de búsqueda (candidatos de Firestore), que se vacía por orden de llegada
+  const TRADER_CACHE_LIMITS = { maxBytes: 48 * 1024 * 1024, maxTraders: 8, maxSearchBytes: 16 * 1024 * 1024 };
+
+  // Estimación gruesa del tamaño en memoria de un registro normalizado (cadenas UTF-16 + cabeceras)
+  const estimateRecordBytes = (record) => {
+    let bytes = 64;
+    Object.keys(record).forEach(key => {
+      const value = record[key];
+      if (typeof value === 'string') bytes += 32 + value.length * 2;
+      else if (Array.isArray(value)) bytes += 32 + value.reduce((total, item) => total + 32 + String(item).length * 2, 0);
+      else bytes += 16;
+    });
+    return bytes * 2;
   };
 
-  const evaluatePreMarket = () => {
-    const ic = parseInt(formData.indiceCoherenciaIC);
-    const sn = formData.estadoSistemaNervioso;
-    const presencia = parseInt(formData.nivelPresencia);
-    const plan = formData.revisadoPlan;
-    
-    let content = { title: '', text: '', colorClass: '', buttonClass: '' };
-
-    if (ic < 60 || sn.includes('Dorsal') || presencia < 4 || plan === 'No') {
-      content = {
-        title: '🛑 SISTEMA NO APTO',
-        text: plan === 'No' 
-          ? 'Falta de disciplina operativa: NO has revisado tu plan de trading. Sin mapa, no hay trading. Revisa el plan y vuelve a validar.'
-          : 'Tu coherencia o presencia es crítica. En este estado, tu córtex prefrontal está desactivado y operarás bajo el miedo, la disociación o la parálisis. PROHIBIDO OPERAR. Realiza una sesión de hipnosis de emergencia.',
-        colorClass: 'bg-rose-600',
-        buttonClass: 'bg-rose-700 hover:bg-rose-800'
-      };
-    } else if (ic >= 70 && sn.includes('Vagal Ventral') && presencia >= 9 && plan === 'Sí') {
-      content = {
-        title: '✅ SISTEMA OPTIMIZADO',
-        text: 'Estás en estado de flujo, tu coherencia es alta y tu foco es total. Tu biología está preparada para ejecutar el plan sin interferencias emocionales. ¡Buen trading!',
-        colorClass: 'bg-emerald-500',
-        buttonClass: 'bg-emerald-700 hover:bg-emerald-800'
-      };
-    } else {
-      content = {
-        title: '⚠️ PRECAUCIÓN',
-        text: 'Tu sistema muestra signos de alerta, urgencia o falta de foco. Estás en la frontera del secuestro emocional. Opera con lotaje reducido o realiza 2 minutos de coherencia cardíaca antes del primer trade.',
-        colorClass: 'bg-amber-500',
-        buttonClass: 'bg-amber-600 hover:bg-amber-700'
-      };
-    }
+  const removeTraders = (store, keys) => {
+    const byId = new Map(store.byId);
+    const byTrader = new Map(store.byTrader);
+    const heatmaps = new Map(store.heatmaps);
+    const heatmapLayouts = new Map(store.heatmapLayouts);
+    keys.forEach(key => {
+      (byTrader.get(key) || EMPTY_LIST).forEach(record => byId.delete(record.id));
+      byTrader.delete(key);
+      heatmaps.delete(key);
+      heatmapLayouts.delete(key);
+    });
+    return { byId, byTrader, heatmaps, heatmapLayouts };
+  };
 
-    setModalContent(content);
-    setShowModal(true);
+  // Serie de evolución: agregación por periodo + LTTB sobre el IC
+  const CHART_EXACT_MAX_DAYS = 90;
+  const CHART_DAILY_MAX_DAYS = 365;
+  const CHART_WEEKLY_MAX_DAYS = 3 * 365;
+  const CHART_PX_PER_POINT = 4;
+
+  const granularityForSpan = (span) => {
+    if (span <= CHART_EXACT_MAX_DAYS) return 'exact';
+    if (span <= CHART_DAILY_MAX_DAYS) return 'day';
+    if (span <= CHART_WEEKLY_MAX_DAYS) return 'week';
+    return 'month';
   };
 
-  const saveAudit = async (e) => {
-    e.preventDefault();
-    if (!formData.nombreTrader.trim()) {
-      setMessage({ type: 'error', text: 'El nombre del trader es obligatorio.' });
-      return;
-    }
-    setLoading(true);
-    try {
-      const auditsRef = collection(db, 'artifacts', appId, 'public', 'data', 'weekly_audits');
-      const fechaFormateada = new Date(formData.fechaAuditoria).toLocaleDateString();
-      
-      const [año, mes, dia] = formData.fechaAuditoria.split('-');
-      const [horas, minutos] = formData.horaInicioSesion.split(':');
-      const timestampCompleto = new Date(año, mes - 1, dia, horas, minutos);
-
-      await addDoc(auditsRef, {
-        ...formData,
-        nombreTrader: formData.nombreTrader.trim(),
-        createdAt: serverTimestamp(),
-        timestampSesion: timestampCompleto,
-        fechaLocal: fechaFormateada
-      });
+  const chartGranularityFor = (audits, startDate, endDate) => {
+    const dated = audits.filter(audit => audit.dayNumber !== null);
+    if (dated.length === 0) return 'exact';
+    const first = startDate ? dayNumberFromKey(startDate) : dated[0].dayNumber;
+    const last = endDate ? dayNumberFromKey(endDate) : dated[dated.length - 1].dayNumber;
+    return granularityForSpan(last - first + 1);
+  };
 
-      setMessage({ type: 'success', text: 'Registro neurobiológico guardado correctamente.' });
-      setFormData({ ...initialFormState, nombreTrader: formData.nombreTrader });
-      setTimeout(() => setMessage(null), 4000);
-    } catch (error) {
-      setMessage({ type: 'error', text: 'Error al guardar datos.' });
-    } finally {
-      setLoading(false);
-    }
+  // Día 0 (1970-01-01) fue jueves: se retrocede hasta el lunes de la semana
+  const chartBucketKey = (audit, granularity) => {
+    if (granularity === 'day') return audit.dayKey;
+    if (granularity === 'month') return audit.dayKey.slice(0, 7);
+    const [y, m, d] = audit.dayKey.split('-').map(Number);
+    return formatDayKey(new Date(y, m - 1, d - ((audit.dayNumber + 3) % 7)));
   };
 
-  const SectionTitle = ({ number, title }) => (
-    <div className="bg-slate-900 p-5 text-white flex items-center gap-4 border-b border-indigo-500/30">
-      <span className="bg-indigo-600 text-[11px] w-7 h-7 flex items-center justify-center rounded-full font-black shadow-lg shadow-indigo-500/20">{number}</span>
-      <h2 className="text-sm font-black uppercase tracking-[0.15em]">{title}</h2>
-    </div>
-  );
+  const buildChartSeries = (audits, granularity) => {
+    // fin: posición en `audits` de la última sesión del punto (para leer las métricas móviles)
+    if (granularity === 'exact') {
+      return audits.map((audit, i) => ({
+        fecha: audit.dayKey,
+        ic: audit.ic,
+        presencia: audit.presencia,
+        energia: audit.energia,
+        fin: i
+      }));
+    }
+    const series = [];
+    let bucket = null;
+    audits.forEach((audit, i) => {
+      if (audit.dayNumber === null) return;
+      const key = chartBucketKey(audit, granularity);
+      if (!bucket || bucket.fecha !== key) {
+        bucket = { fecha: key, ic: 0, presencia: 0, energia: 0, count: 0, fin: i };
+        series.push(bucket);
+      }
+      bucket.ic += audit.ic;
+      bucket.presencia += audit.presencia;
+      bucket.energia += audit.energia;
+      bucket.count += 1;
+      bucket.fin = i;
+    });
+    return series.map(({ fecha, ic, presencia, energia, count, fin }) => ({
+      fecha,
+      ic: Math.round(ic / count),
+      presencia: Math.round((presencia / count) * 10) / 10,
+      energia: Math.round((energia / count) * 10) / 10,
+      fin
+    }));
+  };
 
-  return (
-    <div className="min-h-screen bg-[#f8fafc] p-4 md:p-8 text-slate-800 font-sans selection:bg-indigo-100">
-      <div className="max-w-6xl mx-auto">
-        <header className="mb-12 text-center">
-          <h1 className="text-5xl font-black text-slate-900 tracking-tighter uppercase mb-3 text-transparent bg-clip-text bg-gradient-to-r from-slate-900 to-indigo-700 italic">Auditoría Neuro-Biología Trading</h1>
-          <div className="h-1.5 w-24 bg-indigo-600 mx-auto rounded-full mb-4"></div>
-          <p className="text-slate-500 font-bold italic text-sm">HIPNOTRADING - Supervisión de Coherencia y Sistema Nervioso</p>
-        </header>
-
-        <form onSubmit={saveAudit} className="space-y-10">
-          <section className="bg-white rounded-[2rem] shadow-xl shadow-slate-200/50 border border-slate-200 p-8 border-l-[16px] border-l-indigo-600">
-            <div className="grid grid-cols-1 lg:grid-cols-3 gap-8">
-              <div className="lg:col-span-2 space-y-6">
-                {accessCode === "COACH2024" && uniqueTradersList.length > 0 && (
-                  <div className="bg-amber-50 p-4 rounded-2xl border border-amber-200 mb-4 animate-in slide-in-from-top-2">
-                    <label className="block text-[10px] font-black text-amber-700 uppercase tracking-widest mb-2 italic">Panel de Coach: Seleccionar Trader</label>
-                    <select 
-                      onChange={(e) => setFormData(prev => ({...prev, nombreTrader: e.target.value}))}
-                      className="w-full p-3 bg-white border-2 border-amber-200 rounded-xl text-sm font-black text-amber-900 outline-none"
-                    >
-                      <option value="">-- Ver lista de traders --</option>
-                      {uniqueTradersList.map(name => (
-                        <option key={name} value={name}>{name}</option>
-                      ))}
-                    </select>
-                  </div>
-                )}
-                
-                <div>
-                  <label className="block text-[10px] font-black text-slate-400 uppercase tracking-widest mb-3 italic">Nombre del Trader</label>
-                  <input type="text" name="nombreTrader" value={formData.nombreTrader} onChange={handleInputChange} placeholder="Introduce tu nombre..." className="w-full p-4 bg-slate-50 border-2 border-slate-100 rounded-2xl text-xl font-black text-indigo-700 outline-none focus:border-indigo-500 transition-all" required />
-                </div>
+  // El eje X es categórico (un hueco por punto), así que la coordenada x es el índice
+  const downsampleLttb = (points, threshold, key = 'ic') => {
+    if (threshold >= points.length || threshold < 3) return points;
+    const sampled = [points[0]];
+    const bucketSize = (points.length - 2) / (threshold - 2);
+    let a = 0;
+    for (let i = 0; i < threshold - 2; i++) {
+      const nextStart = Math.floor((i + 1) * bucketSize) + 1;
+      const nextEnd = Math.min(Math.floor((i + 2) * bucketSize) + 1, points.length);
+      let avgX = 0;
+      let avgY = 0;
+      for (let j = nextStart; j < nextEnd; j++) {
+        avgX += j;
+        avgY += points[j][key];
+      }
+      avgX /= nextEnd - nextStart;
+      avgY /= nextEnd - nextStart;
 
-                {/* NUEVO PANEL DE FILTROS DE FECHA */}
-                <div className="bg-indigo-50/50 p-4 rounded-2xl border border-indigo-100">
-                  <label className="block text-[10px] font-black text-indigo-800 uppercase tracking-widest mb-2 italic flex items-center gap-2">
-                  
-                    <span className="text-indigo-400 font-normal normal-case">(Opcional: Dejar vacío para ver todo el histórico)</span>
-                  </label>
-                  <div className="grid grid-cols-2 gap-4">
-                    <div>
-                      <span className="text-[9px] font-bold text-slate-500 uppercase block mb-1">Desde:</span>
-                      <input 
-                        type="date" 
-                        value={filterStartDate} 
-                        onChange={(e) => setFilterStartDate(e.target.value)} 
-                        className="w-full p-2 bg-white border border-indigo-200 rounded-xl text-xs font-bold text-slate-700 outline-none" 
-                      />
-                    </div>
-                    <div>
-                      <span className="text-[9px] font-bold text-slate-500 uppercase block mb-1">Hasta:</span>
-                      <input 
-                        type="date" 
-                        value={filterEndDate} 
-                        onChange={(e) => setFilterEndDate(e.target.value)} 
-                        className="w-full p-2 bg-white border border-indigo-200 rounded-xl text-xs font-bold text-slate-700 outline-none" 
-                      />
-                    </div>
-                  </div>
-                </div>
+      const start = Math.floor(i * bucketSize) + 1;
+      const end = Math.floor((i + 1) * bucketSize) + 1;
+      const ay = points[a][key];
+      let maxArea = -1;
+      let chosen = start;
+      for (let j = start; j < end; j++) {
+        const area = Math.abs((a - avgX) * (points[j][key] - ay) - (a - j) * (avgY - ay));
+        if (area > maxArea) {
+          maxArea = area;
+          chosen = j;
+        }
+      }
+      sampled.push(points[chosen]);
+      a = chosen;
+    }
+    sampled.push(points[points.length - 1]);
+    return sampled;
+  };
 
-                <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
-                  <div>
-                    <label className="block text-[10px] font-black text-indigo-600 uppercase tracking-widest mb-3 italic">Fecha Registro</label>
-                    <input type="date" name="fechaAuditoria" value={formData.fechaAuditoria} onChange={handleInputChange} className="w-full p-4 bg-indigo-50/50 border-2 border-indigo-100 rounded-2xl font-bold text-slate-700 outline-none cursor-pointer" required />
-                  </div>
-                  <div>
-                    <label className="block text-[10px] font-black text-indigo-600 uppercase tracking-widest mb-3 italic">Hora de Inicio de Sesión</label>
-                    <input type="time" name="horaInicioSesion" value={formData.horaInicioSesion} onChange={handleInputChange} className="w-full p-4 bg-indigo-50/50 border-2 border-indigo-100 rounded-2xl font-bold text-slate-700 outline-none cursor-pointer" required />
-                  </div>
-                </div>
-              </div>
-              <div className="bg-indigo-900 p-6 rounded-3xl text-white flex flex-col justify-center">
-                <label className="block text-[10px] font-black text-indigo-300 uppercase tracking-widest mb-3">Acceso Supervisión</label>
-                <input type="password" value={accessCode} onChange={(e) => setAccessCode(e.target.value)} placeholder="Código" className="w-full p-4 bg-indigo-800/50 border-2 border-indigo-700 rounded-2xl text-center font-bold outline-none" />
-                {accessCode === "COACH2024" && <p className="text-[9px] text-emerald-400 mt-2 text-center font-black uppercase">Modo Coach Activado</p>}
-              </div>
-            </div>
-          </section>
-
-          {/* FASE 1: PRE-MERCADO */}
-          <section className="bg-white rounded-[2rem] shadow-sm border border-slate-200 overflow-hidden relative">
-            <SectionTitle number="1" title="Fase Pre-Mercado (Check Neurobiológico)" />
-            <div className="p-8 space-y-12 pb-12">
-              <div className="space-y-4">
-                <label className="block text-sm font-black text-slate-700 uppercase tracking-tight">1.1 Nivel de Energía Metabólica (1-10)</label>
-                <div className="bg-slate-50 p-6 rounded-3xl border border-slate-100">
-                  <div className="flex items-center gap-6 mb-4">
-                    <input type="range" min="1" max="10" name="energiaMetabolica" value={formData.energiaMetabolica} onChange={handleInputChange} className="flex-1 h-2 bg-slate-200 rounded-lg accent-indigo-600 cursor-pointer" />
-                    <span className="text-4xl font-black text-indigo-600">{formData.energiaMetabolica}</span>
-                  </div>
-                  <div className="grid grid-cols-2 md:grid-cols-4 gap-2 mt-4 text-[10px] font-black uppercase tracking-tighter italic">
-                   
-                    <div className="bg-amber-50 text-amber-700 p-2 rounded-xl border border-amber-100">4–6 = Energía media (cansado pero funcional)</div>
-                    <div className="bg-emerald-50 text-emerald-700 p-2 rounded-xl border border-emerald-100">7–8 = Buena energía (descansado, mente clara)</div>
-                    <div className="bg-indigo-50 text-indigo-700 p-2 rounded-xl border border-indigo-100">9–10 = Energía muy alta (mucha activación, vigila la euforia)</div>
-                  </div>
-                </div>
-              </div>
+  // Serie en columnas Float64Array, reducida al ancho disponible
+  const toSeriesView = (series, granularity, chartWidth) => {
+    const points = chartWidth > 0 ? downsampleLttb(series, Math.floor(chartWidth / CHART_PX_PER_POINT)) : series;
+    const ic = new Float64Array(points.length);
+    const presencia = new Float64Array(points.length);
+    const energia = new Float64Array(points.length);
+    const ends = new Int32Array(points.length);
+    points.forEach((point, i) => {
+      ic[i] = point.ic;
+      presencia[i] = point.presencia;
+      energia[i] = point.energia;
+      ends[i] = point.fin === undefined ? -1 : point.fin;
+    });
+    return { granularity, total: series.length, labels: points.map(point => point.fecha), ic, presencia, energia, ends };
+  };
 
-              <div className="space-y-4 max-w-md">
-                <label className="block text-sm font-black text-slate-700 uppercase">1.2 Ritual de Coherencia Realizado</label>
-                <div className="flex gap-3">
-                  {['Sí', 'No'].map(opt => (
-                    <button key={opt} type="button" onClick={() => setFormData(prev => ({ ...prev, ritualCoherencia: opt }))} className={`flex-1 py-4 rounded-2xl font-black uppercase text-sm transition-all border-2 ${formData.ritualCoherencia === opt ? 'bg-slate-900 border-slate-900 text-white shadow-lg' : 'bg-white border-slate-100 text-slate-400 hover:border-slate-300'}`}>
-                      {opt}
-                    </button>
-                  ))}
-                </div>
-              </div>
+  const buildSeriesView = (audits, startDate, endDate, chartWidth) => {
+    const granularity = chartGranularityFor(audits, startDate, endDate);
+    return toSeriesView(buildChartSeries(audits, granularity), granularity, chartWidth);
+  };
 
-              <div className="grid grid-cols-1 md:grid-cols-2 gap-12 pt-8 border-t border-slate-100">
-                <div className="space-y-4">
-                  <label className="block text-sm font-black text-slate-700 uppercase">1.3 Estado del Sistema Nervioso (SN)</label>
-                  <div className="space-y-3">
-                    {[
-                      { val: '🟢 Vagal Ventral (Calma Activa)', desc: 'Estado de flujo y claridad' },
-                      { val: '🟡 Simpático (Lucha/Caza)', desc: 'Tensión y urgencia (Lobo)' },
-                      { val: '🔴 Dorsal Vagal (Parálisis)', desc: 'Miedo y dudas (Perro)' }
-                    ].map(st => (
-                      <label key={st.val} className={`p-4 border-2 rounded-2xl cursor-pointer transition-all flex justify-between items-center ${formData.estadoSistemaNervioso === st.val ? 'border-indigo-600 bg-indigo-50/50' : 'border-slate-50 bg-slate-50/30'}`}>
-                        <div className="flex flex-col"><span className="text-[10px] font-black uppercase">{st.val}</span><span className="text-[9px] font-bold text-slate-400 italic">{st.desc}</span></div>
-                        <input type="radio" name="estadoSistemaNervioso" value={st.val} checked={formData.estadoSistemaNervioso === st.val} onChange={handleInputChange} className="accent-indigo-600" />
-                      </label>
-                    ))}
-                  </div>
-                </div>
+  // --- Agregados por trader y periodo (día / semana / mes) ---
+  const ROLLUP_PERIODS = ['day', 'week', 'month'];
+  // La eficiencia sale de entradasPlan / entradasTotales (planEfficiency), no se agrega
+  const ROLLUP_METRICS = ['ic', 'presencia', 'energia', 'pnl'];
+  const planEfficiency = (entradasPlan, entradasTotales) => (entradasTotales > 0 ? (entradasPlan / entradasTotales) * 100 : NaN);
 
-                <div className="space-y-6">
-                  <label className="block text-sm font-black text-slate-700 uppercase mb-2">1.4 IC % (Índice de Coherencia)</label>
-                  <div className="bg-slate-50 p-6 rounded-3xl border border-slate-100">
-                    <div className="flex items-center gap-6 mb-3">
-                      <input type="range" min="0" max="100" name="indiceCoherenciaIC" value={formData.indiceCoherenciaIC} onChange={handleInputChange} className="flex-1 h-2 bg-slate-200 rounded-lg accent-emerald-500 cursor-pointer" />
-                      <span className="text-3xl font-black text-emerald-600">{formData.indiceCoherenciaIC}%</span>
-                    </div>
-                  </div>
-                  
-                  <div className="overflow-hidden rounded-2xl border border-slate-100 shadow-sm">
-                    <table className="w-full text-left text-[10px] font-bold uppercase tracking-tighter">
-                      <thead className="bg-slate-100 text-slate-500">
-                        <tr>
-                          <th className="px-3 py-2">IC %</th>
-                          <th className="px-3 py-2">Estado</th>
-                          <th className="px-3 py-2">Sensación Física</th>
-                          <th className="px-3 py-2">Action</th>
-                        </tr>
-                      </thead>
-                      <tbody className="bg-white text-slate-700">
-                        <tr className="border-b border-slate-50">
-                          <td className="px-3 py-2 text-emerald-600">90-100%</td>
-                          <td className="px-3 py-2">Óptimo</td>
-                          <td className="px-3 py-2 font-medium">Visión clara, calma</td>
-                          <td className="px-3 py-2 font-black text-emerald-600">OPERAR</td>
-                        </tr>
-                        <tr className="border-b border-slate-50">
-                          <td className="px-3 py-2 text-emerald-500">70-80%</td>
-                          <td className="px-3 py-2">Estable</td>
-                          <td className="px-3 py-2 font-medium">Pulso tranquilo</td>
-                          <td className="px-3 py-2 font-black text-emerald-600">OPERAR</td>
-                        </tr>
-                        <tr className="border-b border-slate-50">
-                          <td className="px-3 py-2 text-amber-500">50-60%</td>
-                          <td className="px-3 py-2">Alerta</td>
-                          <td className="px-3 py-2 font-medium">Ganas de entrar</td>
-                          <td className="px-3 py-2 font-black text-amber-500">PAUSA</td>
-                        </tr>
-                        <tr>
-                          <td className="px-3 py-2 text-rose-600">&lt; 40%</td>
-                          <td className="px-3 py-2">Caos</td>
-                          <td className="px-3 py-2 font-medium">Miedo/Ira</td>
-                          <td className="px-3 py-2 font-black text-rose-600">BLOQUEO</td>
-                        </tr>
-                      </tbody>
-                    </table>
-                  </div>
+  const rollupBucketOf = (audit, period) => {
+    const clave = chartBucketKey(audit, period);
+    return { period, clave, inicio: period === 'month' ? `${clave}-01` : clave };
+  };
 
-                  <div className="bg-rose-50 border-2 border-rose-100 p-4 rounded-2xl">
-                    <p className="text-[10px] font-black text-rose-700 leading-tight uppercase">
-                      ⚠️ <span className="underline">Regla de Oro:</span><br />
-                      Con un IC inferior al 60%, el córtex prefrontal se apaga y toma el control la amígdala. <span className="text-rose-900">NO DISPARES. RESPIRA 3 MINUTOS.</span>
-                    </p>
-                  </div>
-                </div>
-              </div>
+  const rollupIdOf = (traderKey, bucket) => `${traderKey}__${bucket.period}__${bucket.clave}`;
 
-              <div className="space-y-4 pt-8 border-t border-slate-100">
-                <label className="block text-sm font-black text-slate-700 uppercase tracking-tight">1.5 Nivel de Presencia (1-10)</label>
-                <div className="bg-indigo-50/30 p-6 rounded-3xl border border-indigo-100">
-                  <div className="flex items-center gap-6 mb-4">
-                    <input type="range" min="1" max="10" name="nivelPresencia" value={formData.nivelPresencia} onChange={handleInputChange} className="flex-1 h-2 bg-indigo-200 rounded-lg accent-indigo-600 cursor-pointer" />
-                    <span className="text-4xl font-black text-indigo-700">{formData.nivelPresencia}</span>
-                  </div>
-                  <div className="grid grid-cols-2 gap-2 mt-4 text-[10px] font-black uppercase tracking-tighter italic">
-                    <div className="bg-indigo-100 text-indigo-800 p-2 rounded-xl border border-indigo-200">9-10: Foco total en el ahora (Cuerpo + Gráfico).</div>
-                    <div className="bg-emerald-50 text-emerald-800 p-2 rounded-xl border border-emerald-100">7-8: Foco en el plan, distracciones leves.</div>
-                    <div className="bg-amber-50 text-amber-800 p-2 rounded-xl border border-amber-100">5-6: Piloto automático / Mirando el móvil.</div>
-                    <div className="bg-rose-50 text-rose-800 p-2 rounded-xl border border-rose-100">&lt; 4: Disociación. Apaga la pantalla.</div>
-                  </div>
-                </div>
-              </div>
+  const createRollup = (audit, bucket) => {
+    const rollup = {
+      nombreTraderKey: audit.traderKey,
+      nombreTrader: audit.nombreTrader,
+      periodo: bucket.period,
+      clave: bucket.clave,
+      inicio: bucket.inicio,
+      count: 0,
+      planSi: 0,
+      ritualSi: 0,
+      dorsalSi: 0,
+      entradasTotales: 0,
+      entradasPlan: 0
+    };
+    ROLLUP_METRICS.forEach(metric => {
+      rollup[metric] = { suma: 0, min: null, max: null };
+    });
+    return rollup;
+  };
 
-              <div className="space-y-4 pt-8 border-t border-slate-100 max-w-md">
-                <label className="block text-sm font-black text-slate-700 uppercase">1.6 Revisión del Plan de Trading</label>
-                <div className="flex gap-3">
-                  {['Sí', 'No'].map(opt => (
-                    <button key={opt} type="button" onClick={() => setFormData(prev => ({ ...prev, revisadoPlan: opt }))} className={`flex-1 py-4 rounded-2xl font-black uppercase text-sm transition-all border-2 ${formData.revisadoPlan === opt ? (opt === 'Sí' ? 'bg-emerald-600 border-emerald-600 text-white shadow-lg' : 'bg-rose-600 border-rose-600 text-white shadow-lg') : 'bg-white border-slate-100 text-slate-400 hover:border-slate-300'}`}>
-                      {opt}
-                    </button>
-                  ))}
-                </div>
-              </div>
-              
-              <div className="pt-8 text-center">
-                 <button type="button" onClick={evaluatePreMarket} className="px-8 py-4 bg-slate-900 hover:bg-indigo-700 text-white rounded-2xl font-black uppercase tracking-widest text-xs shadow-lg transition-all">
-                    🔍 Validar Preparación Neurobiológica
-                 </button>
-              </div>
-            </div>
-          </section>
-
-          {/* FASE 2: EJECUCIÓN */}
-          <section className="bg-white rounded-[2rem] shadow-sm border border-slate-200 overflow-hidden">
-            <SectionTitle number="2" title="Ejecución y Foco Atencional" />
-            <div className="p-8 space-y-12">
-              <div className="grid grid-cols-2 md:grid-cols-4 gap-4 pt-6">
-                {[
-                  { label: 'Entradas Totales', name: 'numEntradasTotales' },
-                  { label: 'Resultado PnL', name: 'pnlDia' },
-                  { label: 'Dentro del Plan', name: 'numEntradasPlan' },
-                  { label: 'Fuera de Plan', name: 'numEntradasFueraPlan' }
-                ].map(f => (
-                  <div key={f.name} className="bg-slate-50 p-5 rounded-3xl border border-slate-100">
-                    <label className="block text-[9px] font-black text-slate-500 uppercase mb-2 tracking-widest">{f.label}</label>
-                    <input type="number" name={f.name} value={formData[f.name]} onChange={handleInputChange} className="w-full bg-transparent text-xl font-black outline-none" />
-                  </div>
-                ))}
-              </div>
+  // Acumula la auditoría en sus tres agregados (mapa id → agregado, mutable)
+  const accumulateRollups = (rollups, audit) => {
+    if (audit.dayNumber === null || !audit.traderKey) return rollups;
+    ROLLUP_PERIODS.forEach(period => {
+      const bucket = rollupBucketOf(audit, period);
+      const id = rollupIdOf(audit.traderKey, bucket);
+      let rollup = rollups.get(id);
+      if (!rollup) {
+        rollup = createRollup(audit, bucket);
+        rollups.set(id, rollup);
+      }
+      rollup.count += 1;
+      if (audit.revisadoPlan === 'Sí') rollup.planSi += 1;
+      if (audit.ritualCoherencia === 'Sí') rollup.ritualSi += 1;
+      if (audit.estadoSistemaNervioso.includes('Dorsal') || audit.estadoSistemaNerviosoFinal.includes('Dorsal')) rollup.dorsalSi += 1;
+      rollup.entradasTotales += audit.entradasTotales;
+      rollup.entradasPlan += audit.entradasPlan;
+      ROLLUP_METRICS.forEach(metric => {
+        const value = audit[metric];
+        const stats = rollup[metric];
+        stats.suma += value;
+        stats.min = stats.min === null ? value : Math.min(stats.min, value);
+        stats.max = stats.max === null ? value : Math.max(stats.max, value);
+      });
+    });
+    return rollups;
+  };
 
-              {/* NUEVO PUNTO 2.0 - AÑADIDO SOLICITADO */}
-              <div className="space-y-4 pt-6 border-t border-slate-100">
-                <div className="flex flex-col gap-2">
-                   <label className="block text-sm font-black text-slate-700 uppercase italic">2.0 ¿Es el resultado consecuencia directa de seguir el plan?</label>
-                   <p className="text-[10px] font-bold text-slate-500 italic max-w-2xl bg-indigo-50 p-3 rounded-xl border border-indigo-100">
-                     Recuerda: Una operación ganadora fuera de plan es una <span className="text-rose-600 font-black">pésima operación</span> porque refuerza hábitos destructivos. El dashboard debe premiar la ejecución, no el dinero.
-                   </p>
-                </div>
-                <div className="flex gap-3 max-w-md">
-                  {['Sí', 'No'].map(opt => (
-                    <button 
-                      key={opt} 
-                      type="button" 
-                      onClick={() => setFormData(prev => ({ ...prev, resultadoConsecuenciaPlan: opt }))} 
-                      className={`flex-1 py-4 rounded-2xl font-black uppercase text-sm transition-all border-2 ${
-                        formData.resultadoConsecuenciaPlan === opt 
-                          ? (opt === 'Sí' ? 'bg-indigo-600 border-indigo-600 text-white shadow-lg' : 'bg-rose-600 border-rose-600 text-white shadow-lg') 
-                          : 'bg-white border-slate-100 text-slate-400 hover:border-slate-300'
-                      }`}
-                    >
-                      {opt}
-                    </button>
-                  ))}
-                </div>
-              </div>
+  // Serie de evolución desde agregados: los periodos de los extremos del rango entran completos
+  const buildRollupSeriesView = (rollups, period, startDate, endDate, chartWidth) => {
+    const fromKey = startDate ? chartBucketKey({ dayKey: startDate, dayNumber: dayNumberFromKey(startDate) }, period) : '';
+    const series = rollups
+      .filter(rollup => rollup.count > 0 && rollup.clave >= fromKey && (!endDate || rollup.inicio <= endDate))
+      .sort((a, b) => (a.inicio < b.inicio ? -1 : a.inicio > b.inicio ? 1 : 0))
+      .map(rollup => ({
+        fecha: rollup.clave,
+        ic: Math.round(rollup.ic.suma / rollup.count),
+        presencia: Math.round((rollup.presencia.suma / rollup.count) * 10) / 10,
+        energia: Math.round((rollup.energia.suma / rollup.count) * 10) / 10
+      }));
+    return toSeriesView(series, period, chartWidth);
+  };
 
-              <div className="space-y-4 pt-6 border-t border-slate-100">
-                <label className="block text-sm font-black text-slate-700 uppercase italic">2.1 Marcadores Somáticos Detectados</label>
-                <div className="flex flex-wrap gap-3">
-                  {['TAQUICARDIA', 'TENSIÓN MANDIBULAR', 'CALOR FACIAL', 'PRESIÓN PECHO', 'INQUIETUD PIERNAS', 'SUDORACIÓN', 'RESPIRACIÓN CORTA'].map(m => (
-                    <label key={m} className={`px-5 py-3 rounded-2xl border-2 transition-all cursor-pointer font-black text-[10px] uppercase tracking-tight ${formData.marcadoresSomaticos.includes(m) ? 'bg-rose-600 border-rose-600 text-white shadow-md' : 'bg-white border-slate-100 text-slate-400 hover:border-rose-200'}`}>
-                      <input type="checkbox" name="marcadoresSomaticos" value={m} checked={formData.marcadoresSomaticos.includes(m)} onChange={handleInputChange} className="hidden" />
-                      {m}
-                    </label>
-                  ))}
-                </div>
-              </div>
+  // Cohorte del panel de coach: resumen por día en el documento del directorio de cada trader
+  const COHORT_WINDOW_DAYS = 30;
+  const cohortFromKey = (now = Date.now()) => formatDayKey(new Date(now - (COHORT_WINDOW_DAYS - 1) * MS_PER_DAY));
 
-              <div className="space-y-4 pt-6 border-t border-slate-100">
-                <label className="block text-sm font-black text-slate-700 uppercase italic">2.2 Sesgos Detectados Durante la Operativa</label>
-                <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
-                  {[
-                    { val: 'RECENCIA', desc: 'Influencia del trade anterior.' },
-                    { val: 'IMPACIENCIA', desc: 'Entrar antes de tiempo.' },
-                    { val: 'OVERTRADING', desc: 'Operar de más.' },
-                    { val: 'REVANCHA', desc: 'Recuperar una pérdida.' },
-                    { val: 'CONFIRMACIÓN', desc: 'Ver solo lo que quieres ver.' },
-                    { val: 'AVERSIÓN', desc: 'Cerrar rápido por miedo.' }
-                  ].map(s => (
-                    <label key={s.val} className={`flex flex-col p-4 rounded-2xl border-2 transition-all cursor-pointer ${formData.sesgosNeuroCognitivos.includes(s.val) ? 'bg-indigo-600 border-indigo-600 text-white shadow-md' : 'bg-white border-slate-100 text-slate-400 hover:border-indigo-200'}`}>
-                      <input type="checkbox" name="sesgosNeuroCognitivos" value={s.val} checked={formData.sesgosNeuroCognitivos.includes(s.val)} onChange={handleInputChange} className="hidden" />
-                      <span className="text-[10px] font-black uppercase mb-1">{s.val}</span>
-                      <span className={`text-[9px] font-bold italic ${formData.sesgosNeuroCognitivos.includes(s.val) ? 'text-indigo-100' : 'text-slate-400'}`}>{s.desc}</span>
-                    </label>
-                  ))}
-                </div>
-              </div>
-            </div>
-          </section>
-
-          {/* FASE 3: ANÁLISIS INTEGRAL DE PÉRDIDAS */}
-          <section className="bg-white rounded-[2rem] shadow-sm border border-slate-200 overflow-hidden">
-            <SectionTitle number="3" title="Análisis Integral de Pérdidas" />
-            <div className="p-8 space-y-10">
-              <div className="space-y-6">
-                {/* 3.1 COMPLETO: PÉRDIDAS Y RIESGO */}
-                <div className="flex flex-col md:flex-row gap-8 items-start">
-                  <div className="max-w-md">
-                    <label className="block text-sm font-black text-slate-700 uppercase italic mb-2">3.1 ¿Cuántas operaciones perdedoras has tenido hoy?</label>
-                    <div className="bg-slate-50 p-5 rounded-3xl border border-slate-100 inline-block min-w-[150px]">
-                      <input type="number" name="numPerdidasHoy" value={formData.numPerdidasHoy} onChange={handleInputChange} min="0" className="w-full bg-transparent text-3xl font-black text-rose-600 outline-none" />
-                    </div>
-                  </div>
+  // Días de la ventana que aportan unos agregados diarios (mapa id → agregado), por trader
+  const cohortDaysOf = (rollups, fromKey) => {
+    const byTrader = new Map();
+    rollups.forEach(rollup => {
+      if (rollup.periodo !== 'day' || rollup.clave < fromKey) return;
+      if (!byTrader.has(rollup.nombreTraderKey)) byTrader.set(rollup.nombreTraderKey, {});
+      byTrader.get(rollup.nombreTraderKey)[rollup.clave] = { sesiones: rollup.count, pnl: rollup.pnl.suma, planSi: rollup.planSi, dorsalSi: rollup.dorsalSi };
+    });
+    return byTrader;
+  };
 
-                  {/* NUEVA PREGUNTA AÑADIDA SOLICITADA */}
-                  <div className="max-w-md flex-1">
-                     <label className="block text-sm font-black text-slate-700 uppercase italic mb-2">¿Aceptaste el riesgo antes de entrar?</label>
-                     <p className="text-[10px] font-bold text-slate-400 italic mb-2">Si la respuesta es NO, es una operación de JUEGO (Gambling), no de Trading.</p>
-                     <div className="flex gap-3">
-                      {['Sí', 'No'].map(opt => (
-                        <button 
-                          key={opt} 
-                          type="button" 
-                          onClick={() => setFormData(prev => ({ ...prev, aceptoRiesgo: opt }))} 
-                          className={`flex-1 py-4 rounded-2xl font-black uppercase text-sm transition-all border-2 ${
-                            formData.aceptoRiesgo === opt 
-                              ? (opt === 'Sí' ? 'bg-indigo-600 border-indigo-600 text-white shadow-lg' : 'bg-rose-600 border-rose-600 text-white shadow-lg') 
-                              : 'bg-white border-slate-100 text-slate-400 hover:border-slate-300'
-                          }`}
-                        >
-                          {opt}
-                        </button>
-                      ))}
-                    </div>
-                  </div>
-                </div>
+  const cohortStatsOf = (cohorte, fromKey) => {
+    const stats = { sesiones: 0, pnl: 0, planSi: 0, dorsalSi: 0 };
+    Object.keys(cohorte).forEach(day => {
+      if (day < fromKey) return;
+      const totals = cohorte[day];
+      stats.sesiones += totals.sesiones || 0;
+      stats.pnl += totals.pnl || 0;
+      stats.planSi += totals.planSi || 0;
+      stats.dorsalSi += totals.dorsalSi || 0;
+    });
+    return stats;
+  };
 
-                <div className="flex flex-col items-center justify-center py-8 bg-slate-900 rounded-[2.5rem] border-4 border-slate-800 shadow-2xl animate-in zoom-in-95">
-                  <span className="text-[10px] font-black text-indigo-400 uppercase tracking-[0.3em] mb-2 italic">Performance Subconsciente</span>
-                  <div className="flex items-center gap-4">
-                    <div className="h-1 w-12 bg-indigo-500 rounded-full"></div>
-                    <div className="text-7xl font-black text-white tabular-nums tracking-tighter">
-                      {disciplineFactor.label}
-                    </div>
-                    <div className="h-1 w-12 bg-indigo-500 rounded-full"></div>
-                  </div>
-                  <span className={`mt-3 px-6 py-2 rounded-full text-[11px] font-black uppercase border-2 ${disciplineFactor.textColor} border-current`}>
-                    FACTOR DISCIPLINA DE SESIÓN
-                  </span>
-                </div>
+  // --- Métricas móviles por sesión (media, desviación, EWMA) con sumas prefijas ---
+  const ROLLING_METRICS = ['ic', 'presencia', 'energia', 'pnl', 'eficiencia'];
+  const ROLLING_WINDOWS = [7, 30, 90];
+  const ROLLING_STATS = ['media', 'desviacion', 'ewma'];
+  const ROLLING_BYTES_PER_RECORD = ROLLING_METRICS.length * (2 + ROLLING_WINDOWS.length) * 8;
+  // Sesiones previas al rango que necesita la ventana más larga en su primer punto
+  const ROLLING_LOOKBACK = Math.max(...ROLLING_WINDOWS) - 1;
 
-                <div className="space-y-4 pt-6 border-t border-slate-100">
-                  <div className="flex flex-col gap-1">
-                    <label className="block text-sm font-black text-slate-700 uppercase italic tracking-tight">3.2 Sensación Corporal Durante las Pérdidas</label>
-                    <p className="text-[11px] font-black text-rose-600 uppercase italic tracking-wide">¿Dónde sentiste la emoción en tu cuerpo?</p>
-                  </div>
-                  <div className="grid grid-cols-2 md:grid-cols-4 gap-3">
-                    {[
-                      'NUDO EN EL ESTÓMAGO', 
-                      'OPRESIÓN EN EL PECHO', 
-                      'TENSIÓN EN CUELLO/HOMBROS', 
-                      'CALOR EN LA CARA', 
-                      'VACÍO EN EL ABDOMEN', 
-                      'TENSIÓN MANDIBULAR',
-                      'FRÍO EN LAS MANOS',
-                      'INQUIETUD EN PIERNAS'
-                    ].map(sensacion => (
-                      <label key={sensacion} className={`p-4 rounded-xl border-2 transition-all cursor-pointer flex items-center justify-center text-center text-[9px] font-black uppercase leading-tight ${formData.sensacionCorporalPerdida === sensacion ? 'bg-rose-600 border-rose-600 text-white shadow-md' : 'bg-slate-50 border-slate-100 text-slate-400 hover:border-rose-200'}`}>
-                        <input type="radio" name="sensacionCorporalPerdida" value={sensacion} checked={formData.sensacionCorporalPerdida === sensacion} onChange={handleInputChange} className="hidden" />
-                        {sensacion}
-                      </label>
-                    ))}
-                  </div>
-                </div>
+  const rollingOverlayId = (metric, stat, window) => `${metric}:${stat}:${window}`;
 
-                {parseInt(formData.numPerdidasHoy) > 0 && (
-                  <div className="space-y-6 animate-in fade-in slide-in-from-top-4 pt-6 border-t border-slate-100">
-                    <label className="block text-sm font-black text-slate-700 uppercase italic">Desglose de Pérdidas de Sesión</label>
-                    <div className="overflow-hidden rounded-3xl border border-slate-200 shadow-sm">
-                      <table className="w-full text-left">
-                        <thead className="bg-slate-100 text-slate-400 text-[10px] font-black uppercase">
-                          <tr>
-                            <th className="px-6 py-4 w-16 text-center">#</th>
-                            <th className="px-6 py-4">Emoción Predominante</th>
-                            <th className="px-6 py-4">Calificación de la Pérdida</th>
-                          </tr>
-                        </thead>
-                        <tbody className="divide-y divide-slate-100 bg-white">
-                          {Array.from({ length: Math.min(parseInt(formData.numPerdidasHoy), 20) }).map((_, i) => {
-                            const index = i + 1;
-                            return (
-                              <tr key={index} className="hover:bg-slate-50 transition-colors">
-                                <td className="px-6 py-4 text-center font-black text-slate-300">{index}</td>
-                                <td className="px-6 py-4">
-                                  <select value={formData.emocionesPorPerdida[index] || ''} onChange={(e) => handleEmocionPerdida(index, e.target.value)} className="w-full p-3 bg-slate-50 border border-slate-200 rounded-xl text-xs font-bold text-slate-600 outline-none">
-                                    <option value="" disabled>Selecciona...</option>
-                                    <option value="Ira">Ira 😤</option><option value="Miedo">Miedo 😨</option><option value="Venganza">Venganza ⚔️</option><option value="Tristeza">Tristeza 😢</option>
-                                  </select>
-                                </td>
-                                <td className="px-6 py-4">
-                                  <select value={formData.tiposPorPerdida[index] || ''} onChange={(e) => handleTipoPerdida(index, e.target.value)} className="w-full p-3 border rounded-xl text-xs font-black outline-none">
-                                    <option value="" disabled>Califica...</option>
-                                    <option value="Limpia ✨ (Bajo Plan)">Limpia ✨ (Bajo Plan)</option>
-                                    <option value="Sucia 💩 (Fuera de Plan)">Sucia 💩 (Fuera de Plan)</option>
-                                  </select>
-                                </td>
-                              </tr>
-                            );
-                          })}
-                        </tbody>
-                      </table>
-                    </div>
-                  </div>
-                )}
-              </div>
+  const parseRollingOverlay = (id) => {
+    const [metric, stat, window] = id.split(':');
+    return { metric, stat, window: Number(window) };
+  };
 
-              <div className="space-y-4 pt-8 border-t border-slate-100">
-                <div className="flex flex-col gap-1">
-                  <label className="block text-sm font-black text-slate-700 uppercase italic">3.3 Emociones Detectadas Durante la Sesión</label>
-                  <p className="text-[11px] font-black text-indigo-600 uppercase italic tracking-wide">Identifica qué emociones visitaron tu mente hoy</p>
-                </div>
-                <div className="grid grid-cols-2 md:grid-cols-4 lg:grid-cols-5 gap-3">
-                  {[
-                    "ANSIEDAD", "EUFORIA", "FOMO", "VENGANZA", "HESITACIÓN (DUDA)", 
-                    "CONFIANZA", "FRUSTRACIÓN", "AVARICIA", "ABURRIMIENTO", "ESPERANZA"
-                  ].map(emocion => (
-                    <label key={emocion} className={`p-3 rounded-xl border-2 transition-all cursor-pointer flex items-center justify-center text-center text-[9px] font-black uppercase ${formData.emocionesDetectadas.includes(emocion) ? 'bg-indigo-600 border-indigo-600 text-white shadow-md' : 'bg-white border-slate-100 text-slate-400 hover:border-indigo-200'}`}>
-                      <input type="checkbox" name="emocionesDetectadas" value={emocion} checked={formData.emocionesDetectadas.includes(emocion)} onChange={handleInputChange} className="hidden" />
-                      {emocion}
-                    </label>
-                  ))}
-                </div>
-              </div>
+  // Primera posición cuyo registro cambió de identidad
+  const firstChangedIndex = (previous, list) => {
+    const shared = Math.min(previous.length, list.length);
+    let from = 0;
+    while (from < shared && previous[from] === list[from]) from++;
+    return from;
+  };
 
-              <div className="pt-10 border-t border-slate-100">
-                <label className="block text-sm font-black text-slate-700 uppercase italic mb-8 text-center">Gráfico de Correlación: Coherencia vs Disciplina</label>
-                <div className="h-[250px] w-full max-w-2xl mx-auto">
-                   <ResponsiveContainer width="100%" height="100%">
-                      <BarChart data={correlationChartData} margin={{ top: 20, right: 30, left: 20, bottom: 5 }}>
-                        <CartesianGrid strokeDasharray="3 3" vertical={false} stroke="#f1f5f9" />
-                        <XAxis dataKey="name" axisLine={false} tickLine={false} tick={{ fontWeight: 'black', fontSize: 10, fill: '#64748b' }} />
-                        <YAxis hide domain={[0, 100]} />
-                        <Tooltip cursor={{ fill: '#f8fafc' }} contentStyle={{ borderRadius: '15px', border: 'none', fontWeight: 'bold' }} />
-                        <Bar dataKey="value" radius={[10, 10, 0, 0]} barSize={80}>
-                          {correlationChartData.map((entry, index) => (
-                            <Cell key={`cell-${index}`} fill={entry.color} />
-                          ))}
-                        </Bar>
-                      </BarChart>
-                   </ResponsiveContainer>
-                </div>
-              </div>
+  // Capacidad doblada: añadir sesiones no realoja las columnas cada vez
+  const columnCapacity = (current, size) => Math.max(size, current * 2, 64);
 
-              <div className="bg-slate-50 p-8 rounded-[2rem] border border-slate-200 text-center">
-                <p className="text-slate-700 font-bold text-lg leading-relaxed">
-                  Tu coherencia de entrada del <span className="text-indigo-600 font-black">{formData.indiceCoherenciaIC}%</span> resultó en una disciplina del <span className={`${disciplineFactor.textColor} font-black`}>{disciplineFactor.percent}%</span>.
-                </p>
-                {disciplineFactor.percent < 70 && (
-                  <div className="mt-4 p-4 bg-rose-100 border-2 border-rose-200 rounded-2xl flex items-center justify-center gap-3 animate-pulse">
-                    <span className="text-2xl">🚨</span>
-                    <p className="text-xs font-black text-rose-700 uppercase tracking-tight">
-                      AVISO DE SECUESTRO EMOCIONAL: Tu biología ha anulado tu capacidad de ejecución. El córtex prefrontal ha cedido el mando al sistema límbico.
-                    </p>
-                  </div>
-                )}
-              </div>
+  const growColumn = (column, length, Type = Float64Array) => {
+    const next = new Type(length);
+    if (column) next.set(column);
+    return next;
+  };
 
-              <div className="space-y-4 pt-6 border-t border-slate-100 bg-indigo-50/30 p-6 rounded-3xl border border-indigo-100">
-                 <label className="block text-sm font-black text-indigo-800 uppercase italic tracking-tight">3.4 Estado del Sistema Nervioso Final</label>
-                 <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
-                    {['🟢 Vagal (Calma/Regulación)', '🟡 Simpático (Activado/Ansioso)', '🔴 Dorsal (Agotado/Colapsado)'].map(estado => (
-                       <label key={estado} className={`p-4 rounded-xl border-2 cursor-pointer transition-all flex items-center gap-3 ${formData.estadoSistemaNerviosoFinal === estado ? 'bg-white border-indigo-600 shadow-md text-indigo-700' : 'bg-white/50 border-transparent hover:bg-white text-slate-500'}`}>
-                          <input type="radio" name="estadoSistemaNerviosoFinal" value={estado} checked={formData.estadoSistemaNerviosoFinal === estado} onChange={handleInputChange} className="accent-indigo-600" />
-                          <span className="text-xs font-black uppercase">{estado}</span>
-                       </label>
-                    ))}
-                 </div>
-              </div>
-            </div>
-          </section>
-
-          {/* SECCIÓN 4: REPROGRAMACIÓN SUBCONSCIENTE POST-SESIÓN */}
-          <section className="bg-white rounded-[2rem] shadow-sm border border-slate-200 overflow-hidden">
-            <SectionTitle number="4" title="Reprogramación Subconsciente Post-Sesión" />
-            <div className="p-8 space-y-12">
-              <div className="space-y-4">
-                <div className="flex flex-col gap-1">
-                  <label className="block text-sm font-black text-slate-700 uppercase italic">4.1 ANCLAJE DE IDENTIDAD (1-10)</label>
-                  <p className="text-[11px] font-black text-indigo-600 uppercase italic tracking-wide">"Hoy operé como el trader que quiero ser"</p>
-                </div>
-                <div className="bg-slate-50 p-6 rounded-3xl border border-slate-100">
-                  <div className="flex items-center gap-6 mb-4">
-                    <input type="range" min="1" max="10" name="anclajeIdentidad" value={formData.anclajeIdentidad} onChange={handleInputChange} className="flex-1 h-2 bg-slate-200 rounded-lg accent-indigo-600 cursor-pointer" />
-                    <span className="text-4xl font-black text-indigo-600">{formData.anclajeIdentidad}</span>
-                  </div>
-                </div>
-              </div>
+  // Tramo [from, to) de la lista completa que ocupa el rango filtrado (selectDayRange es un slice)
+  const rangeOffsetOf = (list, filtered) => (filtered.length > 0 ? lowerBound(list, filtered[0], compareAudits) : 0);
 
-              <div className="space-y-4 pt-8 border-t border-slate-100">
-                <label className="block text-sm font-black text-slate-700 uppercase italic">4.2 INSTALACIÓN DE CREENCIA POTENCIADORA</label>
-                <div className="grid grid-cols-1 md:grid-cols-2 gap-3">
-                  {[
-                    "Soy paciente y espero mi setup perfecto",
-                    "Confío en mi sistema y en mi criterio",
-                    "Las pérdidas son información, no fracasos",
-                    "Opero desde la calma, no desde la necesidad",
-                    "Mi valor como trader no depende de un trade",
-                    "Soy disciplinado incluso cuando nadie me ve"
-                  ].map(creencia => (
-                    <label key={creencia} className={`p-4 rounded-xl border-2 transition-all cursor-pointer flex items-center gap-3 text-[10px] font-black uppercase ${formData.creenciasInstaladas.includes(creencia) ? 'bg-indigo-600 border-indigo-600 text-white' : 'bg-slate-50 border-slate-100 text-slate-500 hover:border-indigo-200'}`}>
-                      <input type="checkbox" name="creenciasInstaladas" value={creencia} checked={formData.creenciasInstaladas.includes(creencia)} onChange={handleInputChange} className="hidden" />
-                      {creencia}
-                    </label>
-                  ))}
-                </div>
-              </div>
+  const createRollingState = () => ({ list: EMPTY_LIST, capacity: 0, columns: {} });
 
-              <div className="space-y-4 pt-8 border-t border-slate-100">
-                <label className="block text-sm font-black text-slate-700 uppercase italic">4.3 REESCRITURA NARRATIVA</label>
-                <textarea name="reescrituraNarrativa" value={formData.reescrituraNarrativa} onChange={handleInputChange} placeholder="Escribe aquí tu aprendizaje del día de hoy..." className="w-full p-6 bg-slate-50 border-2 border-slate-100 rounded-3xl text-sm font-bold text-slate-600 outline-none focus:border-indigo-500 transition-all min-h-[120px]" />
+  const growRollingState = (state, size) => {
+    if (size <= state.capacity) return;
+    const capacity = columnCapacity(state.capacity, size);
+    ROLLING_METRICS.forEach(metric => {
+      const current = state.columns[metric] || { ewma: {} };
+      const ewma = {};
+      ROLLING_WINDOWS.forEach(window => { ewma[window] = growColumn(current.ewma[window], capacity); });
+      state.columns[metric] = { sums: growColumn(current.sums, capacity + 1), squares: growColumn(current.squares, capacity + 1), ewma };
+    });
+    state.capacity = capacity;
+  };
+
+  const updateRollingState = (state, list) => {
+    if (state.list === list) return state;
+    const from = firstChangedIndex(state.list, list);
+    growRollingState(state, list.length);
+    ROLLING_METRICS.forEach(metric => {
+      const { sums, squares, ewma } = state.columns[metric];
+      for (let i = from; i < list.length; i++) {
+        const value = list[i][metric];
+        sums[i + 1] = sums[i] + value;
+        squares[i + 1] = squares[i] + value * value;
+      }
+      // La EWMA arranca con la media simple de las primeras `window` sesiones, no con la más antigua cargada
+      ROLLING_WINDOWS.forEach(window => {
+        const column = ewma[window];
+        const alpha = 2 / (window + 1);
+        for (let i = from; i < list.length; i++) {
+          if (i + 1 < window) column[i] = NaN;
+          else if (i + 1 === window) column[i] = sums[window] / window;
+          else column[i] = column[i - 1] + alpha * (list[i][metric] - column[i - 1]);
+        }
+      });
+    });
+    state.list = list;
+    return state;
+  };
+
+  // Valor en la sesión i (posición en la lista completa del trader) con la ventana terminada en ella
+  const rollingValueAt = (state, { metric, stat, window }, i) => {
+    if (i < 0 || i >= state.list.length || i + 1 < window) return NaN;
+    const { sums, squares, ewma } = state.columns[metric];
+    if (stat === 'ewma') return ewma[window][i];
+    const mean = (sums[i + 1] - sums[i + 1 - window]) / window;
+    if (stat === 'media') return mean;
+    return Math.sqrt(Math.max((squares[i + 1] - squares[i + 1 - window]) / window - mean * mean, 0));
+  };
+
+  // Sesión de la lista completa que representa cada punto de la serie
+  const seriesSessionIndices = (list, filtered, view) => {
+    const indices = new Int32Array(view.labels.length);
+    const offset = rangeOffsetOf(list, filtered);
+    view.labels.forEach((label, i) => {
+      if (view.ends[i] >= 0) {
+        indices[i] = offset + view.ends[i];
+        return;
+      }
+      const [y, m, d] = label.split('-').map(Number);
+      const endKey = view.granularity === 'day' ? label : view.granularity === 'month' ? `${label}-31` : formatDayKey(new Date(y, m - 1, d + 6));
+      const last = upperBound(list, { dayKey: endKey }, compareDays) - 1;
+      indices[i] = last >= 0 && list[last].dayNumber !== null && chartBucketKey(list[last], view.granularity) === label ? last : -1;
+    });
+    return indices;
+  };
+
+  // Solo se dibujan las ventanas con historial suficiente en todos los puntos; el resto va a `incomplete`
+  const buildRollingOverlays = (state, overlays, indices) => {
+    const result = { keys: [], values: [], incomplete: [], pending: false };
+    overlays.forEach(id => {
+      const overlay = parseRollingOverlay(id);
+      const column = new Float64Array(indices.length);
+      let complete = true;
+      indices.forEach((index, i) => {
+        column[i] = rollingValueAt(state, overlay, index);
+        if (index >= 0 && Number.isNaN(column[i])) complete = false;
+      });
+      if (complete) {
+        result.keys.push(id);
+        result.values.push(column);
+      } else {
+        result.incomplete.push(id);
+      }
+    });
+    return result;
+  };
+
+  // --- Correlación y atribución (columnar) ---
+  const ATTRIBUTION_INPUTS = ['ic', 'energia', 'presencia', 'revisadoPlan', 'ritualCoherencia'];
+  const ATTRIBUTION_OUTCOMES = ['pnl', 'eficiencia', 'respetoStopTP'];
+  // Estadísticos condicionados: grupos por estado del sistema nervioso, por Sí/No y por tramos
+  const ATTRIBUTION_FACTORS = ['estadoSistemaNervioso', 'revisadoPlan', 'ritualCoherencia', 'ic', 'energia', 'presencia'];
+  const ATTRIBUTION_BANDS = { ic: [50, 70], energia: [5, 8], presencia: [5, 8] };
+  const NERVOUS_STATES = ['ventral', 'simpatico', 'dorsal'];
+  const ATTRIBUTION_MIN_PAIRS = 3;
+
+  const yesNo = (value) => (value === 'Sí' ? 1 : value === 'No' ? 0 : NaN);
+  const nervousStateOf = (estado) => (estado.includes('Dorsal') ? 2 : estado.includes('Simpático') ? 1 : estado.includes('Ventral') ? 0 : -1);
+  const bandOf = (value, bands) => {
+    let band = 0;
+    while (band < bands.length && value >= bands[band]) band++;
+    return band;
+  };
+
+  // Valores (Float64Array, NaN sin dato) y grupo de cada factor (Int8Array, -1 sin dato)
+  const ATTRIBUTION_VALUES = ['ic', 'energia', 'presencia', 'revisadoPlan', 'ritualCoherencia', 'pnl', 'eficiencia', 'respetoStopTP', 'entradasPlan', 'entradasTotales'];
+  const ATTRIBUTION_BYTES_PER_RECORD = ATTRIBUTION_VALUES.length * 8 + ATTRIBUTION_FACTORS.length;
+
+  const attributionGroupsOf = (factor) => (factor === 'estadoSistemaNervioso' ? NERVOUS_STATES.length : ATTRIBUTION_BANDS[factor] ? ATTRIBUTION_BANDS[factor].length + 1 : 2);
+
+  const createAttributionColumns = () => ({ list: EMPTY_LIST, capacity: 0, values: {}, groups: {} });
+
+  const updateAttributionColumns = (state, list) => {
+    if (state.list === list) return state;
+    const from = firstChangedIndex(state.list, list);
+    if (list.length > state.capacity) {
+      const capacity = columnCapacity(state.capacity, list.length);
+      ATTRIBUTION_VALUES.forEach(name => { state.values[name] = growColumn(state.values[name], capacity); });
+      ATTRIBUTION_FACTORS.forEach(factor => { state.groups[factor] = growColumn(state.groups[factor], capacity, Int8Array); });
+      state.capacity = capacity;
+    }
+    // Una sola lectura de cada registro; a partir de aquí todo se hace sobre las columnas
+    const values = state.values;
+    const groups = state.groups;
+    for (let i = from; i < list.length; i++) {
+      const audit = list[i];
+      const plan = yesNo(audit.revisadoPlan);
+      const ritual = yesNo(audit.ritualCoherencia);
+      values.ic[i] = audit.ic;
+      values.energia[i] = audit.energia;
+      values.presencia[i] = audit.presencia;
+      values.revisadoPlan[i] = plan;
+      values.ritualCoherencia[i] = ritual;
+      values.pnl[i] = audit.pnl;
+      values.eficiencia[i] = planEfficiency(audit.entradasPlan, audit.entradasTotales);
+      values.entradasPlan[i] = audit.entradasPlan;
+      values.entradasTotales[i] = audit.entradasTotales;
+      values.respetoStopTP[i] = audit.respetoStopTP === null ? NaN : audit.respetoStopTP;
+      groups.estadoSistemaNervioso[i] = nervousStateOf(audit.estadoSistemaNervioso);
+      groups.revisadoPlan[i] = plan !== plan ? -1 : plan;
+      groups.ritualCoherencia[i] = ritual !== ritual ? -1 : ritual;
+      groups.ic[i] = bandOf(audit.ic, ATTRIBUTION_BANDS.ic);
+      groups.energia[i] = bandOf(audit.energia, ATTRIBUTION_BANDS.energia);
+      groups.presencia[i] = bandOf(audit.presencia, ATTRIBUTION_BANDS.presencia);
+    }
+    state.list = list;
+    return state;
+  };
+
+  // Pearson por pares, desplazado al primer par válido
+  const pearson = (x, y, from, to) => {
+    let n = 0;
+    let kx = 0;
+    let ky = 0;
+    let sx = 0;
+    let sy = 0;
+    let sxx = 0;
+    let syy = 0;
+    let sxy = 0;
+    for (let i = from; i < to; i++) {
+      const xi = x[i];
+      const yi = y[i];
+      if (xi !== xi || yi !== yi) continue;
+      if (n === 0) {
+        kx = xi;
+        ky = yi;
+      }
+      const dx = xi - kx;
+      const dy = yi - ky;
+      n++;
+      sx += dx;
+      sy += dy;
+      sxx += dx * dx;
+      syy += dy * dy;
+      sxy += dx * dy;
+    }
+    const denominator = Math.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy));
+    return { r: n >= ATTRIBUTION_MIN_PAIRS && denominator > 0 ? (n * sxy - sx * sy) / denominator : NaN, n };
+  };
+
+  // Acumuladores por grupo: sesiones, suma PnL, ganadoras, entradas en plan / totales, suma/recuento de respeto
+  const GROUP_STRIDE = 7;
+
+  const summarizeGroup = (acc, base, pnlMedio) => {
+    const count = acc[base];
+    const pnlTotal = acc[base + 1];
+    return {
+      count,
+      pnlTotal,
+      pnlMedio: count > 0 ? pnlTotal / count : NaN,
+      aciertos: count > 0 ? acc[base + 2] / count : NaN,
+      eficiencia: planEfficiency(acc[base + 3], acc[base + 4]),
+      respetoMedio: acc[base + 6] > 0 ? acc[base + 5] / acc[base + 6] : NaN,
+      // PnL del grupo por encima (o por debajo) de lo que daría la media del rango: suma cero entre grupos
+      exceso: count > 0 ? pnlTotal - count * pnlMedio : 0
+    };
+  };
+
+  const analyzeAttribution = (state, from, to) => {
+    const { pnl, entradasPlan, entradasTotales, respetoStopTP } = state.values;
+    // Acumuladores del total y de cada grupo en un solo Float64Array
+    const factorGroups = ATTRIBUTION_FACTORS.map(factor => state.groups[factor]);
+    const offsets = new Int32Array(ATTRIBUTION_FACTORS.length);
+    let size = GROUP_STRIDE;
+    ATTRIBUTION_FACTORS.forEach((factor, f) => {
+      offsets[f] = size;
+      size += attributionGroupsOf(factor) * GROUP_STRIDE;
+    });
+    const acc = new Float64Array(size);
+    const factorCount = factorGroups.length;
+    for (let i = from; i < to; i++) {
+      const value = pnl[i];
+      const win = value > 0 ? 1 : 0;
+      const plan = entradasPlan[i];
+      const entries = entradasTotales[i];
+      const stop = respetoStopTP[i];
+      const hasStop = stop === stop ? 1 : 0;
+      const stopValue = hasStop ? stop : 0;
+      let base = 0;
+      for (let f = -1; f < factorCount; f++) {
+        if (f >= 0) {
+          const group = factorGroups[f][i];
+          if (group < 0) continue;
+          base = offsets[f] + group * GROUP_STRIDE;
+        }
+        acc[base] += 1;
+        acc[base + 1] += value;
+        acc[base + 2] += win;
+        acc[base + 3] += plan;
+        acc[base + 4] += entries;
+        acc[base + 5] += stopValue;
+        acc[base + 6] += hasStop;
+      }
+    }
+    const overall = summarizeGroup(acc, 0, acc[0] > 0 ? acc[1] / acc[0] : 0);
+
+    const correlations = [];
+    ATTRIBUTION_INPUTS.forEach(input => {
+      ATTRIBUTION_OUTCOMES.forEach(outcome => {
+        correlations.push({ input, outcome, ...pearson(state.values[input], state.values[outcome], from, to) });
+      });
+    });
+
+    const factors = ATTRIBUTION_FACTORS.map((factor, f) => {
+      const groups = [];
+      for (let group = 0; group < attributionGroupsOf(factor); group++) {
+        groups.push(summarizeGroup(acc, offsets[f] + group * GROUP_STRIDE, overall.pnlMedio));
+      }
+      return { factor, groups };
+    });
+
+    return { total: to - from, overall, correlations, factors };
+  };
+
+  // --- Búsqueda de texto en las narrativas de sesión ---
+  const SEARCH_FIELDS = ['detallesSesion', 'reescrituraNarrativa', 'aprendizajeMentor', 'compromisoManana', 'sensacionCorporal'];
+  const SEARCH_MAX_TERMS = 300;
+  const SEARCH_SNIPPET_CHARS = 160;
+  const SEARCH_WORD = /[\p{L}\p{N}]+/gu;
+  const SEARCH_STOPWORDS = new Set([
+    'a', 'al', 'algo', 'con', 'de', 'del', 'el', 'en', 'es', 'esta', 'este', 'esto', 'ha', 'la', 'las', 'le', 'lo', 'los',
+    'me', 'mi', 'más', 'muy', 'no', 'o', 'para', 'pero', 'por', 'que', 'se', 'si', 'sin', 'su', 'sus', 'te', 'tu', 'un',
+    'una', 'uno', 'y', 'ya', 'yo', 'hoy', 'fue', 'era', 'he', 'hay', 'como', 'cuando', 'sobre', 'entre', 'nos', 'the', 'and', 'of', 'to'
+  ]);
+  // De más largo a más corto: se quita el primero que encaje dejando una raíz de al menos 3 letras
+  const SEARCH_SUFFIXES = [
+    'amientos', 'imientos', 'aciones', 'uciones', 'amiento', 'imiento', 'idades', 'adoras', 'adores', 'ancias', 'encias',
+    'acion', 'ucion', 'mente', 'adora', 'ancia', 'encia', 'ables', 'ibles', 'istas', 'ismos', 'ador', 'idad', 'able',
+    'ible', 'ista', 'ismo', 'osas', 'osos', 'osa', 'oso'
+  ];
+
+  const foldSearchText = (text) => text.toLowerCase().normalize('NFD').replace(/[\u0300-\u036f]/g, '');
+
+  const stemSearchTerm = (word) => {
+    if (word.length <= 3 || /^\d+$/.test(word)) return word;
+    let stem = word;
+    const suffix = SEARCH_SUFFIXES.find(s => stem.endsWith(s) && stem.length - s.length >= 3);
+    if (suffix) stem = stem.slice(0, -suffix.length);
+    else if (stem.endsWith('es') && stem.length > 4) stem = stem.slice(0, -2);
+    else if (stem.endsWith('s') && stem.length > 3) stem = stem.slice(0, -1);
+    if (/[aeo]$/.test(stem) && stem.length > 3) stem = stem.slice(0, -1);
+    return stem;
+  };
+
+  // Devuelve también la posición de cada palabra en el texto original (para el fragmento resaltado)
+  const searchWordsOf = (text) => {
+    const words = [];
+    if (!text) return words;
+    for (const match of String(text).matchAll(SEARCH_WORD)) {
+      const lower = match[0].toLowerCase();
+      if (SEARCH_STOPWORDS.has(lower)) continue;
+      words.push({ term: stemSearchTerm(foldSearchText(lower)), start: match.index, end: match.index + match[0].length });
+    }
+    return words;
+  };
+
+  const tokenizeSearchText = (text) => searchWordsOf(text).map(word => word.term);
+
+  // Términos únicos de un documento, tal y como se guardan en Firestore (campo terminosBusqueda)
+  const searchTermsOf = (data) => {
+    const terms = new Set();
+    SEARCH_FIELDS.forEach(field => tokenizeSearchText(data[field]).forEach(term => terms.add(term)));
+    return Array.from(terms).slice(0, SEARCH_MAX_TERMS);
+  };
+
+  // Postings en arrays paralelos (huecos y frecuencias); slotOf conserva el orden de llegada
+  const createSearchIndex = () => ({
+    slotOf: new Map(),
+    entries: [],
+    freeSlots: [],
+    postings: new Map(),
+    docCount: 0,
+    totalLength: 0,
+    bytes: 0,
+    scores: new Float64Array(0),
+    matched: new Uint8Array(0)
+  });
+
+  const searchTextOf = (record) => SEARCH_FIELDS.map(field => record[field]).join('\n');
+
+  const unindexSearchRecord = (index, id) => {
+    const slot = index.slotOf.get(id);
+    if (slot === undefined) return;
+    const entry = index.entries[slot];
+    entry.terms.forEach((tf, term) => {
+      const posting = index.postings.get(term);
+      const at = posting.slots.indexOf(slot);
+      posting.slots.splice(at, 1);
+      posting.tfs.splice(at, 1);
+      if (posting.slots.length === 0) index.postings.delete(term);
+    });
+    index.entries[slot] = null;
+    index.freeSlots.push(slot);
+    index.slotOf.delete(id);
+    index.docCount -= 1;
+    index.totalLength -= entry.length;
+    index.bytes -= entry.bytes;
+  };
+
+  const removeSearchTraders = (index, keys) => {
+    const ids = [];
+    index.slotOf.forEach((slot, id) => {
+      if (keys.has(index.entries[slot].record.traderKey)) ids.push(id);
+    });
+    ids.forEach(id => unindexSearchRecord(index, id));
+  };
+
+  // Descarta los documentos más antiguos hasta quedar dentro del presupuesto; devuelve cuántos salen
+  const trimSearchIndex = (index, maxBytes) => {
+    const ids = [];
+    let bytes = index.bytes;
+    for (const [id, slot] of index.slotOf) {
+      if (bytes <= maxBytes) break;
+      ids.push(id);
+      bytes -= index.entries[slot].bytes;
+    }
+    ids.forEach(id => unindexSearchRecord(index, id));
+    return ids.length;
+  };
+
+  const indexSearchRecord = (index, record) => {
+    const text = searchTextOf(record);
+    const current = index.slotOf.has(record.id) ? index.entries[index.slotOf.get(record.id)] : null;
+    // Mismo texto (p.ej. un candidato que ya llegó en otra búsqueda): solo se refresca el registro
+    if (current && current.text === text) {
+      current.record = record;
+      return;
+    }
+    unindexSearchRecord(index, record.id);
+    const terms = new Map();
+    let length = 0;
+    SEARCH_FIELDS.forEach(field => tokenizeSearchText(record[field]).forEach(term => {
+      terms.set(term, (terms.get(term) || 0) + 1);
+      length += 1;
+    }));
+    if (length === 0) return;
+    const slot = index.freeSlots.length > 0 ? index.freeSlots.pop() : index.entries.length;
+    // Registro + texto + una entrada de posting (hueco y frecuencia) por término
+    const bytes = estimateRecordBytes(record) + text.length * 2 + terms.size * 48;
+    index.entries[slot] = { record, text, terms, length, bytes };
+    index.slotOf.set(record.id, slot);
+    index.docCount += 1;
+    index.totalLength += length;
+    index.bytes += bytes;
+    terms.forEach((tf, term) => {
+      let posting = index.postings.get(term);
+      if (!posting) {
+        posting = { slots: [], tfs: [] };
+        index.postings.set(term, posting);
+      }
+      posting.slots.push(slot);
+      posting.tfs.push(tf);
+    });
+  };
+
+  // Fragmento del campo con más coincidencias, centrado en la primera; marks = [inicio, fin] relativos
+  const searchSnippetOf = (record, queryTerms) => {
+    let best = null;
+    SEARCH_FIELDS.forEach(field => {
+      const words = searchWordsOf(record[field]).filter(word => queryTerms.has(word.term));
+      if (words.length > 0 && (!best || words.length > best.words.length)) best = { field, words };
+    });
+    if (!best) return { field: null, text: '', marks: [] };
+    const source = record[best.field];
+    const from = Math.max(0, best.words[0].start - 40);
+    const to = Math.min(source.length, from + SEARCH_SNIPPET_CHARS);
+    const marks = best.words.filter(word => word.end <= to).map(word => [word.start - from, word.end - from]);
+    return {
+      field: best.field,
+      text: source.slice(from, to),
+      marks,
+      truncatedStart: from > 0,
+      truncatedEnd: to < source.length
+    };
+  };
+
+  // BM25 (k1 = 1.2, b = 0.75), primero por términos distintos; solo se mantiene el top `limit`
+  const searchAuditIndex = (index, { query, traderKey = '', startDate = '', endDate = '', limit = 50 }) => {
+    const queryTerms = new Set(tokenizeSearchText(query));
+    if (queryTerms.size === 0 || index.docCount === 0) return { total: 0, hits: [] };
+    const avgLength = index.totalLength / index.docCount;
+    const startDay = startDate ? dayNumberFromKey(startDate) : -Infinity;
+    const endDay = endDate ? dayNumberFromKey(endDate) : Infinity;
+    const dated = Boolean(startDate || endDate);
+    if (index.scores.length < index.entries.length) {
+      index.scores = new Float64Array(index.entries.length * 2);
+      index.matched = new Uint8Array(index.entries.length * 2);
+    }
+    const { entries, scores, matched } = index;
+    const touched = [];
+    queryTerms.forEach(term => {
+      const posting = index.postings.get(term);
+      if (!posting) return;
+      const { slots, tfs } = posting;
+      const idf = Math.log(1 + (index.docCount - slots.length + 0.5) / (slots.length + 0.5));
+      for (let i = 0; i < slots.length; i++) {
+        const slot = slots[i];
+        const entry = entries[slot];
+        if (traderKey && entry.record.traderKey !== traderKey) continue;
+        if (dated) {
+          const day = entry.record.dayNumber;
+          if (day === null || day < startDay || day > endDay) continue;
+        }
+        const tf = tfs[i];
+        if (matched[slot] === 0) touched.push(slot);
+        scores[slot] += idf * (tf * 2.2) / (tf + 1.2 * (0.25 + 0.75 * entry.length / avgLength));
+        matched[slot] += 1;
+      }
+    });
+
+    const better = (a, b) => (matched[a] !== matched[b] ? matched[a] > matched[b] : scores[a] > scores[b]);
+    const top = [];
+    touched.forEach(slot => {
+      if (top.length === limit && !better(slot, top[top.length - 1])) return;
+      let i = top.length;
+      while (i > 0 && better(slot, top[i - 1])) i--;
+      top.splice(i, 0, slot);
+      if (top.length > limit) top.pop();
+    });
+    const hits = top.map(slot => {
+      const { record } = entries[slot];
+      return {
+        id: record.id,
+        nombreTrader: record.nombreTrader,
+        traderKey: record.traderKey,
+        dayKey: record.dayKey,
+        score: Math.round(scores[slot] * 100) / 100,
+        matched: matched[slot],
+        snippet: searchSnippetOf(record, queryTerms)
+      };
+    });
+    touched.forEach(slot => {
+      scores[slot] = 0;
+      matched[slot] = 0;
+    });
+    return { total: touched.length, hits };
+  };
+
+  return {
+    normalizeTraderName,
+    pad2,
+    formatDayKey,
+    ISO_DAY,
+    parseLocaleDate,
+    toDayKey,
+    MS_PER_DAY,
+    MINUTES_PER_DAY,
+    DEFAULT_HEATMAP_CONFIG,
+    dayNumberFromKey,
+    createHeatmapLayout,
+    DEFAULT_HEATMAP_LAYOUT,
+    summarizeHeatmapCells,
+    queryTraderHeatmap,
+    EMPTY_AUDIT_STORE,
+    EMPTY_LIST,
+    lowerBound,
+    selectDayRange,
+    normalizeAudit,
+    applyAuditChanges,
+    setTraderHeatmapConfig,
+    TRADER_CACHE_LIMITS,
+    estimateRecordBytes,
+    removeTraders,
+    aggregateTraderHeatmap,
+    buildSeriesView,
+    granularityForSpan,
+    ROLLUP_METRICS,
+    planEfficiency,
+    rollupBucketOf,
+    accumulateRollups,
+    buildRollupSeriesView,
+    COHORT_WINDOW_DAYS,
+    cohortFromKey,
+    cohortDaysOf,
+    cohortStatsOf,
+    ROLLING_METRICS,
+    ROLLING_WINDOWS,
+    ROLLING_STATS,
+    ROLLING_BYTES_PER_RECORD,
+    ROLLING_LOOKBACK,
+    rollingOverlayId,
+    parseRollingOverlay,
+    createRollingState,
+    updateRollingState,
+    rollingValueAt,
+    seriesSessionIndices,
+    buildRollingOverlays,
+    rangeOffsetOf,
+    ATTRIBUTION_INPUTS,
+    ATTRIBUTION_OUTCOMES,
+    ATTRIBUTION_FACTORS,
+    ATTRIBUTION_BANDS,
+    ATTRIBUTION_BYTES_PER_RECORD,
+    createAttributionColumns,
+    updateAttributionColumns,
+    analyzeAttribution,
+    tokenizeSearchText,
+    searchTermsOf,
+    createSearchIndex,
+    indexSearchRecord,
+    removeSearchTraders,
+    trimSearchIndex,
+    searchAuditIndex
+  };
+};
+
+const {
+  normalizeTraderName,
+  pad2,
+  formatDayKey,
+  ISO_DAY,
+  parseLocaleDate,
+  toDayKey,
+  MS_PER_DAY,
+  MINUTES_PER_DAY,
+  DEFAULT_HEATMAP_CONFIG,
+  dayNumberFromKey,
+  createHeatmapLayout,
+  DEFAULT_HEATMAP_LAYOUT,
+  summarizeHeatmapCells,
+  queryTraderHeatmap,
+  EMPTY_AUDIT_STORE,
+  EMPTY_LIST,
+  lowerBound,
+  selectDayRange,
+  normalizeAudit,
+  applyAuditChanges,
+  estimateRecordBytes,
+  buildSeriesView,
+  granularityForSpan,
+  ROLLUP_METRICS,
+  rollupBucketOf,
+  accumulateRollups,
+  COHORT_WINDOW_DAYS,
+  cohortFromKey,
+  cohortDaysOf,
+  cohortStatsOf,
+  ROLLING_METRICS,
+  ROLLING_WINDOWS,
+  ROLLING_STATS,
+  ROLLING_LOOKBACK,
+  rollingOverlayId,
+  parseRollingOverlay,
+  createRollingState,
+  updateRollingState,
+  ATTRIBUTION_INPUTS,
+  ATTRIBUTION_OUTCOMES,
+  ATTRIBUTION_BANDS,
+  createAttributionColumns,
+  updateAttributionColumns,
+  analyzeAttribution,
+  tokenizeSearchText,
+  searchTermsOf,
+  createSearchIndex,
+  indexSearchRecord,
+  searchAuditIndex
+} = createAnalyticsCore();
+
+// Worker de análisis: mensajes select/changes/reset/coverage/heatmapConfig/view/rollups/searchDocs/search; responde result, searchResult, evicted o searchEvicted
+const createAnalyticsHandler = (core, post) => {
+  let store = core.EMPTY_AUDIT_STORE;
+  const searchIndex = core.createSearchIndex();
+  let view = { traderKey: '', startDate: '', endDate: '', chartWidth: 0, rollupPeriod: null, overlays: [] };
+  // Hasta que el hilo principal confirma que ha descargado todo el rango, los datos del trader son parciales
+  const PARTIAL_COVERAGE = { complete: false, total: null };
+  const FULL_COVERAGE = { complete: true, total: null };
+  // traderKey → { bytes, memo, rollups, rolling, columns, coverage }; el orden de inserción es el de uso (el último, el más reciente)
+  const traders = new Map();
+  const createEntry = () => ({ bytes: 0, memo: {}, rollups: {}, rolling: null, columns: null, coverage: PARTIAL_COVERAGE });
+  let selected = '';
+  // Vista de un trader sin entrada (nombre a medio escribir)
+  let scratch = {};
+  let scheduled = false;
+
+  const addBytes = (key, bytes) => {
+    let entry = traders.get(key);
+    if (!entry) {
+      entry = createEntry();
+      traders.set(key, entry);
+    }
+    entry.bytes += bytes;
+  };
+
+  const enforceBudget = () => {
+    let bytes = 0;
+    traders.forEach(entry => { bytes += entry.bytes; });
+    let count = traders.size;
+    const evicted = [];
+    for (const [key, entry] of traders) {
+      if (bytes <= core.TRADER_CACHE_LIMITS.maxBytes && count <= core.TRADER_CACHE_LIMITS.maxTraders) break;
+      if (key === selected || key === view.traderKey) continue;
+      evicted.push(key);
+      bytes -= entry.bytes;
+      count -= 1;
+    }
+    if (evicted.length === 0) return;
+    evicted.forEach(key => traders.delete(key));
+    store = core.removeTraders(store, evicted);
+    core.removeSearchTraders(searchIndex, new Set(evicted));
+    post({ type: 'evicted', traderKeys: evicted }, []);
+  };
+
+  const publish = () => {
+    scheduled = false;
+    const { traderKey, startDate, endDate, chartWidth, rollupPeriod, overlays } = view;
+    const overlaysKey = overlays.join('|');
+    const entry = traderKey ? traders.get(traderKey) : null;
+    const last = entry ? entry.memo : scratch.traderKey === traderKey ? scratch : {};
+    // Rangos largos: la serie sale de los agregados del periodo si ya han llegado
+    const periodRollups = (entry && rollupPeriod && entry.rollups[rollupPeriod]) || null;
+    const list = (traderKey && store.byTrader.get(traderKey)) || core.EMPTY_LIST;
+    const heatmap = traderKey ? store.heatmaps.get(traderKey) : null;
+    const layout = (heatmap && heatmap.layout) || store.heatmapLayouts.get(traderKey) || core.DEFAULT_HEATMAP_LAYOUT;
+    const coverage = entry ? entry.coverage : FULL_COVERAGE;
+    const rangeChanged = traderKey !== last.traderKey || list !== last.list || startDate !== last.startDate || endDate !== last.endDate;
+    const coverageChanged = coverage !== last.coverage;
+    const result = { type: 'result', traderKey, timings: {} };
+    const transfer = [];
+    const time = (name, fn) => {
+      const t0 = performance.now();
+      const value = fn();
+      result.timings[name] = performance.now() - t0;
+      return value;
+    };
+
+    let filtered = last.filtered;
+    if (rangeChanged) {
+      filtered = time('filteredAudits', () => core.selectDayRange(list, startDate, endDate));
+      result.rows = filtered.slice().reverse();
+      result.attribution = time('attribution', () => {
+        const columns = entry ? (entry.columns = entry.columns || core.createAttributionColumns()) : core.createAttributionColumns();
+        core.updateAttributionColumns(columns, list);
+        const from = core.rangeOffsetOf(list, filtered);
+        return core.analyzeAttribution(columns, from, from + filtered.length);
+      });
+    }
+    if (rangeChanged || coverageChanged) result.coverage = { loaded: filtered.length, total: coverage.total, complete: coverage.complete };
+    // Etiquetas y posiciones de los puntos: las columnas se transfieren, esto se queda para las superposiciones
+    let seriesPoints = last.seriesPoints;
+    if (rangeChanged || coverageChanged || chartWidth !== last.chartWidth || periodRollups !== last.periodRollups) {
+      const built = time('chartData', () => (periodRollups
+        ? core.buildRollupSeriesView(periodRollups, rollupPeriod, startDate, endDate, chartWidth)
+        : core.buildSeriesView(filtered, startDate, endDate, chartWidth)));
+      const { granularity, total, labels, ic, presencia, energia, ends } = built;
+      // Los agregados cubren el rango entero; la serie de auditorías solo lo que ya se ha descargado
+      result.series = { granularity, total, labels, ic, presencia, energia, partial: !periodRollups && !coverage.complete };
+      seriesPoints = { granularity, labels, ends };
+      transfer.push(ic.buffer, presencia.buffer, energia.buffer);
+    }
+    if (overlays.length === 0) {
+      if (last.overlaysKey) result.overlays = { keys: [], values: [], incomplete: [], pending: false };
+    } else if (!coverage.complete) {
+      // Con páginas o historial previo por llegar las ventanas saltarían huecos: se esperan al 'complete'
+      if (result.series || overlaysKey !== last.overlaysKey) result.overlays = { keys: [], values: [], incomplete: [], pending: true };
+    } else if (result.series || overlaysKey !== last.overlaysKey) {
+      result.overlays = time('rollingOverlays', () => {
+        const rolling = entry ? (entry.rolling = entry.rolling || core.createRollingState()) : core.createRollingState();
+        core.updateRollingState(rolling, list);
+        return core.buildRollingOverlays(rolling, overlays, core.seriesSessionIndices(list, filtered, seriesPoints));
+      });
+      result.overlays.values.forEach(column => transfer.push(column.buffer));
+    }
+    if (rangeChanged || heatmap !== last.heatmap || layout !== last.layout) {
+      const { totals } = time('heatmapData', () => core.aggregateTraderHeatmap(heatmap, list, startDate, endDate, layout));
+      result.heatmap = { config: layout.config, totals };
+      transfer.push(totals.buffer);
+    }
+    const memo = { traderKey, list, startDate, endDate, coverage, chartWidth, periodRollups, heatmap, layout, filtered, seriesPoints, overlaysKey };
+    if (entry) entry.memo = memo;
+    else scratch = memo;
+    if (result.rows || result.series || result.heatmap || result.overlays || result.attribution || result.coverage) post(result, transfer);
+  };
+
+  // Varios mensajes seguidos (selección + vista + primer snapshot) se resuelven con un solo resultado
+  const schedule = () => {
+    if (scheduled) return;
+    scheduled = true;
+    setTimeout(publish, 0);
+  };
+
+  return (message) => {
+    switch (message.type) {
+      case 'select': {
+        const key = message.traderKey;
+        const entry = traders.get(key) || createEntry();
+        traders.delete(key);
+        traders.set(key, entry);
+        selected = key;
+        // Sesión nueva en el hilo principal: no tiene resultados guardados, la próxima publicación va completa
+        if (message.config) {
+          entry.memo = {};
+          store = core.setTraderHeatmapConfig(store, key, message.config);
+        }
+        enforceBudget();
+        break;
+      }
+      case 'changes': {
+        const changes = message.changes.map(({ type, id, data }) => ({ type, record: core.normalizeAudit(id, data) }));
+        // Tamaño incremental por trader; dentro del lote cuenta la última versión de cada id
+        const recordBytes = (record) => core.estimateRecordBytes(record) + core.ROLLING_BYTES_PER_RECORD + core.ATTRIBUTION_BYTES_PER_RECORD;
+        const latest = new Map();
+        changes.forEach(({ type, record }) => {
+          const previous = latest.has(record.id) ? latest.get(record.id) : store.byId.get(record.id);
+          if (previous) addBytes(previous.traderKey, -recordBytes(previous));
+          if (type !== 'removed') addBytes(record.traderKey, recordBytes(record));
+          latest.set(record.id, type === 'removed' ? null : record);
+        });
+        store = core.applyAuditChanges(store, changes);
+        enforceBudget();
+        break;
+      }
+      // Si el índice se recorta, las búsquedas ya hechas pueden haber perdido candidatos: se vuelven a pedir
+      case 'searchDocs':
+        message.docs.forEach(({ id, data }) => core.indexSearchRecord(searchIndex, core.normalizeAudit(id, data)));
+        if (core.trimSearchIndex(searchIndex, core.TRADER_CACHE_LIMITS.maxSearchBytes) > 0) post({ type: 'searchEvicted' }, []);
+        return;
+      case 'search': {
+        const t0 = performance.now();
+        const { total, hits } = core.searchAuditIndex(searchIndex, message);
+        post({ type: 'searchResult', requestId: message.requestId, total, hits, timings: { search: performance.now() - t0 } }, []);
+        return;
+      }
+      case 'heatmapConfig':
+        store = core.setTraderHeatmapConfig(store, message.traderKey, message.config);
+        break;
+      // Rango nuevo: se descartan los registros del anterior para que la lista del trader no tenga huecos
+      case 'reset': {
+        const key = message.traderKey;
+        const entry = traders.get(key);
+        // Los agregados diarios/semanales eran del rango anterior; los mensuales cubren todo el historial
+        if (entry) Object.assign(entry, { bytes: 0, memo: {}, rollups: { month: entry.rollups.month }, rolling: null, columns: null, coverage: PARTIAL_COVERAGE });
+        const layout = store.heatmapLayouts.get(key);
+        store = core.removeTraders(store, [key]);
+        if (layout) store = core.setTraderHeatmapConfig(store, key, layout.config);
+        break;
+      }
+      // Progreso de la descarga del rango: total de sesiones (count) y/o fin de la paginación
+      case 'coverage': {
+        const entry = traders.get(message.traderKey);
+        if (!entry) return;
+        entry.coverage = {
+          complete: 'complete' in message ? message.complete : entry.coverage.complete,
+          total: 'total' in message ? message.total : entry.coverage.total
+        };
+        break;
+      }
+      case 'view':
+        view = message;
+        break;
+      case 'rollups': {
+        const entry = traders.get(message.traderKey);
+        if (!entry) return;
+        entry.rollups = { ...entry.rollups, [message.period]: message.docs };
+        break;
+      }
+      default:
+        return;
+    }
+    schedule();
+  };
+};
+
+// Worker en línea (Blob); si no arranca, el manejador corre en el hilo principal
+// Si el worker cae a mitad de sesión, onRestart vuelve a pedir los datos: aquí solo se guardan los parámetros de vista
+const createAnalyticsClient = (onResult, onRestart) => {
+  let handle = null;
+  let worker = null;
+  let workerUrl = null;
+  const replay = { selects: new Map(), heatmapConfigs: new Map(), view: null };
+
+  const record = (message) => {
+    switch (message.type) {
+      case 'select': {
+        const previous = replay.selects.get(message.traderKey);
+        replay.selects.delete(message.traderKey);
+        replay.selects.set(message.traderKey, previous && !message.config ? previous : message);
+        break;
+      }
+      case 'heatmapConfig':
+        replay.heatmapConfigs.set(message.traderKey, message);
+        break;
+      case 'view':
+        replay.view = message;
+        break;
+      default:
+        break;
+    }
+  };
+
+  const receive = (result) => {
+    if (result.type === 'evicted') {
+      result.traderKeys.forEach(key => {
+        replay.selects.delete(key);
+        replay.heatmapConfigs.delete(key);
+      });
+    }
+    onResult(result);
+  };
+
+  const runInThread = () => {
+    handle = createAnalyticsHandler(createAnalyticsCore(), receive);
+    // El último trader seleccionado va al final: vuelve a quedar como activo
+    replay.selects.forEach((select, key) => {
+      handle(select);
+      if (replay.heatmapConfigs.has(key)) handle(replay.heatmapConfigs.get(key));
+    });
+    if (replay.view) handle(replay.view);
+  };
+
+  try {
+    const source = `const handle = (${createAnalyticsHandler})((${createAnalyticsCore})(), (message, transfer) => self.postMessage(message, transfer));\n`
+      + 'self.onmessage = (event) => handle(event.data);';
+    workerUrl = URL.createObjectURL(new Blob([source], { type: 'text/javascript' }));
+    worker = new Worker(workerUrl);
+    worker.onmessage = (event) => receive(event.data);
+    worker.onerror = (event) => {
+      console.error("Error en el worker de análisis, se continúa en el hilo principal:", event.message);
+      event.preventDefault();
+      worker.terminate();
+      worker = null;
+      runInThread();
+      onRestart();
+    };
+  } catch (error) {
+    console.error("No se pudo crear el worker de análisis:", error);
+    worker = null;
+    runInThread();
+  }
+
+  return {
+    send: (message) => {
+      record(message);
+      if (worker) worker.postMessage(message);
+      else if (handle) handle(message);
+    },
+    terminate: () => {
+      if (worker) worker.terminate();
+      if (workerUrl) URL.revokeObjectURL(workerUrl);
+      worker = null;
+      handle = null;
+    }
+  };
+};
+
+// Timestamp de Firestore como { seconds, nanoseconds } para el worker
+const toPlainAuditData = (data) => {
+  const plain = {};
+  Object.keys(data).forEach(key => {
+    const value = data[key];
+    plain[key] = value && typeof value.toMillis === 'function' ? { seconds: value.seconds, nanoseconds: value.nanoseconds } : value;
+  });
+  return plain;
+};
+
+const EMPTY_SERIES = {
+  granularity: 'exact',
+  total: 0,
+  labels: [],
+  ic: new Float64Array(0),
+  presencia: new Float64Array(0),
+  energia: new Float64Array(0),
+  partial: false
+};
+const EMPTY_OVERLAYS = { keys: [], values: [], incomplete: [], pending: false };
+const EMPTY_ATTRIBUTION = { total: 0, overall: null, correlations: [], factors: [] };
+const EMPTY_ANALYTICS = {
+  traderKey: '',
+  rows: EMPTY_LIST,
+  series: EMPTY_SERIES,
+  overlays: EMPTY_OVERLAYS,
+  attribution: EMPTY_ATTRIBUTION,
+  coverage: { loaded: 0, total: null, complete: true },
+  heatmap: { config: DEFAULT_HEATMAP_CONFIG, totals: new Float64Array(DEFAULT_HEATMAP_LAYOUT.stride) }
+};
+
+// Una rejilla por configuración del mapa de calor
+const heatmapLayouts = new Map();
+const heatmapLayoutFor = (config) => {
+  const key = JSON.stringify(config);
+  if (!heatmapLayouts.has(key)) heatmapLayouts.set(key, createHeatmapLayout(config));
+  return heatmapLayouts.get(key);
+};
+
+// serverTimestamps: 'estimate' evita que las escrituras pendientes lleguen con createdAt nulo
+const toAuditMessage = (snap, type = 'added') => ({ type, id: snap.id, data: toPlainAuditData(snap.data({ serverTimestamps: 'estimate' })) });
+
+// Consulta paginada del historial sobre los resúmenes (índices en firestore.indexes.json); pageSize 0 = sin límite (count)
+const buildAuditsQuery = ({ traderKey, startDate, endDate, cursor, pageSize = AUDITS_PAGE_SIZE }) => {
+  const constraints = [where('nombreTraderKey', '==', traderKey)];
+  if (startDate) constraints.push(where('fechaAuditoria', '>=', startDate));
+  if (endDate) constraints.push(where('fechaAuditoria', '<=', endDate));
+  // Firestore exige ordenar primero por el campo con desigualdad
+  if (startDate || endDate) constraints.push(orderBy('fechaAuditoria', 'desc'));
+  constraints.push(orderBy('createdAt', 'desc'));
+  if (cursor) constraints.push(startAfter(cursor));
+  if (pageSize > 0) constraints.push(limit(pageSize));
+  return query(summariesCollection(), ...constraints);
+};
+
+// Sesiones justo antes del rango para las ventanas móviles (mismo índice que el historial)
+const buildLookbackQuery = ({ traderKey, startDate }) => query(
+  summariesCollection(),
+  where('nombreTraderKey', '==', traderKey),
+  where('fechaAuditoria', '<', startDate),
+  orderBy('fechaAuditoria', 'desc'),
+  orderBy('createdAt', 'desc'),
+  limit(ROLLING_LOOKBACK)
+);
+
+// Candidatos de búsqueda con array-contains-any (índices en firestore.indexes.json)
+const SEARCH_FETCH_LIMIT = 500;
+const SEARCH_MAX_QUERY_TERMS = 30;
+
+const buildSearchQuery = ({ terms, traderKey, startDate, endDate }) => {
+  const constraints = [where('terminosBusqueda', 'array-contains-any', terms)];
+  if (traderKey) constraints.push(where('nombreTraderKey', '==', traderKey));
+  if (startDate) constraints.push(where('fechaAuditoria', '>=', startDate));
+  if (endDate) constraints.push(where('fechaAuditoria', '<=', endDate));
+  if (startDate || endDate) constraints.push(orderBy('fechaAuditoria', 'desc'));
+  constraints.push(orderBy('createdAt', 'desc'));
+  constraints.push(limit(SEARCH_FETCH_LIMIT));
+  return query(auditsCollection(), ...constraints);
+};
+
+// Términos únicos de la consulta, los más largos (más selectivos) primero
+const searchQueryTerms = (text) => Array.from(new Set(tokenizeSearchText(text)))
+  .sort((a, b) => b.length - a.length || (a < b ? -1 : a > b ? 1 : 0));
+
+// Periodo de agregados que necesita el rango visible; hasta 90 días la serie usa las sesiones
+const rollupPeriodFor = (monthRollups, startDate, endDate) => {
+  const firstKey = startDate || (monthRollups && monthRollups.length > 0 ? monthRollups[0].inicio : '');
+  if (!firstKey) return null;
+  const lastKey = endDate || formatDayKey(new Date());
+  const granularity = granularityForSpan(dayNumberFromKey(lastKey) - dayNumberFromKey(firstKey) + 1);
+  return granularity === 'exact' ? null : granularity;
+};
+
+// Agregados diarios o semanales del rango (los mensuales se siguen enteros)
+const buildRangeRollupsQuery = ({ traderKey, period, startDate, endDate }) => {
+  const constraints = [where('nombreTraderKey', '==', traderKey), where('periodo', '==', period)];
+  if (startDate) {
+    const periodStart = rollupBucketOf({ dayKey: startDate, dayNumber: dayNumberFromKey(startDate) }, period).inicio;
+    constraints.push(where('inicio', '>=', periodStart));
+  }
+  if (endDate) constraints.push(where('inicio', '<=', endDate));
+  return query(rollupsCollection(), ...constraints, orderBy('inicio'));
+};
+
+// --- Sesiones por trader (caché LRU del panel de coach) ---
+const EMPTY_TRADER_SESSION = { ready: false, monthRollups: null, analytics: EMPTY_ANALYTICS };
+
+const createTraderSessions = (send) => {
+  let sessions = new Map();
+  const listeners = new Set();
+  // traderKey → { startDate, endDate, rangeKey, generation, rangeRollupsKey, stopHistory, stopMonth, stopRangeRollups }
+  const live = new Map();
+
+  const update = (key, patch) => {
+    if (!live.has(key)) return;
+    sessions = new Map(sessions);
+    sessions.set(key, { ...(sessions.get(key) || EMPTY_TRADER_SESSION), ...patch });
+    listeners.forEach(listener => listener());
+  };
+
+  // Primera página en vivo; el resto del rango se descarga en segundo plano (loadRange)
+  const watchHistory = (key, entry) => {
+    if (entry.stopHistory) entry.stopHistory();
+    const generation = entry.generation;
+    let firstPage = true;
+    const stopFirstSnapshot = perfMonitor.start('firestore:firstSnapshot');
+    entry.stopHistory = onSnapshot(buildAuditsQuery({ traderKey: key, startDate: entry.startDate, endDate: entry.endDate }), (snapshot) => {
+      const docChanges = snapshot.docChanges();
+      const changes = docChanges.filter(change => change.type !== 'removed').map(change => toAuditMessage(change.doc, change.type));
+      if (changes.length > 0) send({ type: 'changes', traderKey: key, changes });
+      // Un 'removed' puede ser paginación: se confirma en el servidor antes de borrar
+      docChanges.filter(change => change.type === 'removed').forEach(change => {
+        getDocFromServer(change.doc.ref).then(snap => {
+          if (live.get(key) !== entry || entry.generation !== generation) return;
+          send({ type: 'changes', traderKey: key, changes: [snap.exists() ? toAuditMessage(snap, 'modified') : toAuditMessage(change.doc, 'removed')] });
+        }, (error) => console.error("Error en Firestore:", error));
+      });
+      if (firstPage) {
+        firstPage = false;
+        stopFirstSnapshot();
+        update(key, { ready: true });
+      }
+    }, (error) => console.error("Error en Firestore:", error));
+  };
+
+  // Recorre los cursores hasta completar el rango; el worker marca los datos como parciales hasta el 'complete'
+  const loadRange = async (key, entry, fromCache = false) => {
+    const generation = entry.generation;
+    const stale = () => live.get(key) !== entry || entry.generation !== generation;
+    const range = { traderKey: key, startDate: entry.startDate, endDate: entry.endDate };
+    const getPage = fromCache ? getDocsFromCache : getDocs;
+    const counted = getCountFromServer(buildAuditsQuery({ ...range, pageSize: 0 })).then(snapshot => {
+      const total = snapshot.data().count;
+      if (!stale()) send({ type: 'coverage', traderKey: key, total });
+      return total;
+    }, (error) => {
+      console.error("Error en Firestore:", error);
+      return null;
+    });
+    try {
+      // Historial previo para las ventanas móviles; si hay menos, el trader no tiene más sesiones anteriores
+      if (range.startDate) {
+        const lookback = await getPage(buildLookbackQuery(range));
+        if (stale()) return;
+        if (lookback.size > 0) send({ type: 'changes', traderKey: key, changes: lookback.docs.map(snap => toAuditMessage(snap)) });
+      }
+      let cursor = null;
+      let loaded = 0;
+      do {
+        const page = await getPage(buildAuditsQuery({ ...range, cursor, pageSize: RANGE_PAGE_SIZE }));
+        if (stale()) return;
+        if (page.size > 0) send({ type: 'changes', traderKey: key, changes: page.docs.map(snap => toAuditMessage(snap)) });
+        loaded += page.size;
+        cursor = page.size === RANGE_PAGE_SIZE ? page.docs[page.size - 1] : null;
+      } while (cursor);
+      // La caché local puede haber descartado documentos: si no cuadra con el count, se completa desde el servidor
+      if (fromCache) {
+        const total = await counted;
+        if (stale()) return;
+        if (total !== null && loaded < total) {
+          loadRange(key, entry);
+          return;
+        }
+      }
+      send({ type: 'coverage', traderKey: key, complete: true });
+    } catch (error) {
+      console.error("Error en Firestore:", error);
+    }
+  };
+
+  const watchRangeRollups = (key, entry) => {
+    const period = rollupPeriodFor(sessions.get(key).monthRollups, entry.startDate, entry.endDate);
+    const rangeRollupsKey = period === 'day' || period === 'week' ? `${period}:${entry.rangeKey}` : null;
+    if (rangeRollupsKey === entry.rangeRollupsKey) return;
+    if (entry.stopRangeRollups) entry.stopRangeRollups();
+    entry.stopRangeRollups = null;
+    entry.rangeRollupsKey = rangeRollupsKey;
+    if (!rangeRollupsKey) return;
+    entry.stopRangeRollups = onSnapshot(buildRangeRollupsQuery({ traderKey: key, period, startDate: entry.startDate, endDate: entry.endDate }), (snapshot) => {
+      send({ type: 'rollups', traderKey: key, period, docs: snapshot.docs.map(snap => toPlainAuditData(snap.data())) });
+    }, (error) => console.error("Error en Firestore:", error));
+  };
+
+  const watchMonthRollups = (key, entry) => {
+    const q = query(rollupsCollection(), where('nombreTraderKey', '==', key), where('periodo', '==', 'month'), orderBy('inicio'));
+    entry.stopMonth = onSnapshot(q, (snapshot) => {
+      const docs = snapshot.docs.map(snap => toPlainAuditData(snap.data()));
+      update(key, { monthRollups: docs });
+      send({ type: 'rollups', traderKey: key, period: 'month', docs });
+      watchRangeRollups(key, entry);
+    }, (error) => console.error("Error en Firestore:", error));
+  };
+
+  const close = (keys) => {
+    keys.forEach(key => {
+      const entry = live.get(key);
+      if (!entry) return;
+      [entry.stopHistory, entry.stopMonth, entry.stopRangeRollups].forEach(stop => stop && stop());
+      live.delete(key);
+    });
+    const next = new Map(sessions);
+    keys.forEach(key => next.delete(key));
+    if (next.size === sessions.size) return;
+    sessions = next;
+    listeners.forEach(listener => listener());
+  };
+
+  return {
+    get: (key) => sessions.get(key) || EMPTY_TRADER_SESSION,
+    subscribe: (listener) => {
+      listeners.add(listener);
+      return () => listeners.delete(listener);
+    },
+    // Trader activo: abre su sesión si no está en caché y sigue el rango de fechas visible
+    open: (key, startDate, endDate) => {
+      let entry = live.get(key);
+      if (!entry) {
+        entry = { startDate, endDate, rangeKey: null, generation: 0, rangeRollupsKey: null, stopHistory: null, stopMonth: null, stopRangeRollups: null };
+        live.set(key, entry);
+        update(key, EMPTY_TRADER_SESSION);
+        send({ type: 'select', traderKey: key, config: loadHeatmapConfig(key) });
+        watchMonthRollups(key, entry);
+      } else {
+        send({ type: 'select', traderKey: key });
+      }
+      const rangeKey = JSON.stringify([startDate, endDate]);
+      if (rangeKey === entry.rangeKey) return;
+      if (entry.rangeKey !== null) send({ type: 'reset', traderKey: key });
+      Object.assign(entry, { startDate, endDate, rangeKey, generation: entry.generation + 1 });
+      watchHistory(key, entry);
+      loadRange(key, entry);
+      watchRangeRollups(key, entry);
+    },
+    // Fusiona un resultado del worker con el último guardado de ese trader
+    receive: (result) => {
+      const { analytics } = sessions.get(result.traderKey) || EMPTY_TRADER_SESSION;
+      update(result.traderKey, {
+        analytics: {
+          traderKey: result.traderKey,
+          rows: result.rows || analytics.rows,
+          series: result.series || analytics.series,
+          overlays: result.overlays || analytics.overlays,
+          attribution: result.attribution || analytics.attribution,
+          coverage: result.coverage || analytics.coverage,
+          heatmap: result.heatmap || analytics.heatmap
+        }
+      });
+    },
+    // El worker se reinició sin datos: cada sesión abierta vuelve a suscribirse y a descargar su rango (primero desde la caché local)
+    reload: () => {
+      live.forEach((entry, key) => {
+        [entry.stopHistory, entry.stopMonth, entry.stopRangeRollups].forEach(stop => stop && stop());
+        Object.assign(entry, { generation: entry.generation + 1, rangeRollupsKey: null, stopRangeRollups: null });
+        watchMonthRollups(key, entry);
+        watchHistory(key, entry);
+        loadRange(key, entry, true);
+        watchRangeRollups(key, entry);
+      });
+    },
+    close,
+    closeAll: () => close(Array.from(live.keys()))
+  };
+};
+
+// Directorio de traders ordenado por nombre normalizado
+const compareTraders = (a, b) => (a.key < b.key ? -1 : a.key > b.key ? 1 : 0);
+
+const sameSession = (a, b) => (a === b) || (Boolean(a) && Boolean(b) && a.fecha === b.fecha && a.hora === b.hora && a.ic === b.ic);
+
+const toTraderEntry = (snap) => {
+  const data = snap.data({ serverTimestamps: 'estimate' });
+  return {
+    key: snap.id,
+    nombreTrader: data.nombreTrader || snap.id,
+    ultimaSesion: data.ultimaSesion || null,
+    cohorte: data.cohorte || {},
+    // Cambia con cada auditoría nueva y con cada reconstrucción de agregados
+    version: `${data.ultimaAuditoria && typeof data.ultimaAuditoria.toMillis === 'function' ? data.ultimaAuditoria.toMillis() : 0}:${data.versionAgregados || 0}`
+  };
+};
+
+const applyTraderChanges = (list, changes) => {
+  if (changes.length === 0) return list;
+  const next = list.slice();
+  changes.forEach(change => {
+    const entry = toTraderEntry(change.doc);
+    const index = lowerBound(next, entry, compareTraders);
+    const exists = next[index]?.key === entry.key;
+    if (change.type === 'removed') {
+      if (exists) next.splice(index, 1);
+    } else if (exists) {
+      const current = next[index];
+      if (current.nombreTrader !== entry.nombreTrader || current.version !== entry.version || !sameSession(current.ultimaSesion, entry.ultimaSesion)) {
+        next[index] = entry;
+      }
+    } else {
+      next.splice(index, 0, entry);
+    }
+  });
+  return next;
+};
+
+// Migración de registros antiguos: claves de trader, términos de búsqueda y directorio
+const backfillTraderIndex = async (onProgress) => {
+  let cursor = null;
+  let processed = 0;
+  const traders = new Map();
+  for (;;) {
+    const constraints = [orderBy(documentId())];
+    if (cursor) constraints.push(startAfter(cursor));
+    constraints.push(limit(BATCH_SIZE));
+    const page = await getDocs(query(auditsCollection(), ...constraints));
+    if (page.empty) break;
+
+    const batch = writeBatch(db);
+    page.docs.forEach(snap => {
+      const data = snap.data();
+      const key = normalizeTraderName(data.nombreTrader);
+      if (!key) return;
+      traders.set(key, data.nombreTrader.trim());
+      const patch = {};
+      if (data.nombreTraderKey !== key) patch.nombreTraderKey = key;
+      const terms = searchTermsOf(data);
+      if ((data.terminosBusqueda || []).join(' ') !== terms.join(' ')) patch.terminosBusqueda = terms;
+      if (!data.createdAt) patch.createdAt = data.timestampSesion || serverTimestamp();
+      if (!data.fechaAuditoria) {
+        const dayKey = toDayKey(data);
+        if (dayKey) patch.fechaAuditoria = dayKey;
+      }
+      if (Object.keys(patch).length > 0) batch.update(snap.ref, patch);
+    });
+    await batch.commit();
+
+    processed += page.size;
+    cursor = page.docs[page.docs.length - 1];
+    if (onProgress) onProgress(processed);
+    if (page.size < BATCH_SIZE) break;
+  }
+
+  const entries = Array.from(traders.entries());
+  for (let i = 0; i < entries.length; i += BATCH_SIZE) {
+    const batch = writeBatch(db);
+    entries.slice(i, i + BATCH_SIZE).forEach(([key, nombreTrader]) => {
+      batch.set(doc(tradersCollection(), key), { nombreTrader, nombreTraderKey: key }, { merge: true });
+    });
+    await batch.commit();
+  }
+  return processed;
+};
+
+// Regenera el resumen de cada auditoría existente
+const backfillAuditSummaries = async (onProgress) => {
+  let cursor = null;
+  let processed = 0;
+  for (;;) {
+    const constraints = [orderBy(documentId())];
+    if (cursor) constraints.push(startAfter(cursor));
+    constraints.push(limit(BATCH_SIZE));
+    const page = await getDocs(query(auditsCollection(), ...constraints));
+    if (page.empty) break;
+
+    const batch = writeBatch(db);
+    page.docs.forEach(snap => {
+      const data = snap.data();
+      if (!data.nombreTraderKey) return;
+      batch.set(doc(summariesCollection(), snap.id), buildAuditSummary(data));
+    });
+    await batch.commit();
+
+    processed += page.size;
+    cursor = page.docs[page.docs.length - 1];
+    if (onProgress) onProgress(processed);
+    if (page.size < BATCH_SIZE) break;
+  }
+  return processed;
+};
+
+// --- Agregados por trader: increment() en el lote y extremos en transacción ---
+const ROLLUP_WRITES_PER_AUDIT = 3;
+
+const toRollupIncrement = (rollup) => {
+  const data = {
+    nombreTraderKey: rollup.nombreTraderKey,
+    nombreTrader: rollup.nombreTrader,
+    periodo: rollup.periodo,
+    clave: rollup.clave,
+    inicio: rollup.inicio,
+    count: increment(rollup.count),
+    planSi: increment(rollup.planSi),
+    ritualSi: increment(rollup.ritualSi),
+    dorsalSi: increment(rollup.dorsalSi),
+    entradasTotales: increment(rollup.entradasTotales),
+    entradasPlan: increment(rollup.entradasPlan),
+    actualizado: serverTimestamp()
+  };
+  ROLLUP_METRICS.forEach(metric => {
+    data[metric] = { suma: increment(rollup[metric].suma) };
+  });
+  return data;
+};
+
+const addRollupWrites = (batch, rollups) => {
+  rollups.forEach((rollup, id) => batch.set(doc(rollupsCollection(), id), toRollupIncrement(rollup), { merge: true }));
+};
+
+// Entrada del directorio con los días de cohorte sumados con increment(); un mapa vacío con merge borraría el campo
+const addDirectoryWrites = (batch, traders, rollups) => {
+  const cohortDays = cohortDaysOf(rollups, cohortFromKey());
+  traders.forEach((nombreTrader, key) => {
+    const data = { nombreTrader, nombreTraderKey: key, ultimaAuditoria: serverTimestamp() };
+    if (cohortDays.has(key)) {
+      data.cohorte = {};
+      Object.entries(cohortDays.get(key)).forEach(([day, totals]) => {
+        data.cohorte[day] = {
+          sesiones: increment(totals.sesiones),
+          pnl: increment(totals.pnl),
+          planSi: increment(totals.planSi),
+          dorsalSi: increment(totals.dorsalSi)
+        };
+      });
+    }
+    batch.set(doc(tradersCollection(), key), data, { merge: true });
+  });
+};
+
+// Última sesión de cada trader (por fecha y hora de inicio) para el directorio del panel de coach
+const sessionOrderKey = (session) => `${session.fecha} ${session.hora}`;
+
+const latestSessionsOf = (audits) => {
+  const latest = new Map();
+  audits.forEach(audit => {
+    if (!audit.dayKey || !audit.traderKey) return;
+    const session = { fecha: audit.dayKey, hora: audit.horaInicioSesion, ic: audit.ic };
+    const current = latest.get(audit.traderKey);
+    if (!current || sessionOrderKey(session) >= sessionOrderKey(current)) latest.set(audit.traderKey, session);
+  });
+  return latest;
+};
+
+// Extremos (min/max), última sesión de cada trader y poda de los días que salen de la cohorte
+const mergeRollupExtremes = (rollups, latestSessions = new Map()) => runTransaction(db, async (transaction) => {
+  const fromKey = cohortFromKey();
+  const entries = Array.from(rollups, ([id, rollup]) => ({ ref: doc(rollupsCollection(), id), rollup }));
+  const traders = Array.from(latestSessions, ([key, session]) => ({ ref: doc(tradersCollection(), key), session }));
+  const snaps = await Promise.all(entries.map(({ ref }) => transaction.get(ref)));
+  const traderSnaps = await Promise.all(traders.map(({ ref }) => transaction.get(ref)));
+  traders.forEach(({ ref, session }, i) => {
+    const data = traderSnaps[i].exists() ? traderSnaps[i].data() : {};
+    const patch = {};
+    if (!data.ultimaSesion || sessionOrderKey(session) >= sessionOrderKey(data.ultimaSesion)) patch.ultimaSesion = session;
+    const expired = Object.keys(data.cohorte || {}).filter(day => day < fromKey);
+    if (expired.length > 0) patch.cohorte = Object.fromEntries(expired.map(day => [day, deleteField()]));
+    if (Object.keys(patch).length > 0) transaction.set(ref, patch, { merge: true });
+  });
+  entries.forEach(({ ref, rollup }, i) => {
+    const current = snaps[i].exists() ? snaps[i].data() : {};
+    const patch = {};
+    ROLLUP_METRICS.forEach(metric => {
+      const stored = current[metric] || {};
+      const { min, max } = rollup[metric];
+      patch[metric] = {
+        min: typeof stored.min === 'number' ? Math.min(stored.min, min) : min,
+        max: typeof stored.max === 'number' ? Math.max(stored.max, max) : max
+      };
+    });
+    transaction.set(ref, patch, { merge: true });
+  });
+});
+
+// Recalcula todos los agregados desde los resúmenes
+const rebuildRollups = async (onProgress) => {
+  const rollups = new Map();
+  const latestSessions = new Map();
+  let cursor = null;
+  let processed = 0;
+  for (;;) {
+    const constraints = [orderBy(documentId())];
+    if (cursor) constraints.push(startAfter(cursor));
+    constraints.push(limit(BATCH_SIZE));
+    const page = await getDocs(query(summariesCollection(), ...constraints));
+    if (page.empty) break;
+    const audits = page.docs.map(snap => normalizeAudit(snap.id, snap.data()));
+    audits.forEach(audit => accumulateRollups(rollups, audit));
+    latestSessionsOf(audits).forEach((session, key) => {
+      const current = latestSessions.get(key);
+      if (!current || sessionOrderKey(session) >= sessionOrderKey(current)) latestSessions.set(key, session);
+    });
+    processed += page.size;
+    cursor = page.docs[page.docs.length - 1];
+    if (onProgress) onProgress(processed);
+    if (page.size < BATCH_SIZE) break;
+  }
+
+  const stale = [];
+  cursor = null;
+  for (;;) {
+    const constraints = [orderBy(documentId())];
+    if (cursor) constraints.push(startAfter(cursor));
+    constraints.push(limit(BATCH_SIZE));
+    const page = await getDocs(query(rollupsCollection(), ...constraints));
+    if (page.empty) break;
+    page.docs.forEach(snap => {
+      if (!rollups.has(snap.id)) stale.push(snap.ref);
+    });
+    cursor = page.docs[page.docs.length - 1];
+    if (page.size < BATCH_SIZE) break;
+  }
+
+  const entries = Array.from(rollups.entries());
+  for (let i = 0; i < entries.length; i += BATCH_SIZE) {
+    const batch = writeBatch(db);
+    entries.slice(i, i + BATCH_SIZE).forEach(([id, rollup]) => {
+      batch.set(doc(rollupsCollection(), id), { ...rollup, actualizado: serverTimestamp() });
+    });
+    await batch.commit();
+  }
+  for (let i = 0; i < stale.length; i += BATCH_SIZE) {
+    const batch = writeBatch(db);
+    stale.slice(i, i + BATCH_SIZE).forEach(ref => batch.delete(ref));
+    await batch.commit();
+  }
+  // La cohorte se reemplaza entera y versionAgregados avisa al panel de coach de que los agregados cambiaron
+  const cohortDays = cohortDaysOf(rollups, cohortFromKey());
+  const sessions = Array.from(latestSessions.entries());
+  for (let i = 0; i < sessions.length; i += BATCH_SIZE) {
+    const batch = writeBatch(db);
+    sessions.slice(i, i + BATCH_SIZE).forEach(([key, ultimaSesion]) => {
+      batch.set(doc(tradersCollection(), key), {
+        ultimaSesion,
+        cohorte: cohortDays.get(key) || {},
+        versionAgregados: increment(1)
+      }, { mergeFields: ['ultimaSesion', 'cohorte', 'versionAgregados'] });
+    });
+    await batch.commit();
+  }
+  return { audits: processed, rollups: rollups.size };
+};
+
+// Virtualización de filas de altura fija
+const VIRTUAL_VIEWPORT_HEIGHT = 640;
+const AUDIT_ROW_HEIGHT = 72;
+const REPROGRAMMING_ROW_HEIGHT = 104;
+
+const useVirtualRows = (count, rowHeight, overscan = 6) => {
+  const [scrollTop, setScrollTop] = useState(0);
+  const onScroll = useCallback((e) => setScrollTop(e.currentTarget.scrollTop), []);
+  const end = Math.min(count, Math.ceil((scrollTop + VIRTUAL_VIEWPORT_HEIGHT) / rowHeight) + overscan);
+  const start = Math.min(end, Math.max(0, Math.floor(scrollTop / rowHeight) - overscan));
+  return { onScroll, start, end, padTop: start * rowHeight, padBottom: (count - end) * rowHeight };
+};
+
+const useDebouncedValue = (value, delay) => {
+  const [debounced, setDebounced] = useState(value);
+  useEffect(() => {
+    const timer = setTimeout(() => setDebounced(value), delay);
+    return () => clearTimeout(timer);
+  }, [value, delay]);
+  return debounced;
+};
+
+const createInitialFormState = () => {
+  const today = new Date().toISOString().split('T')[0];
+
+  return {
+    nombreTrader: '', 
+    fechaAuditoria: today,
+    horaInicioSesion: '09:00',
+    energiaMetabolica: 7,
+    ritualCoherencia: 'No',
+    revisadoPlan: 'No', 
+    estadoSistemaNervioso: '🟢 Vagal Ventral (Calma Activa)',
+    indiceCoherenciaIC: 90,
+    sesgosNeuroCognitivos: [],
+    marcadoresSomaticos: [],
+    nivelPresencia: 9,
+    respetoStopTP: 10,
+    dejoCorrerPlan: 10,
+    numEntradasTotales: 0,
+    pnlDia: 0,
+    numEntradasPlan: 0,
+    numEntradasFueraPlan: 0,
+    resultadoConsecuenciaPlan: '', 
+    numPerdidasHoy: 0,
+    aceptoRiesgo: '', // Nuevo campo solicitado para sección 3.1
+    emocionesPorPerdida: {}, 
+    tiposPorPerdida: {},
+    sensacionCorporalPerdida: '',
+    estadoSistemaNerviosoFinal: '',
+    sensacionCorporal: '',
+    detallesSesion: '',
+    emocionesDetectadas: [], 
+    objetivoReal: 'Aprender/Proceso',
+    nivelCoherencia: 5,
+    pnlEmocional: 'He ganado disciplina',
+    anclajeIdentidad: 7,
+    creenciasInstaladas: [],
+    reescrituraNarrativa: '',
+    visualizacionesCierre: [],
+    aprendizajeMentor: '',
+    protocoloReactivacionVagal: '',
+    compromisoManana: ''
+  };
+};
+
+// Documento de auditoría tal como se guarda
+const buildAuditPayload = (formData, createdAt = serverTimestamp()) => {
+  const nombreTrader = formData.nombreTrader.trim();
+  const fechaFormateada = new Date(formData.fechaAuditoria).toLocaleDateString();
+
+  const [año, mes, dia] = formData.fechaAuditoria.split('-');
+  const [horas, minutos] = formData.horaInicioSesion.split(':');
+  const timestampCompleto = new Date(año, mes - 1, dia, horas, minutos);
+
+  return {
+    ...formData,
+    nombreTrader,
+    nombreTraderKey: normalizeTraderName(nombreTrader),
+    terminosBusqueda: searchTermsOf(formData),
+    createdAt: createdAt || timestampCompleto,
+    timestampSesion: timestampCompleto,
+    fechaLocal: fechaFormateada
+  };
+};
+
+const PROTOCOLOS_VAGALES = [
+  { val: "🫁 Respiración 4-7-8 (3 minutos)", color: "border-blue-200 bg-blue-50 text-blue-700" },
+  { val: "🎵 Música + movimiento", color: "border-purple-200 bg-purple-50 text-purple-700" },
+  { val: "🚶 Caminata consciente", color: "border-green-200 bg-green-50 text-green-700" },
+  { val: "🧊 Exposición al frío", color: "border-cyan-200 bg-cyan-50 text-cyan-700" },
+  { val: "🧘 Meditación guiada", color: "border-indigo-200 bg-indigo-50 text-indigo-700" },
+  { val: "❌ Ninguna (omití el cierre)", color: "border-slate-200 bg-slate-50 text-slate-500" }
+];
+
+// Resumen: solo escalares que pintan las vistas
+const AUDIT_SUMMARY_FIELDS = [
+  'nombreTrader', 'nombreTraderKey', 'fechaAuditoria', 'horaInicioSesion', 'timestampSesion', 'fechaLocal', 'createdAt',
+  'indiceCoherenciaIC', 'energiaMetabolica', 'nivelPresencia', 'anclajeIdentidad', 'revisadoPlan', 'ritualCoherencia',
+  'pnlDia', 'numEntradasTotales', 'numEntradasPlan', 'respetoStopTP', 'estadoSistemaNervioso', 'estadoSistemaNerviosoFinal'
+];
+
+const buildAuditSummary = (data) => {
+  const summary = {};
+  AUDIT_SUMMARY_FIELDS.forEach(field => {
+    if (data[field] !== undefined) summary[field] = data[field];
+  });
+  summary.numVisualizacionesCierre = (data.visualizacionesCierre || []).length;
+  summary.tieneNarrativa = Boolean(data.reescrituraNarrativa);
+  summary.tieneCompromiso = Boolean(data.compromisoManana);
+  summary.numCreenciasInstaladas = (data.creenciasInstaladas || []).length;
+  // Índice en PROTOCOLOS_VAGALES (-1: valor libre, solo en el detalle)
+  if (data.protocoloReactivacionVagal) summary.protocoloVagal = PROTOCOLOS_VAGALES.findIndex(({ val }) => val === data.protocoloReactivacionVagal);
+  return summary;
+};
+
+// --- Importación masiva (CSV / JSON con el esquema del formulario) ---
+const IMPORT_PROGRESS_KEY = 'hipnotrading-import:';
+const HORA_HHMM = /^([01]?\d|2[0-3]):[0-5]\d$/;
+
+// CSV con comillas dobles (RFC 4180): separador ',' o ';', comillas escapadas como "".
+const parseCsv = (text) => {
+  const source = text.charCodeAt(0) === 0xfeff ? text.slice(1) : text;
+  const lineEnd = source.indexOf('\n');
+  const firstLine = lineEnd === -1 ? source : source.slice(0, lineEnd);
+  const separator = (firstLine.split(';').length > firstLine.split(',').length) ? ';' : ',';
+  const rows = [];
+  let row = [];
+  let field = '';
+  let quoted = false;
+  for (let i = 0; i < source.length; i++) {
+    const c = source[i];
+    if (quoted) {
+      if (c === '"') {
+        if (source[i + 1] === '"') { field += '"'; i++; }
+        else quoted = false;
+      } else {
+        field += c;
+      }
+    } else if (c === '"') {
+      quoted = true;
+    } else if (c === separator) {
+      row.push(field);
+      field = '';
+    } else if (c === '\n' || c === '\r') {
+      if (c === '\r' && source[i + 1] === '\n') i++;
+      row.push(field);
+      field = '';
+      if (row.length > 1 || row[0] !== '') rows.push(row);
+      row = [];
+    } else {
+      field += c;
+    }
+  }
+  row.push(field);
+  if (row.length > 1 || row[0] !== '') rows.push(row);
+  if (rows.length === 0) return [];
+
+  const header = rows[0].map(h => h.trim());
+  return rows.slice(1).map(cells => {
+    const entry = {};
+    header.forEach((name, i) => { if (name) entry[name] = cells[i] !== undefined ? cells[i] : ''; });
+    return entry;
+  });
+};
+
+const parseImportFile = (fileName, text) => {
+  if (/\.json$/i.test(fileName) || /^\s*[[{]/.test(text)) {
+    const parsed = JSON.parse(text);
+    return Array.isArray(parsed) ? parsed : (parsed.audits || [parsed]);
+  }
+  return parseCsv(text);
+};
+
+// Convierte cada columna al tipo del campo en el formulario
+const coerceImportValue = (value, template) => {
+  if (Array.isArray(template)) {
+    if (Array.isArray(value)) return value.map(String);
+    const text = String(value ?? '').trim();
+    if (!text) return [];
+    if (text.startsWith('[')) return JSON.parse(text).map(String);
+    return text.split('|').map(v => v.trim()).filter(Boolean);
+  }
+  if (template !== null && typeof template === 'object') {
+    if (value && typeof value === 'object') return value;
+    const text = String(value ?? '').trim();
+    return text ? JSON.parse(text) : {};
+  }
+  if (typeof template === 'number') {
+    if (value === '' || value === null || value === undefined) return template;
+    const n = typeof value === 'number' ? value : Number(String(value).replace(',', '.'));
+    if (!Number.isFinite(n)) throw new Error('no es un número');
+    return n;
+  }
+  return value === null || value === undefined ? '' : String(value);
+};
+
+// Devuelve { record } con el formulario completo o { error } con el motivo del rechazo.
+const validateImportRow = (raw, schema) => {
+  const record = {};
+  for (const [name, template] of Object.entries(schema)) {
+    try {
+      record[name] = name in raw ? coerceImportValue(raw[name], template) : template;
+    } catch (error) {
+      return { error: `${name}: ${error.message}` };
+    }
+  }
+  record.nombreTrader = record.nombreTrader.trim();
+  if (!record.nombreTrader) return { error: 'nombreTrader vacío' };
+  if (!ISO_DAY.test(record.fechaAuditoria)) {
+    const date = record.fechaAuditoria && parseLocaleDate(record.fechaAuditoria);
+    if (!date) return { error: `fechaAuditoria inválida (${record.fechaAuditoria})` };
+    record.fechaAuditoria = formatDayKey(date);
+  }
+  if (!HORA_HHMM.test(record.horaInicioSesion)) return { error: `horaInicioSesion inválida (${record.horaInicioSesion})` };
+  return { record };
+};
+
+const prepareImport = (rows) => {
+  const schema = createInitialFormState();
+  const records = [];
+  const errors = [];
+  rows.forEach((raw, index) => {
+    const { record, error } = validateImportRow(raw, schema);
+    if (error) errors.push({ row: index + 1, error });
+    else records.push(record);
+  });
+  return { records, errors };
+};
+
+// Huella FNV-1a del fichero para ids deterministas
+const hashText = (text) => {
+  let hash = 0x811c9dc5;
+  for (let i = 0; i < text.length; i++) {
+    hash ^= text.charCodeAt(i);
+    hash = Math.imul(hash, 0x01000193);
+  }
+  return (hash >>> 0).toString(16).padStart(8, '0');
+};
+
+const loadImportProgress = (importId) => Number(localStorage.getItem(IMPORT_PROGRESS_KEY + importId)) || 0;
+
+// Importación en lotes reanudable; cada lote deja su marca para no sumar dos veces
+const IMPORT_RECORDS_PER_BATCH = Math.floor((BATCH_SIZE - 1) / (3 + ROLLUP_WRITES_PER_AUDIT));
+
+const importAudits = async (records, importId, onProgress) => {
+  let committed = Math.min(loadImportProgress(importId), records.length);
+
+  while (committed < records.length) {
+    // Auditoría + resumen + agregados + directorio por registro, dentro del límite de 500
+    const end = Math.min(committed + IMPORT_RECORDS_PER_BATCH, records.length);
+    const rollups = new Map();
+    const imported = [];
+    for (let i = committed; i < end; i++) {
+      // createdAt histórico = inicio de la sesión, para que el orden por createdAt siga siendo cronológico
+      const payload = buildAuditPayload(records[i], null);
+      imported.push({ id: `import-${importId}-${i}`, payload });
+    }
+    const audits = imported.map(({ id, payload }) => normalizeAudit(id, payload));
+    audits.forEach(audit => accumulateRollups(rollups, audit));
+    const traders = new Map(imported.map(({ payload }) => [payload.nombreTraderKey, payload.nombreTrader]));
+    // Lectura en el servidor: la caché local no sabe si otro dispositivo ya confirmó el lote
+    const markerRef = doc(importChunksCollection(), `${importId}-${committed}`);
+    if (!(await getDocFromServer(markerRef)).exists()) {
+      const batch = writeBatch(db);
+      imported.forEach(({ id, payload }) => {
+        batch.set(doc(auditsCollection(), id), payload);
+        batch.set(doc(summariesCollection(), id), buildAuditSummary(payload));
+      });
+      addRollupWrites(batch, rollups);
+      addDirectoryWrites(batch, traders, rollups);
+      batch.set(markerRef, { importId, inicio: committed, fin: end, creado: serverTimestamp() });
+      await batch.commit();
+    }
+    // Min/max y última sesión son idempotentes: se fusionan también al reintentar un lote ya marcado
+    await mergeRollupExtremes(rollups, latestSessionsOf(audits));
+    committed = end;
+    localStorage.setItem(IMPORT_PROGRESS_KEY + importId, String(committed));
+    if (onProgress) onProgress(committed, records.length);
+  }
+  localStorage.removeItem(IMPORT_PROGRESS_KEY + importId);
+  return committed;
+};
+
+// Store del formulario con suscripción por campo
+const createFormStore = (initialState) => {
+  let state = initialState;
+  const listeners = new Set();
+  return {
+    getState: () => state,
+    setState: (updater) => {
+      const next = typeof updater === 'function' ? updater(state) : updater;
+      if (next === state) return;
+      state = next;
+      listeners.forEach(listener => listener());
+    },
+    subscribe: (listener) => {
+      listeners.add(listener);
+      return () => listeners.delete(listener);
+    }
+  };
+};
+
+const FormStoreContext = React.createContext(null);
+
+const useFormField = (name) => {
+  const store = useContext(FormStoreContext);
+  return useSyncExternalStore(store.subscribe, () => store.getState()[name]);
+};
+
+const useFormActions = () => {
+  const store = useContext(FormStoreContext);
+  return useMemo(() => ({
+    setField: (name, value) => store.setState(prev => ({ ...prev, [name]: value })),
+    setMapEntry: (name, key, value) => store.setState(prev => ({ ...prev, [name]: { ...prev[name], [key]: value } })),
+    handleInputChange: (e) => {
+      const { name, value, type, checked } = e.target;
+      if (type === 'checkbox') {
+        store.setState(prev => {
+          const list = prev[name] || [];
+          return { ...prev, [name]: checked ? [...list, value] : list.filter(i => i !== value) };
+        });
+      } else {
+        store.setState(prev => ({ ...prev, [name]: value }));
+      }
+    }
+  }), [store]);
+};
+
+// Campo de texto/número/fecha aislado: solo él se vuelve a renderizar al escribir
+const FormInput = React.memo(({ name, multiline, ...props }) => {
+  const value = useFormField(name);
+  const { handleInputChange } = useFormActions();
+  return multiline
+    ? <textarea name={name} value={value} onChange={handleInputChange} {...props} />
+    : <input name={name} value={value} onChange={handleInputChange} {...props} />;
+});
+
+// --- Carga diferida de las vistas de análisis ---
+let rechartsPromise = null;
+const loadRecharts = () => rechartsPromise || (rechartsPromise = import('recharts'));
+
+const lazyChart = (render) => React.lazy(() => loadRecharts().then(recharts => ({
+  default: (props) => render(recharts, props)
+})));
+
+const prefetchWhenIdle = (load) => {
+  if (typeof requestIdleCallback === 'function') {
+    const handle = requestIdleCallback(() => load(), { timeout: 5000 });
+    return () => cancelIdleCallback(handle);
+  }
+  const timer = setTimeout(() => load(), 2000);
+  return () => clearTimeout(timer);
+};
+
+// Monta sus hijos cuando el hueco se acerca a la pantalla
+const DeferredView = ({ fallback, children }) => {
+  const ref = useRef(null);
+  const [visible, setVisible] = useState(false);
+
+  useEffect(() => {
+    if (visible) return;
+    if (typeof IntersectionObserver !== 'function') {
+      setVisible(true);
+      return;
+    }
+    const observer = new IntersectionObserver((entries) => {
+      if (entries.some(entry => entry.isIntersecting)) setVisible(true);
+    }, { rootMargin: '800px 0px' });
+    observer.observe(ref.current);
+    return () => observer.disconnect();
+  }, [visible]);
+
+  if (!visible) return <div ref={ref}>{fallback}</div>;
+  return <React.Suspense fallback={fallback}>{children}</React.Suspense>;
+};
+
+const ChartPlaceholder = () => <div className="h-full w-full bg-slate-50 rounded-[2rem] animate-pulse" />;
+
+const CorrelationBarChart = lazyChart(({ ResponsiveContainer, BarChart, CartesianGrid, XAxis, YAxis, Tooltip, Bar, Cell }, { data }) => (
+  <ResponsiveContainer width="100%" height="100%">
+    <BarChart data={data} margin={{ top: 20, right: 30, left: 20, bottom: 5 }}>
+      <CartesianGrid strokeDasharray="3 3" vertical={false} stroke="#f1f5f9" />
+      <XAxis dataKey="name" axisLine={false} tickLine={false} tick={{ fontWeight: 'black', fontSize: 10, fill: '#64748b' }} />
+      <YAxis hide domain={[0, 100]} />
+      <Tooltip cursor={{ fill: '#f8fafc' }} contentStyle={{ borderRadius: '15px', border: 'none', fontWeight: 'bold' }} />
+      <Bar dataKey="value" radius={[10, 10, 0, 0]} barSize={80}>
+        {data.map((entry, index) => (
+          <Cell key={`cell-${index}`} fill={entry.color} />
+        ))}
+      </Bar>
+    </BarChart>
+  </ResponsiveContainer>
+));
+
+const EvolutionLineChart = lazyChart(({ ResponsiveContainer, LineChart, CartesianGrid, XAxis, YAxis, Tooltip, Line }, { chartData, overlays }) => (
+  <ResponsiveContainer width="100%" height="100%">
+    <LineChart data={chartData}>
+      <CartesianGrid strokeDasharray="6 6" vertical={false} stroke="#f1f5f9" />
+      <XAxis dataKey="fecha" stroke="#cbd5e1" fontSize={10} fontWeight="900" />
+      <YAxis yAxisId="left" stroke="#cbd5e1" fontSize={10} fontWeight="900" />
+      {overlays.some(overlay => overlay.axis === 'right') && (
+        <YAxis yAxisId="right" orientation="right" stroke="#7dd3fc" fontSize={10} fontWeight="900" />
+      )}
+      <Tooltip contentStyle={{ borderRadius: '20px', border: 'none', boxShadow: '0 10px 15px -3px rgba(0,0,0,0.1)' }} />
+      <Line yAxisId="left" type="monotone" dataKey="ic" stroke="#10b981" strokeWidth={5} dot={{ r: 6 }} />
+      <Line yAxisId="left" type="monotone" dataKey="presencia" stroke="#6366f1" strokeWidth={3} dot={{ r: 4 }} />
+      {overlays.map(({ key, label, color, lineWidth, dash, axis }) => (
+        <Line key={key} yAxisId={axis} name={label} type="monotone" dataKey={key} stroke={color} strokeWidth={lineWidth} strokeDasharray={dash.join(' ')} dot={false} isAnimationActive={false} />
+      ))}
+    </LineChart>
+  </ResponsiveContainer>
+));
+
+const SectionTitle = React.memo(({ number, title }) => (
+  <div className="bg-slate-900 p-5 text-white flex items-center gap-4 border-b border-indigo-500/30">
+    <span className="bg-indigo-600 text-[11px] w-7 h-7 flex items-center justify-center rounded-full font-black shadow-lg shadow-indigo-500/20">{number}</span>
+    <h2 className="text-sm font-black uppercase tracking-[0.15em]">{title}</h2>
+  </div>
+));
+
+const computeDisciplineFactor = (numPerdidasHoy, tiposPorPerdida) => {
+  const total = parseInt(numPerdidasHoy) || 0;
+  if (total === 0) return { percent: 100, color: 'bg-emerald-500', label: '100%', textColor: 'text-emerald-500' };
+
+  let cleanCount = 0;
+  let definedCount = 0;
+
+  for (let i = 1; i <= total; i++) {
+    const type = tiposPorPerdida[i];
+    if (type) {
+      definedCount++;
+      if (type === 'Limpia ✨ (Bajo Plan)') {
+        cleanCount++;
+      }
+    }
+  }
+
+  if (definedCount === 0) return { percent: 0, color: 'bg-slate-400', label: '0%', textColor: 'text-slate-400' };
+  const percentage = Math.round((cleanCount / total) * 100);
+  let color = 'bg-amber-500'; 
+  let textColor = 'text-amber-500';
+  if (percentage >= 80) { color = 'bg-emerald-500'; textColor = 'text-emerald-500'; }
+  if (percentage < 50) { color = 'bg-rose-600'; textColor = 'text-rose-600'; }
+
+  return { percent: percentage, color, label: `${percentage}%`, textColor };
+};
+
+// Mismos colores que la leyenda del mapa de calor, en hex para pintarlos en canvas
+const HEATMAP_COLORS = { empty: '#E0E0E0', critical: '#F44336', alert: '#FFC107', optimal: '#4CAF50' };
+
+const getHeatmapLevel = (cell) => {
+  if (cell.count === 0) return 'empty';
+  const { avgIC, avgPnL } = cell;
+  if (avgIC < 50 || avgPnL < 0) return 'critical';
+  if (avgIC >= 50 && avgIC < 65) return 'alert';
+  return 'optimal';
+};
+
+const evaluatePreMarket = (formData) => {
+  const ic = parseInt(formData.indiceCoherenciaIC);
+  const sn = formData.estadoSistemaNervioso;
+  const presencia = parseInt(formData.nivelPresencia);
+  const plan = formData.revisadoPlan;
+  
+  let content = { title: '', text: '', colorClass: '', buttonClass: '' };
+
+  if (ic < 60 || sn.includes('Dorsal') || presencia < 4 || plan === 'No') {
+    content = {
+      title: '🛑 SISTEMA NO APTO',
+      text: plan === 'No' 
+        ? 'Falta de disciplina operativa: NO has revisado tu plan de trading. Sin mapa, no hay trading. Revisa el plan y vuelve a validar.'
+        : 'Tu coherencia o presencia es crítica. En este estado, tu córtex prefrontal está desactivado y operarás bajo el miedo, la disociación o la parálisis. PROHIBIDO OPERAR. Realiza una sesión de hipnosis de emergencia.',
+      colorClass: 'bg-rose-600',
+      buttonClass: 'bg-rose-700 hover:bg-rose-800'
+    };
+  } else if (ic >= 70 && sn.includes('Vagal Ventral') && presencia >= 9 && plan === 'Sí') {
+    content = {
+      title: '✅ SISTEMA OPTIMIZADO',
+      text: 'Estás en estado de flujo, tu coherencia es alta y tu foco es total. Tu biología está preparada para ejecutar el plan sin interferencias emocionales. ¡Buen trading!',
+      colorClass: 'bg-emerald-500',
+      buttonClass: 'bg-emerald-700 hover:bg-emerald-800'
+    };
+  } else {
+    content = {
+      title: '⚠️ PRECAUCIÓN',
+      text: 'Tu sistema muestra signos de alerta, urgencia o falta de foco. Estás en la frontera del secuestro emocional. Opera con lotaje reducido o realiza 2 minutos de coherencia cardíaca antes del primer trade.',
+      colorClass: 'bg-amber-500',
+      buttonClass: 'bg-amber-600 hover:bg-amber-700'
+    };
+  }
+
+  return content;
+};
+
+const TraderSection = React.memo(({ accessCode, setAccessCode, uniqueTradersList, filterStartDate, setFilterStartDate, filterEndDate, setFilterEndDate, runTraderBackfill, runRollupRebuild, runBulkImport, runBenchmark, loading }) => {
+  const { setField } = useFormActions();
+
+  return (
+    <section className="bg-white rounded-[2rem] shadow-xl shadow-slate-200/50 border border-slate-200 p-8 border-l-[16px] border-l-indigo-600">
+      <div className="grid grid-cols-1 lg:grid-cols-3 gap-8">
+        <div className="lg:col-span-2 space-y-6">
+          {accessCode === "COACH2024" && uniqueTradersList.length > 0 && (
+            <div className="bg-amber-50 p-4 rounded-2xl border border-amber-200 mb-4 animate-in slide-in-from-top-2">
+              <label className="block text-[10px] font-black text-amber-700 uppercase tracking-widest mb-2 italic">Panel de Coach: Seleccionar Trader</label>
+              <select 
+                onChange={(e) => setField('nombreTrader', e.target.value)}
+                className="w-full p-3 bg-white border-2 border-amber-200 rounded-xl text-sm font-black text-amber-900 outline-none"
+              >
+                <option value="">-- Ver lista de traders --</option>
+                {uniqueTradersList.map(trader => (
+                  <option key={trader.key} value={trader.nombreTrader}>{trader.nombreTrader}</option>
+                ))}
+              </select>
+            </div>
+          )}
+
+          <div>
+            <label className="block text-[10px] font-black text-slate-400 uppercase tracking-widest mb-3 italic">Nombre del Trader</label>
+            <FormInput type="text" name="nombreTrader" placeholder="Introduce tu nombre..." className="w-full p-4 bg-slate-50 border-2 border-slate-100 rounded-2xl text-xl font-black text-indigo-700 outline-none focus:border-indigo-500 transition-all" required />
+          </div>
+
+          {/* NUEVO PANEL DE FILTROS DE FECHA */}
+          <div className="bg-indigo-50/50 p-4 rounded-2xl border border-indigo-100">
+            <label className="block text-[10px] font-black text-indigo-800 uppercase tracking-widest mb-2 italic flex items-center gap-2">
+
+              <span className="text-indigo-400 font-normal normal-case">(Opcional: Dejar vacío para ver todo el histórico)</span>
+            </label>
+            <div className="grid grid-cols-2 gap-4">
+              <div>
+                <span className="text-[9px] font-bold text-slate-500 uppercase block mb-1">Desde:</span>
+                <input 
+                  type="date" 
+                  value={filterStartDate} 
+                  onChange={(e) => setFilterStartDate(e.target.value)} 
+                  className="w-full p-2 bg-white border border-indigo-200 rounded-xl text-xs font-bold text-slate-700 outline-none" 
+                />
+              </div>
+              <div>
+                <span className="text-[9px] font-bold text-slate-500 uppercase block mb-1">Hasta:</span>
+                <input 
+                  type="date" 
+                  value={filterEndDate} 
+                  onChange={(e) => setFilterEndDate(e.target.value)} 
+                  className="w-full p-2 bg-white border border-indigo-200 rounded-xl text-xs font-bold text-slate-700 outline-none" 
+                />
+              </div>
+            </div>
+          </div>
+
+          <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
+            <div>
+              <label className="block text-[10px] font-black text-indigo-600 uppercase tracking-widest mb-3 italic">Fecha Registro</label>
+              <FormInput type="date" name="fechaAuditoria" className="w-full p-4 bg-indigo-50/50 border-2 border-indigo-100 rounded-2xl font-bold text-slate-700 outline-none cursor-pointer" required />
+            </div>
+            <div>
+              <label className="block text-[10px] font-black text-indigo-600 uppercase tracking-widest mb-3 italic">Hora de Inicio de Sesión</label>
+              <FormInput type="time" name="horaInicioSesion" className="w-full p-4 bg-indigo-50/50 border-2 border-indigo-100 rounded-2xl font-bold text-slate-700 outline-none cursor-pointer" required />
+            </div>
+          </div>
+        </div>
+        <div className="bg-indigo-900 p-6 rounded-3xl text-white flex flex-col justify-center">
+          <label className="block text-[10px] font-black text-indigo-300 uppercase tracking-widest mb-3">Acceso Supervisión</label>
+          <input type="password" value={accessCode} onChange={(e) => setAccessCode(e.target.value)} placeholder="Código" className="w-full p-4 bg-indigo-800/50 border-2 border-indigo-700 rounded-2xl text-center font-bold outline-none" />
+          {accessCode === "COACH2024" && <p className="text-[9px] text-emerald-400 mt-2 text-center font-black uppercase">Modo Coach Activado</p>}
+          {accessCode === "COACH2024" && (
+            <button type="button" onClick={runTraderBackfill} disabled={loading} className="mt-3 py-2 rounded-xl bg-indigo-800 hover:bg-indigo-700 text-[9px] font-black uppercase tracking-widest text-indigo-200">
+              Reindexar histórico
+            </button>
+          )}
+          {accessCode === "COACH2024" && (
+            <button type="button" onClick={runRollupRebuild} disabled={loading} className="mt-2 py-2 rounded-xl bg-indigo-800 hover:bg-indigo-700 text-[9px] font-black uppercase tracking-widest text-indigo-200">
+              Recalcular agregados
+            </button>
+          )}
+          {accessCode === "COACH2024" && (
+            <label className={`mt-2 py-2 rounded-xl bg-indigo-800 hover:bg-indigo-700 text-[9px] font-black uppercase tracking-widest text-indigo-200 text-center ${loading ? 'opacity-50 pointer-events-none' : 'cursor-pointer'}`}>
+              Importar histórico (CSV / JSON)
+              <input
+                type="file"
+                accept=".csv,.json,text/csv,application/json"
+                className="hidden"
+                onChange={(e) => {
+                  const file = e.target.files[0];
+                  e.target.value = '';
+                  if (file) runBulkImport(file);
+                }}
+              />
+            </label>
+          )}
+          {accessCode === "COACH2024" && (
+            <button type="button" onClick={runBenchmark} disabled={loading} className="mt-2 py-2 rounded-xl bg-indigo-800 hover:bg-indigo-700 text-[9px] font-black uppercase tracking-widest text-indigo-200">
+              Benchmark de rendimiento
+            </button>
+          )}
+        </div>
+      </div>
+    </section>
+  );
+});
+
+const PreMarketSection = React.memo(({ onEvaluate }) => {
+  const energiaMetabolica = useFormField('energiaMetabolica');
+  const ritualCoherencia = useFormField('ritualCoherencia');
+  const estadoSistemaNervioso = useFormField('estadoSistemaNervioso');
+  const indiceCoherenciaIC = useFormField('indiceCoherenciaIC');
+  const nivelPresencia = useFormField('nivelPresencia');
+  const revisadoPlan = useFormField('revisadoPlan');
+  const { setField, handleInputChange } = useFormActions();
+  const store = useContext(FormStoreContext);
+  const handleEvaluate = useCallback(() => onEvaluate(evaluatePreMarket(store.getState())), [store, onEvaluate]);
+
+  return (
+    <section className="bg-white rounded-[2rem] shadow-sm border border-slate-200 overflow-hidden relative">
+      <SectionTitle number="1" title="Fase Pre-Mercado (Check Neurobiológico)" />
+      <div className="p-8 space-y-12 pb-12">
+        <div className="space-y-4">
+          <label className="block text-sm font-black text-slate-700 uppercase tracking-tight">1.1 Nivel de Energía Metabólica (1-10)</label>
+          <div className="bg-slate-50 p-6 rounded-3xl border border-slate-100">
+            <div className="flex items-center gap-6 mb-4">
+              <input type="range" min="1" max="10" name="energiaMetabolica" value={energiaMetabolica} onChange={handleInputChange} className="flex-1 h-2 bg-slate-200 rounded-lg accent-indigo-600 cursor-pointer" />
+              <span className="text-4xl font-black text-indigo-600">{energiaMetabolica}</span>
+            </div>
+            <div className="grid grid-cols-2 md:grid-cols-4 gap-2 mt-4 text-[10px] font-black uppercase tracking-tighter italic">
+
+              <div className="bg-amber-50 text-amber-700 p-2 rounded-xl border border-amber-100">4–6 = Energía media (cansado pero funcional)</div>
+              <div className="bg-emerald-50 text-emerald-700 p-2 rounded-xl border border-emerald-100">7–8 = Buena energía (descansado, mente clara)</div>
+              <div className="bg-indigo-50 text-indigo-700 p-2 rounded-xl border border-indigo-100">9–10 = Energía muy alta (mucha activación, vigila la euforia)</div>
+            </div>
+          </div>
+        </div>
+
+        <div className="space-y-4 max-w-md">
+          <label className="block text-sm font-black text-slate-700 uppercase">1.2 Ritual de Coherencia Realizado</label>
+          <div className="flex gap-3">
+            {['Sí', 'No'].map(opt => (
+              <button key={opt} type="button" onClick={() => setField('ritualCoherencia', opt)} className={`flex-1 py-4 rounded-2xl font-black uppercase text-sm transition-all border-2 ${ritualCoherencia === opt ? 'bg-slate-900 border-slate-900 text-white shadow-lg' : 'bg-white border-slate-100 text-slate-400 hover:border-slate-300'}`}>
+                {opt}
+              </button>
+            ))}
+          </div>
+        </div>
+
+        <div className="grid grid-cols-1 md:grid-cols-2 gap-12 pt-8 border-t border-slate-100">
+          <div className="space-y-4">
+            <label className="block text-sm font-black text-slate-700 uppercase">1.3 Estado del Sistema Nervioso (SN)</label>
+            <div className="space-y-3">
+              {[
+                { val: '🟢 Vagal Ventral (Calma Activa)', desc: 'Estado de flujo y claridad' },
+                { val: '🟡 Simpático (Lucha/Caza)', desc: 'Tensión y urgencia (Lobo)' },
+                { val: '🔴 Dorsal Vagal (Parálisis)', desc: 'Miedo y dudas (Perro)' }
+              ].map(st => (
+                <label key={st.val} className={`p-4 border-2 rounded-2xl cursor-pointer transition-all flex justify-between items-center ${estadoSistemaNervioso === st.val ? 'border-indigo-600 bg-indigo-50/50' : 'border-slate-50 bg-slate-50/30'}`}>
+                  <div className="flex flex-col"><span className="text-[10px] font-black uppercase">{st.val}</span><span className="text-[9px] font-bold text-slate-400 italic">{st.desc}</span></div>
+                  <input type="radio" name="estadoSistemaNervioso" value={st.val} checked={estadoSistemaNervioso === st.val} onChange={handleInputChange} className="accent-indigo-600" />
+                </label>
+              ))}
+            </div>
+          </div>
+
+          <div className="space-y-6">
+            <label className="block text-sm font-black text-slate-700 uppercase mb-2">1.4 IC % (Índice de Coherencia)</label>
+            <div className="bg-slate-50 p-6 rounded-3xl border border-slate-100">
+              <div className="flex items-center gap-6 mb-3">
+                <input type="range" min="0" max="100" name="indiceCoherenciaIC" value={indiceCoherenciaIC} onChange={handleInputChange} className="flex-1 h-2 bg-slate-200 rounded-lg accent-emerald-500 cursor-pointer" />
+                <span className="text-3xl font-black text-emerald-600">{indiceCoherenciaIC}%</span>
+              </div>
+            </div>
+
+            <div className="overflow-hidden rounded-2xl border border-slate-100 shadow-sm">
+              <table className="w-full text-left text-[10px] font-bold uppercase tracking-tighter">
+                <thead className="bg-slate-100 text-slate-500">
+                  <tr>
+                    <th className="px-3 py-2">IC %</th>
+                    <th className="px-3 py-2">Estado</th>
+                    <th className="px-3 py-2">Sensación Física</th>
+                    <th className="px-3 py-2">Action</th>
+                  </tr>
+                </thead>
+                <tbody className="bg-white text-slate-700">
+                  <tr className="border-b border-slate-50">
+                    <td className="px-3 py-2 text-emerald-600">90-100%</td>
+                    <td className="px-3 py-2">Óptimo</td>
+                    <td className="px-3 py-2 font-medium">Visión clara, calma</td>
+                    <td className="px-3 py-2 font-black text-emerald-600">OPERAR</td>
+                  </tr>
+                  <tr className="border-b border-slate-50">
+                    <td className="px-3 py-2 text-emerald-500">70-80%</td>
+                    <td className="px-3 py-2">Estable</td>
+                    <td className="px-3 py-2 font-medium">Pulso tranquilo</td>
+                    <td className="px-3 py-2 font-black text-emerald-600">OPERAR</td>
+                  </tr>
+                  <tr className="border-b border-slate-50">
+                    <td className="px-3 py-2 text-amber-500">50-60%</td>
+                    <td className="px-3 py-2">Alerta</td>
+                    <td className="px-3 py-2 font-medium">Ganas de entrar</td>
+                    <td className="px-3 py-2 font-black text-amber-500">PAUSA</td>
+                  </tr>
+                  <tr>
+                    <td className="px-3 py-2 text-rose-600">&lt; 40%</td>
+                    <td className="px-3 py-2">Caos</td>
+                    <td className="px-3 py-2 font-medium">Miedo/Ira</td>
+                    <td className="px-3 py-2 font-black text-rose-600">BLOQUEO</td>
+                  </tr>
+                </tbody>
+              </table>
+            </div>
+
+            <div className="bg-rose-50 border-2 border-rose-100 p-4 rounded-2xl">
+              <p className="text-[10px] font-black text-rose-700 leading-tight uppercase">
+                ⚠️ <span className="underline">Regla de Oro:</span><br />
+                Con un IC inferior al 60%, el córtex prefrontal se apaga y toma el control la amígdala. <span className="text-rose-900">NO DISPARES. RESPIRA 3 MINUTOS.</span>
+              </p>
+            </div>
+          </div>
+        </div>
+
+        <div className="space-y-4 pt-8 border-t border-slate-100">
+          <label className="block text-sm font-black text-slate-700 uppercase tracking-tight">1.5 Nivel de Presencia (1-10)</label>
+          <div className="bg-indigo-50/30 p-6 rounded-3xl border border-indigo-100">
+            <div className="flex items-center gap-6 mb-4">
+              <input type="range" min="1" max="10" name="nivelPresencia" value={nivelPresencia} onChange={handleInputChange} className="flex-1 h-2 bg-indigo-200 rounded-lg accent-indigo-600 cursor-pointer" />
+              <span className="text-4xl font-black text-indigo-700">{nivelPresencia}</span>
+            </div>
+            <div className="grid grid-cols-2 gap-2 mt-4 text-[10px] font-black uppercase tracking-tighter italic">
+              <div className="bg-indigo-100 text-indigo-800 p-2 rounded-xl border border-indigo-200">9-10: Foco total en el ahora (Cuerpo + Gráfico).</div>
+              <div className="bg-emerald-50 text-emerald-800 p-2 rounded-xl border border-emerald-100">7-8: Foco en el plan, distracciones leves.</div>
+              <div className="bg-amber-50 text-amber-800 p-2 rounded-xl border border-amber-100">5-6: Piloto automático / Mirando el móvil.</div>
+              <div className="bg-rose-50 text-rose-800 p-2 rounded-xl border border-rose-100">&lt; 4: Disociación. Apaga la pantalla.</div>
+            </div>
+          </div>
+        </div>
+
+        <div className="space-y-4 pt-8 border-t border-slate-100 max-w-md">
+          <label className="block text-sm font-black text-slate-700 uppercase">1.6 Revisión del Plan de Trading</label>
+          <div className="flex gap-3">
+            {['Sí', 'No'].map(opt => (
+              <button key={opt} type="button" onClick={() => setField('revisadoPlan', opt)} className={`flex-1 py-4 rounded-2xl font-black uppercase text-sm transition-all border-2 ${revisadoPlan === opt ? (opt === 'Sí' ? 'bg-emerald-600 border-emerald-600 text-white shadow-lg' : 'bg-rose-600 border-rose-600 text-white shadow-lg') : 'bg-white border-slate-100 text-slate-400 hover:border-slate-300'}`}>
+                {opt}
+              </button>
+            ))}
+          </div>
+        </div>
+
+        <div className="pt-8 text-center">
+           <button type="button" onClick={handleEvaluate} className="px-8 py-4 bg-slate-900 hover:bg-indigo-700 text-white rounded-2xl font-black uppercase tracking-widest text-xs shadow-lg transition-all">
+              🔍 Validar Preparación Neurobiológica
+           </button>
+        </div>
+      </div>
+    </section>
+  );
+});
+
+const ExecutionSection = React.memo(() => {
+  const resultadoConsecuenciaPlan = useFormField('resultadoConsecuenciaPlan');
+  const marcadoresSomaticos = useFormField('marcadoresSomaticos');
+  const sesgosNeuroCognitivos = useFormField('sesgosNeuroCognitivos');
+  const respetoStopTP = useFormField('respetoStopTP');
+  const { setField, handleInputChange } = useFormActions();
+
+  return (
+    <section className="bg-white rounded-[2rem] shadow-sm border border-slate-200 overflow-hidden">
+      <SectionTitle number="2" title="Ejecución y Foco Atencional" />
+      <div className="p-8 space-y-12">
+        <div className="grid grid-cols-2 md:grid-cols-4 gap-4 pt-6">
+          {[
+            { label: 'Entradas Totales', name: 'numEntradasTotales' },
+            { label: 'Resultado PnL', name: 'pnlDia' },
+            { label: 'Dentro del Plan', name: 'numEntradasPlan' },
+            { label: 'Fuera de Plan', name: 'numEntradasFueraPlan' }
+          ].map(f => (
+            <div key={f.name} className="bg-slate-50 p-5 rounded-3xl border border-slate-100">
+              <label className="block text-[9px] font-black text-slate-500 uppercase mb-2 tracking-widest">{f.label}</label>
+              <FormInput type="number" name={f.name} className="w-full bg-transparent text-xl font-black outline-none" />
+            </div>
+          ))}
+        </div>
+
+        <div className="bg-slate-50 p-5 rounded-3xl border border-slate-100">
+          <label className="block text-[9px] font-black text-slate-500 uppercase mb-2 tracking-widest">Respeto de Stop / TP (1-10)</label>
+          <div className="flex items-center gap-6">
+            <input type="range" min="1" max="10" name="respetoStopTP" value={respetoStopTP} onChange={handleInputChange} className="flex-1 h-2 bg-indigo-200 rounded-lg accent-indigo-600 cursor-pointer" />
+            <span className="text-xl font-black text-indigo-700">{respetoStopTP}</span>
+          </div>
+        </div>
+
+        {/* NUEVO PUNTO 2.0 - AÑADIDO SOLICITADO */}
+        <div className="space-y-4 pt-6 border-t border-slate-100">
+          <div className="flex flex-col gap-2">
+             <label className="block text-sm font-black text-slate-700 uppercase italic">2.0 ¿Es el resultado consecuencia directa de seguir el plan?</label>
+             <p className="text-[10px] font-bold text-slate-500 italic max-w-2xl bg-indigo-50 p-3 rounded-xl border border-indigo-100">
+               Recuerda: Una operación ganadora fuera de plan es una <span className="text-rose-600 font-black">pésima operación</span> porque refuerza hábitos destructivos. El dashboard debe premiar la ejecución, no el dinero.
+             </p>
+          </div>
+          <div className="flex gap-3 max-w-md">
+            {['Sí', 'No'].map(opt => (
+              <button 
+                key={opt} 
+                type="button" 
+                onClick={() => setField('resultadoConsecuenciaPlan', opt)} 
+                className={`flex-1 py-4 rounded-2xl font-black uppercase text-sm transition-all border-2 ${
+                  resultadoConsecuenciaPlan === opt 
+                    ? (opt === 'Sí' ? 'bg-indigo-600 border-indigo-600 text-white shadow-lg' : 'bg-rose-600 border-rose-600 text-white shadow-lg') 
+                    : 'bg-white border-slate-100 text-slate-400 hover:border-slate-300'
+                }`}
+              >
+                {opt}
+              </button>
+            ))}
+          </div>
+        </div>
+
+        <div className="space-y-4 pt-6 border-t border-slate-100">
+          <label className="block text-sm font-black text-slate-700 uppercase italic">2.1 Marcadores Somáticos Detectados</label>
+          <div className="flex flex-wrap gap-3">
+            {['TAQUICARDIA', 'TENSIÓN MANDIBULAR', 'CALOR FACIAL', 'PRESIÓN PECHO', 'INQUIETUD PIERNAS', 'SUDORACIÓN', 'RESPIRACIÓN CORTA'].map(m => (
+              <label key={m} className={`px-5 py-3 rounded-2xl border-2 transition-all cursor-pointer font-black text-[10px] uppercase tracking-tight ${marcadoresSomaticos.includes(m) ? 'bg-rose-600 border-rose-600 text-white shadow-md' : 'bg-white border-slate-100 text-slate-400 hover:border-rose-200'}`}>
+                <input type="checkbox" name="marcadoresSomaticos" value={m} checked={marcadoresSomaticos.includes(m)} onChange={handleInputChange} className="hidden" />
+                {m}
+              </label>
+            ))}
+          </div>
+        </div>
+
+        <div className="space-y-4 pt-6 border-t border-slate-100">
+          <label className="block text-sm font-black text-slate-700 uppercase italic">2.2 Sesgos Detectados Durante la Operativa</label>
+          <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
+            {[
+              { val: 'RECENCIA', desc: 'Influencia del trade anterior.' },
+              { val: 'IMPACIENCIA', desc: 'Entrar antes de tiempo.' },
+              { val: 'OVERTRADING', desc: 'Operar de más.' },
+              { val: 'REVANCHA', desc: 'Recuperar una pérdida.' },
+              { val: 'CONFIRMACIÓN', desc: 'Ver solo lo que quieres ver.' },
+              { val: 'AVERSIÓN', desc: 'Cerrar rápido por miedo.' }
+            ].map(s => (
+              <label key={s.val} className={`flex flex-col p-4 rounded-2xl border-2 transition-all cursor-pointer ${sesgosNeuroCognitivos.includes(s.val) ? 'bg-indigo-600 border-indigo-600 text-white shadow-md' : 'bg-white border-slate-100 text-slate-400 hover:border-indigo-200'}`}>
+                <input type="checkbox" name="sesgosNeuroCognitivos" value={s.val} checked={sesgosNeuroCognitivos.includes(s.val)} onChange={handleInputChange} className="hidden" />
+                <span className="text-[10px] font-black uppercase mb-1">{s.val}</span>
+                <span className={`text-[9px] font-bold italic ${sesgosNeuroCognitivos.includes(s.val) ? 'text-indigo-100' : 'text-slate-400'}`}>{s.desc}</span>
+              </label>
+            ))}
+          </div>
+        </div>
+      </div>
+    </section>
+  );
+});
+
+const LossAnalysisSection = React.memo(() => {
+  const aceptoRiesgo = useFormField('aceptoRiesgo');
+  const sensacionCorporalPerdida = useFormField('sensacionCorporalPerdida');
+  const numPerdidasHoy = useFormField('numPerdidasHoy');
+  const emocionesPorPerdida = useFormField('emocionesPorPerdida');
+  const tiposPorPerdida = useFormField('tiposPorPerdida');
+  const emocionesDetectadas = useFormField('emocionesDetectadas');
+  const indiceCoherenciaIC = useFormField('indiceCoherenciaIC');
+  const estadoSistemaNerviosoFinal = useFormField('estadoSistemaNerviosoFinal');
+  const { setField, handleInputChange, setMapEntry } = useFormActions();
+  const disciplineFactor = useMemo(
+    () => computeDisciplineFactor(numPerdidasHoy, tiposPorPerdida),
+    [numPerdidasHoy, tiposPorPerdida]
+  );
+
+  const correlationChartData = useMemo(() => {
+    return [
+      { name: 'IC Inicial', value: parseInt(indiceCoherenciaIC) || 0, color: '#6366f1' },
+      { name: 'Disciplina Final', value: disciplineFactor.percent, color: disciplineFactor.percent < 50 ? '#e11d48' : '#10b981' }
+    ];
+  }, [indiceCoherenciaIC, disciplineFactor]);
+
+  return (
+    <section className="bg-white rounded-[2rem] shadow-sm border border-slate-200 overflow-hidden">
+      <SectionTitle number="3" title="Análisis Integral de Pérdidas" />
+      <div className="p-8 space-y-10">
+        <div className="space-y-6">
+          {/* 3.1 COMPLETO: PÉRDIDAS Y RIESGO */}
+          <div className="flex flex-col md:flex-row gap-8 items-start">
+            <div className="max-w-md">
+              <label className="block text-sm font-black text-slate-700 uppercase italic mb-2">3.1 ¿Cuántas operaciones perdedoras has tenido hoy?</label>
+              <div className="bg-slate-50 p-5 rounded-3xl border border-slate-100 inline-block min-w-[150px]">
+                <FormInput type="number" name="numPerdidasHoy" min="0" className="w-full bg-transparent text-3xl font-black text-rose-600 outline-none" />
+              </div>
+            </div>
+
+            {/* NUEVA PREGUNTA AÑADIDA SOLICITADA */}
+            <div className="max-w-md flex-1">
+               <label className="block text-sm font-black text-slate-700 uppercase italic mb-2">¿Aceptaste el riesgo antes de entrar?</label>
+               <p className="text-[10px] font-bold text-slate-400 italic mb-2">Si la respuesta es NO, es una operación de JUEGO (Gambling), no de Trading.</p>
+               <div className="flex gap-3">
+                {['Sí', 'No'].map(opt => (
+                  <button 
+                    key={opt} 
+                    type="button" 
+                    onClick={() => setField('aceptoRiesgo', opt)} 
+                    className={`flex-1 py-4 rounded-2xl font-black uppercase text-sm transition-all border-2 ${
+                      aceptoRiesgo === opt 
+                        ? (opt === 'Sí' ? 'bg-indigo-600 border-indigo-600 text-white shadow-lg' : 'bg-rose-600 border-rose-600 text-white shadow-lg') 
+                        : 'bg-white border-slate-100 text-slate-400 hover:border-slate-300'
+                    }`}
+                  >
+                    {opt}
+                  </button>
+                ))}
+              </div>
+            </div>
+          </div>
+
+          <div className="flex flex-col items-center justify-center py-8 bg-slate-900 rounded-[2.5rem] border-4 border-slate-800 shadow-2xl animate-in zoom-in-95">
+            <span className="text-[10px] font-black text-indigo-400 uppercase tracking-[0.3em] mb-2 italic">Performance Subconsciente</span>
+            <div className="flex items-center gap-4">
+              <div className="h-1 w-12 bg-indigo-500 rounded-full"></div>
+              <div className="text-7xl font-black text-white tabular-nums tracking-tighter">
+                {disciplineFactor.label}
+              </div>
+              <div className="h-1 w-12 bg-indigo-500 rounded-full"></div>
+            </div>
+            <span className={`mt-3 px-6 py-2 rounded-full text-[11px] font-black uppercase border-2 ${disciplineFactor.textColor} border-current`}>
+              FACTOR DISCIPLINA DE SESIÓN
+            </span>
+          </div>
+
+          <div className="space-y-4 pt-6 border-t border-slate-100">
+            <div className="flex flex-col gap-1">
+              <label className="block text-sm font-black text-slate-700 uppercase italic tracking-tight">3.2 Sensación Corporal Durante las Pérdidas</label>
+              <p className="text-[11px] font-black text-rose-600 uppercase italic tracking-wide">¿Dónde sentiste la emoción en tu cuerpo?</p>
+            </div>
+            <div className="grid grid-cols-2 md:grid-cols-4 gap-3">
+              {[
+                'NUDO EN EL ESTÓMAGO', 
+                'OPRESIÓN EN EL PECHO', 
+                'TENSIÓN EN CUELLO/HOMBROS', 
+                'CALOR EN LA CARA', 
+                'VACÍO EN EL ABDOMEN', 
+                'TENSIÓN MANDIBULAR',
+                'FRÍO EN LAS MANOS',
+                'INQUIETUD EN PIERNAS'
+              ].map(sensacion => (
+                <label key={sensacion} className={`p-4 rounded-xl border-2 transition-all cursor-pointer flex items-center justify-center text-center text-[9px] font-black uppercase leading-tight ${sensacionCorporalPerdida === sensacion ? 'bg-rose-600 border-rose-600 text-white shadow-md' : 'bg-slate-50 border-slate-100 text-slate-400 hover:border-rose-200'}`}>
+                  <input type="radio" name="sensacionCorporalPerdida" value={sensacion} checked={sensacionCorporalPerdida === sensacion} onChange={handleInputChange} className="hidden" />
+                  {sensacion}
+                </label>
+              ))}
+            </div>
+          </div>
+
+          {parseInt(numPerdidasHoy) > 0 && (
+            <div className="space-y-6 animate-in fade-in slide-in-from-top-4 pt-6 border-t border-slate-100">
+              <label className="block text-sm font-black text-slate-700 uppercase italic">Desglose de Pérdidas de Sesión</label>
+              <div className="overflow-hidden rounded-3xl border border-slate-200 shadow-sm">
+                <table className="w-full text-left">
+                  <thead className="bg-slate-100 text-slate-400 text-[10px] font-black uppercase">
+                    <tr>
+                      <th className="px-6 py-4 w-16 text-center">#</th>
+                      <th className="px-6 py-4">Emoción Predominante</th>
+                      <th className="px-6 py-4">Calificación de la Pérdida</th>
+                    </tr>
+                  </thead>
+                  <tbody className="divide-y divide-slate-100 bg-white">
+                    {Array.from({ length: Math.min(parseInt(numPerdidasHoy), 20) }).map((_, i) => {
+                      const index = i + 1;
+                      return (
+                        <tr key={index} className="hover:bg-slate-50 transition-colors">
+                          <td className="px-6 py-4 text-center font-black text-slate-300">{index}</td>
+                          <td className="px-6 py-4">
+                            <select value={emocionesPorPerdida[index] || ''} onChange={(e) => setMapEntry('emocionesPorPerdida', index, e.target.value)} className="w-full p-3 bg-slate-50 border border-slate-200 rounded-xl text-xs font-bold text-slate-600 outline-none">
+                              <option value="" disabled>Selecciona...</option>
+                              <option value="Ira">Ira 😤</option><option value="Miedo">Miedo 😨</option><option value="Venganza">Venganza ⚔️</option><option value="Tristeza">Tristeza 😢</option>
+                            </select>
+                          </td>
+                          <td className="px-6 py-4">
+                            <select value={tiposPorPerdida[index] || ''} onChange={(e) => setMapEntry('tiposPorPerdida', index, e.target.value)} className="w-full p-3 border rounded-xl text-xs font-black outline-none">
+                              <option value="" disabled>Califica...</option>
+                              <option value="Limpia ✨ (Bajo Plan)">Limpia ✨ (Bajo Plan)</option>
+                              <option value="Sucia 💩 (Fuera de Plan)">Sucia 💩 (Fuera de Plan)</option>
+                            </select>
+                          </td>
+                        </tr>
+                      );
+                    })}
+                  </tbody>
+                </table>
+              </div>
+            </div>
+          )}
+        </div>
+
+        <div className="space-y-4 pt-8 border-t border-slate-100">
+          <div className="flex flex-col gap-1">
+            <label className="block text-sm font-black text-slate-700 uppercase italic">3.3 Emociones Detectadas Durante la Sesión</label>
+            <p className="text-[11px] font-black text-indigo-600 uppercase italic tracking-wide">Identifica qué emociones visitaron tu mente hoy</p>
+          </div>
+          <div className="grid grid-cols-2 md:grid-cols-4 lg:grid-cols-5 gap-3">
+            {[
+              "ANSIEDAD", "EUFORIA", "FOMO", "VENGANZA", "HESITACIÓN (DUDA)", 
+              "CONFIANZA", "FRUSTRACIÓN", "AVARICIA", "ABURRIMIENTO", "ESPERANZA"
+            ].map(emocion => (
+              <label key={emocion} className={`p-3 rounded-xl border-2 transition-all cursor-pointer flex items-center justify-center text-center text-[9px] font-black uppercase ${emocionesDetectadas.includes(emocion) ? 'bg-indigo-600 border-indigo-600 text-white shadow-md' : 'bg-white border-slate-100 text-slate-400 hover:border-indigo-200'}`}>
+                <input type="checkbox" name="emocionesDetectadas" value={emocion} checked={emocionesDetectadas.includes(emocion)} onChange={handleInputChange} className="hidden" />
+                {emocion}
+              </label>
+            ))}
+          </div>
+        </div>
+
+        <div className="pt-10 border-t border-slate-100">
+          <label className="block text-sm font-black text-slate-700 uppercase italic mb-8 text-center">Gráfico de Correlación: Coherencia vs Disciplina</label>
+          <div className="h-[250px] w-full max-w-2xl mx-auto">
+            <DeferredView fallback={<ChartPlaceholder />}>
+              <CorrelationBarChart data={correlationChartData} />
+            </DeferredView>
+          </div>
+        </div>
+
+        <div className="bg-slate-50 p-8 rounded-[2rem] border border-slate-200 text-center">
+          <p className="text-slate-700 font-bold text-lg leading-relaxed">
+            Tu coherencia de entrada del <span className="text-indigo-600 font-black">{indiceCoherenciaIC}%</span> resultó en una disciplina del <span className={`${disciplineFactor.textColor} font-black`}>{disciplineFactor.percent}%</span>.
+          </p>
+          {disciplineFactor.percent < 70 && (
+            <div className="mt-4 p-4 bg-rose-100 border-2 border-rose-200 rounded-2xl flex items-center justify-center gap-3 animate-pulse">
+              <span className="text-2xl">🚨</span>
+              <p className="text-xs font-black text-rose-700 uppercase tracking-tight">
+                AVISO DE SECUESTRO EMOCIONAL: Tu biología ha anulado tu capacidad de ejecución. El córtex prefrontal ha cedido el mando al sistema límbico.
+              </p>
+            </div>
+          )}
+        </div>
+
+        <div className="space-y-4 pt-6 border-t border-slate-100 bg-indigo-50/30 p-6 rounded-3xl border border-indigo-100">
+           <label className="block text-sm font-black text-indigo-800 uppercase italic tracking-tight">3.4 Estado del Sistema Nervioso Final</label>
+           <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+              {['🟢 Vagal (Calma/Regulación)', '🟡 Simpático (Activado/Ansioso)', '🔴 Dorsal (Agotado/Colapsado)'].map(estado => (
+                 <label key={estado} className={`p-4 rounded-xl border-2 cursor-pointer transition-all flex items-center gap-3 ${estadoSistemaNerviosoFinal === estado ? 'bg-white border-indigo-600 shadow-md text-indigo-700' : 'bg-white/50 border-transparent hover:bg-white text-slate-500'}`}>
+                    <input type="radio" name="estadoSistemaNerviosoFinal" value={estado} checked={estadoSistemaNerviosoFinal === estado} onChange={handleInputChange} className="accent-indigo-600" />
+                    <span className="text-xs font-black uppercase">{estado}</span>
+                 </label>
+              ))}
+           </div>
+        </div>
+      </div>
+    </section>
+  );
+});
+
+const ReprogrammingSection = React.memo(() => {
+  const anclajeIdentidad = useFormField('anclajeIdentidad');
+  const creenciasInstaladas = useFormField('creenciasInstaladas');
+  const visualizacionesCierre = useFormField('visualizacionesCierre');
+  const protocoloReactivacionVagal = useFormField('protocoloReactivacionVagal');
+  const { handleInputChange } = useFormActions();
+
+  return (
+    <section className="bg-white rounded-[2rem] shadow-sm border border-slate-200 overflow-hidden">
+      <SectionTitle number="4" title="Reprogramación Subconsciente Post-Sesión" />
+      <div className="p-8 space-y-12">
+        <div className="space-y-4">
+          <div className="flex flex-col gap-1">
+            <label className="block text-sm font-black text-slate-700 uppercase italic">4.1 ANCLAJE DE IDENTIDAD (1-10)</label>
+            <p className="text-[11px] font-black text-indigo-600 uppercase italic tracking-wide">"Hoy operé como el trader que quiero ser"</p>
+          </div>
+          <div className="bg-slate-50 p-6 rounded-3xl border border-slate-100">
+            <div className="flex items-center gap-6 mb-4">
+              <input type="range" min="1" max="10" name="anclajeIdentidad" value={anclajeIdentidad} onChange={handleInputChange} className="flex-1 h-2 bg-slate-200 rounded-lg accent-indigo-600 cursor-pointer" />
+              <span className="text-4xl font-black text-indigo-600">{anclajeIdentidad}</span>
+            </div>
+          </div>
+        </div>
+
+        <div className="space-y-4 pt-8 border-t border-slate-100">
+          <label className="block text-sm font-black text-slate-700 uppercase italic">4.2 INSTALACIÓN DE CREENCIA POTENCIADORA</label>
+          <div className="grid grid-cols-1 md:grid-cols-2 gap-3">
+            {[
+              "Soy paciente y espero mi setup perfecto",
+              "Confío en mi sistema y en mi criterio",
+              "Las pérdidas son información, no fracasos",
+              "Opero desde la calma, no desde la necesidad",
+              "Mi valor como trader no depende de un trade",
+              "Soy disciplinado incluso cuando nadie me ve"
+            ].map(creencia => (
+              <label key={creencia} className={`p-4 rounded-xl border-2 transition-all cursor-pointer flex items-center gap-3 text-[10px] font-black uppercase ${creenciasInstaladas.includes(creencia) ? 'bg-indigo-600 border-indigo-600 text-white' : 'bg-slate-50 border-slate-100 text-slate-500 hover:border-indigo-200'}`}>
+                <input type="checkbox" name="creenciasInstaladas" value={creencia} checked={creenciasInstaladas.includes(creencia)} onChange={handleInputChange} className="hidden" />
+                {creencia}
+              </label>
+            ))}
+          </div>
+        </div>
+
+        <div className="space-y-4 pt-8 border-t border-slate-100">
+          <label className="block text-sm font-black text-slate-700 uppercase italic">4.3 REESCRITURA NARRATIVA</label>
+          <FormInput multiline name="reescrituraNarrativa" placeholder="Escribe aquí tu aprendizaje del día de hoy..." className="w-full p-6 bg-slate-50 border-2 border-slate-100 rounded-3xl text-sm font-bold text-slate-600 outline-none focus:border-indigo-500 transition-all min-h-[120px]" />
+        </div>
+
+        <div className="space-y-4 pt-8 border-t border-slate-100">
+          <label className="block text-sm font-black text-slate-700 uppercase italic">4.4 VISUALIZACIÓN DE CIERRE</label>
+          <div className="space-y-3">
+            {[
+              "He visualizado mi próxima sesión ejecutando perfectamente mi plan",
+              "He agradecido a mi cuerpo por la información que me dio hoy",
+              "He cerrado emocionalmente la sesión (ni euforia ni culpa)"
+            ].map(v => (
+              <label key={v} className={`p-4 rounded-xl border-2 transition-all cursor-pointer flex items-center gap-3 text-[10px] font-black uppercase ${visualizacionesCierre.includes(v) ? 'bg-emerald-600 border-emerald-600 text-white' : 'bg-slate-50 border-slate-100 text-slate-500 hover:border-emerald-200'}`}>
+                <input type="checkbox" name="visualizacionesCierre" value={v} checked={visualizacionesCierre.includes(v)} onChange={handleInputChange} className="hidden" />
+                <div className={`w-4 h-4 rounded border-2 flex items-center justify-center ${visualizacionesCierre.includes(v) ? 'border-white' : 'border-slate-300'}`}>
+                  {visualizacionesCierre.includes(v) && '✓'}
+                </div>
+                {v}
+              </label>
+            ))}
+          </div>
+        </div>
+
+        <div className="space-y-4 pt-8 border-t border-slate-100">
+          <label className="block text-sm font-black text-slate-700 uppercase italic">4.5 PROTOCOLO DE REACTIVACIÓN VAGAL</label>
+          <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
+            {PROTOCOLOS_VAGALES.map(protocolo => (
+              <label key={protocolo.val} className={`p-4 rounded-xl border-2 cursor-pointer transition-all flex items-center gap-3 ${protocoloReactivacionVagal === protocolo.val ? `${protocolo.color} border-current shadow-md` : 'bg-white border-slate-100 text-slate-400 hover:bg-slate-50'}`}>
+                <input type="radio" name="protocoloReactivacionVagal" value={protocolo.val} checked={protocoloReactivacionVagal === protocolo.val} onChange={handleInputChange} className="accent-indigo-600" />
+                <span className="text-[10px] font-black uppercase">{protocolo.val}</span>
+              </label>
+            ))}
+          </div>
+        </div>
+
+        <div className="space-y-4 pt-8 border-t border-slate-100">
+          <label className="block text-sm font-black text-slate-700 uppercase italic">4.6 COMPROMISO CON EL MAÑANA</label>
+          <FormInput type="text" name="compromisoManana" placeholder="Escribe tu compromiso..." className="w-full p-6 bg-slate-50 border-2 border-slate-100 rounded-3xl text-sm font-bold text-slate-600 outline-none focus:border-indigo-500 transition-all" />
+        </div>
+
+      </div>
+    </section>
+  );
+});
+
+const MESSAGE_STYLES = {
+  success: 'bg-emerald-500 text-white',
+  pending: 'bg-amber-500 text-white',
+  error: 'bg-rose-500 text-white'
+};
+
+const SubmitBar = React.memo(({ message, loading }) => {
+  return (
+    <div className="text-center py-10">
+      {message && <div className={`mb-8 p-5 rounded-3xl text-xs font-black uppercase ${MESSAGE_STYLES[message.type]}`}>{message.text}</div>}
+      <button type="submit" disabled={loading} className="px-24 py-7 bg-slate-900 text-white rounded-[2.5rem] font-black text-xl shadow-2xl transition-all hover:bg-indigo-600 uppercase tracking-widest">
+        {loading ? 'PROCESANDO...' : 'REGISTRAR SESIÓN NEURO'}
+      </button>
+    </div>
+  );
+});
+
+const CHART_DOTS_MAX_POINTS = 60;
+
+const CHART_GRANULARITY_LABELS = {
+  exact: 'Sesiones',
+  day: 'Media diaria',
+  week: 'Media semanal',
+  month: 'Media mensual'
+};
+
+const useElementSize = (ref) => {
+  const [size, setSize] = useState({ width: 0, height: 0 });
+  useEffect(() => {
+    const element = ref.current;
+    if (!element || typeof ResizeObserver !== 'function') return;
+    const observer = new ResizeObserver(([entry]) => {
+      const width = Math.round(entry.contentRect.width);
+      const height = Math.round(entry.contentRect.height);
+      setSize(prev => (prev.width === width && prev.height === height ? prev : { width, height }));
+    });
+    observer.observe(element);
+    return () => observer.disconnect();
+  }, [ref]);
+  return size;
+};
+
+// --- Render en canvas (mapa de calor y series densas) ---
+const prepareCanvas = (canvas, width, height) => {
+  const ratio = window.devicePixelRatio || 1;
+  canvas.width = Math.round(width * ratio);
+  canvas.height = Math.round(height * ratio);
+  const ctx = canvas.getContext('2d');
+  ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+  ctx.clearRect(0, 0, width, height);
+  return ctx;
+};
+
+const roundedRectPath = (ctx, x, y, w, h, r) => {
+  ctx.beginPath();
+  ctx.moveTo(x + r, y);
+  ctx.arcTo(x + w, y, x + w, y + h, r);
+  ctx.arcTo(x + w, y + h, x, y + h, r);
+  ctx.arcTo(x, y + h, x, y, r);
+  ctx.arcTo(x, y, x + w, y, r);
+  ctx.closePath();
+};
+
+// Redibuja en el siguiente frame, como mucho una vez por frame aunque cambien varias dependencias
+const useCanvasDraw = (canvasRef, size, draw) => {
+  useEffect(() => {
+    const canvas = canvasRef.current;
+    if (!canvas || size.width === 0 || size.height === 0) return;
+    const frame = requestAnimationFrame(() => {
+      const ctx = prepareCanvas(canvas, size.width, size.height);
+      const fontFamily = getComputedStyle(canvas).fontFamily;
+      ctx.font = `900 12px ${fontFamily}`;
+      draw(ctx, size, fontFamily);
+    });
+    return () => cancelAnimationFrame(frame);
+  }, [canvasRef, size, draw]);
+};
+
+const CanvasTooltip = ({ tooltip, children }) => {
+  if (!tooltip) return null;
+  return (
+    <div
+      className="pointer-events-none absolute z-10 w-48 bg-slate-800 text-white p-3 rounded-xl shadow-xl border border-slate-700"
+      style={{ left: tooltip.x, top: tooltip.y, transform: 'translate(-50%, calc(-100% - 8px))' }}
+    >
+      {children}
+    </div>
+  );
+};
+
+const SERIES_PADDING = { top: 16, right: 16, bottom: 28, left: 44 };
+
+const seriesLayout = (size, count) => {
+  const plotWidth = size.width - SERIES_PADDING.left - SERIES_PADDING.right;
+  const plotHeight = size.height - SERIES_PADDING.top - SERIES_PADDING.bottom;
+  const step = count > 1 ? plotWidth / (count - 1) : 0;
+  return { plotWidth, plotHeight, step, xAt: (i) => SERIES_PADDING.left + i * step };
+};
+
+// Serie temporal densa en canvas: mismas series y colores que la gráfica SVG, sin puntos por muestra
+const SeriesCanvas = ({ points, series }) => {
+  const containerRef = useRef(null);
+  const canvasRef = useRef(null);
+  const size = useElementSize(containerRef);
+  const [hoverIndex, setHoverIndex] = useState(-1);
+
+  const maxValue = useMemo(() => {
+    let max = 0;
+    points.forEach(point => series.forEach(({ key, axis }) => { if (axis !== 'right' && point[key] > max) max = point[key]; }));
+    return Math.max(25, Math.ceil(max / 25) * 25);
+  }, [points, series]);
+
+  // Eje derecho propio (min-max) para las series en otra escala, como el PnL
+  const rightScale = useMemo(() => {
+    const right = series.filter(({ axis }) => axis === 'right');
+    let min = Infinity;
+    let max = -Infinity;
+    points.forEach(point => right.forEach(({ key }) => {
+      const value = point[key];
+      if (value === null || value === undefined) return;
+      if (value < min) min = value;
+      if (value > max) max = value;
+    }));
+    if (min > max) return null;
+    return min === max ? { min: min - 1, max: max + 1 } : { min, max };
+  }, [points, series]);
+
+  const draw = useCallback((ctx, canvasSize) => {
+    const { plotHeight, step, xAt } = seriesLayout(canvasSize, points.length);
+    const yAt = (value) => SERIES_PADDING.top + plotHeight * (1 - value / maxValue);
+    const yOf = ({ axis }, value) => (axis === 'right' && rightScale
+      ? SERIES_PADDING.top + plotHeight * (1 - (value - rightScale.min) / (rightScale.max - rightScale.min))
+      : yAt(value));
+
+    ctx.setLineDash([6, 6]);
+    ctx.strokeStyle = '#f1f5f9';
+    ctx.fillStyle = '#cbd5e1';
+    ctx.lineWidth = 1;
+    ctx.textAlign = 'right';
+    ctx.textBaseline = 'middle';
+    for (let i = 0; i <= 4; i++) {
+      const value = (maxValue / 4) * i;
+      const y = yAt(value);
+      ctx.beginPath();
+      ctx.moveTo(SERIES_PADDING.left, y);
+      ctx.lineTo(canvasSize.width - SERIES_PADDING.right, y);
+      ctx.stroke();
+      ctx.fillText(String(value), SERIES_PADDING.left - 8, y);
+    }
+    ctx.setLineDash([]);
+    if (rightScale) {
+      ctx.fillStyle = '#7dd3fc';
+      ctx.textBaseline = 'bottom';
+      for (let i = 0; i <= 4; i++) {
+        const value = rightScale.min + ((rightScale.max - rightScale.min) / 4) * i;
+        ctx.fillText(String(Math.round(value)), canvasSize.width - SERIES_PADDING.right, yAt((maxValue / 4) * i) - 2);
+      }
+      ctx.fillStyle = '#cbd5e1';
+    }
+
+    ctx.textAlign = 'center';
+    ctx.textBaseline = 'top';
+    const labelEvery = Math.max(1, Math.ceil(90 / Math.max(step, 1)));
+    for (let i = 0; i < points.length; i += labelEvery) {
+      ctx.fillText(points[i].fecha, xAt(i), canvasSize.height - SERIES_PADDING.bottom + 8);
+    }
+
+    // Los huecos (null: ventana móvil aún incompleta) cortan la línea
+    series.forEach((item) => {
+      ctx.strokeStyle = item.color;
+      ctx.lineWidth = item.lineWidth;
+      ctx.lineJoin = 'round';
+      ctx.setLineDash(item.dash || []);
+      ctx.beginPath();
+      let drawing = false;
+      points.forEach((point, i) => {
+        const value = point[item.key];
+        if (value === null || value === undefined) {
+          drawing = false;
+          return;
+        }
+        if (drawing) ctx.lineTo(xAt(i), yOf(item, value));
+        else ctx.moveTo(xAt(i), yOf(item, value));
+        drawing = true;
+      });
+      ctx.stroke();
+    });
+    ctx.setLineDash([]);
+
+    if (hoverIndex >= 0) {
+      const x = xAt(hoverIndex);
+      ctx.strokeStyle = '#cbd5e1';
+      ctx.lineWidth = 1;
+      ctx.beginPath();
+      ctx.moveTo(x, SERIES_PADDING.top);
+      ctx.lineTo(x, SERIES_PADDING.top + plotHeight);
+      ctx.stroke();
+      series.forEach((item) => {
+        const value = points[hoverIndex][item.key];
+        if (value === null || value === undefined) return;
+        ctx.fillStyle = item.color;
+        ctx.beginPath();
+        ctx.arc(x, yOf(item, value), 5, 0, Math.PI * 2);
+        ctx.fill();
+      });
+    }
+  }, [points, series, maxValue, rightScale, hoverIndex]);
+
+  useCanvasDraw(canvasRef, size, draw);
+
+  const handleMove = (e) => {
+    const rect = e.currentTarget.getBoundingClientRect();
+    const { step } = seriesLayout(size, points.length);
+    const index = step > 0 ? Math.round((e.clientX - rect.left - SERIES_PADDING.left) / step) : 0;
+    setHoverIndex(Math.min(points.length - 1, Math.max(0, index)));
+  };
+
+  const hovered = hoverIndex >= 0 ? points[hoverIndex] : null;
+  const tooltip = hovered && {
+    x: seriesLayout(size, points.length).xAt(hoverIndex),
+    y: SERIES_PADDING.top + 24
+  };
+
+  return (
+    <div ref={containerRef} className="relative h-full w-full">
+      <canvas
+        ref={canvasRef}
+        className="absolute inset-0 h-full w-full"
+        onMouseMove={handleMove}
+        onMouseLeave={() => setHoverIndex(-1)}
+      />
+      <CanvasTooltip tooltip={tooltip}>
+        {hovered && (
+          <React.Fragment>
+            <div className="text-[10px] font-black uppercase text-slate-400 mb-1">{hovered.fecha}</div>
+            {series.map(({ key, label, color }) => (
+              <div key={key} className="flex justify-between text-xs font-bold">
+                <span>{label}:</span>
+                <span style={{ color }}>{hovered[key] ?? '-'}</span>
+              </div>
+            ))}
+          </React.Fragment>
+        )}
+      </CanvasTooltip>
+    </div>
+  );
+};
+
+const EVOLUTION_SERIES = [
+  { key: 'ic', label: 'IC', color: '#10b981', lineWidth: 3 },
+  { key: 'presencia', label: 'Presencia', color: '#6366f1', lineWidth: 2 }
+];
+
+// Superposiciones móviles: color por métrica, trazo por estadístico
+const ROLLING_METRIC_LABELS = { ic: 'IC', presencia: 'Presencia', energia: 'Energía', pnl: 'PnL', eficiencia: 'Eficiencia' };
+const ROLLING_METRIC_COLORS = { ic: '#047857', presencia: '#4338ca', energia: '#f59e0b', pnl: '#0ea5e9', eficiencia: '#a855f7' };
+const ROLLING_STAT_LABELS = { media: 'MM', desviacion: 'σ', ewma: 'EWMA' };
+const ROLLING_STAT_DASH = { media: [], desviacion: [2, 4], ewma: [8, 4] };
+const ROLLING_MAX_OVERLAYS = 6;
+
+const overlaySeriesOf = (keys) => keys.map(key => {
+  const { metric, stat, window } = parseRollingOverlay(key);
+  return {
+    key,
+    label: `${ROLLING_STAT_LABELS[stat]}${window} ${ROLLING_METRIC_LABELS[metric]}`,
+    color: ROLLING_METRIC_COLORS[metric],
+    lineWidth: 1.5 + ROLLING_WINDOWS.indexOf(window) * 0.75,
+    dash: ROLLING_STAT_DASH[stat],
+    axis: metric === 'pnl' ? 'right' : 'left'
+  };
+});
+
+const OverlayPicker = React.memo(({ selected, onChange }) => {
+  const [metric, setMetric] = useState('ic');
+  const toggle = (id) => {
+    if (selected.includes(id)) onChange(selected.filter(item => item !== id));
+    else if (selected.length < ROLLING_MAX_OVERLAYS) onChange([...selected, id]);
+  };
+  const chipClass = 'px-3 py-1 rounded-full text-[10px] font-black uppercase transition-all';
+
+  return (
+    <div className="flex flex-wrap items-center gap-2 mb-8">
+      <span className="text-[10px] font-black text-slate-400 uppercase tracking-widest mr-2">Ventanas móviles</span>
+      <select value={metric} onChange={(e) => setMetric(e.target.value)} className="bg-slate-50 border-2 border-slate-100 rounded-lg px-2 py-1 text-[10px] font-black uppercase text-slate-600 outline-none">
+        {ROLLING_METRICS.map(key => <option key={key} value={key}>{ROLLING_METRIC_LABELS[key]}</option>)}
+      </select>
+      {ROLLING_STATS.map(stat => ROLLING_WINDOWS.map(window => {
+        const id = rollingOverlayId(metric, stat, window);
+        const active = selected.includes(id);
+        return (
+          <button key={id} type="button" onClick={() => toggle(id)} className={`${chipClass} ${active ? 'bg-slate-900 text-white' : 'bg-slate-100 text-slate-500 hover:bg-slate-200'}`}>
+            {ROLLING_STAT_LABELS[stat]}{window}
+          </button>
+        );
+      }))}
+      {overlaySeriesOf(selected).map(({ key, label, color }) => (
+        <button key={key} type="button" onClick={() => toggle(key)} title="Quitar" className={`${chipClass} bg-white border-2`} style={{ borderColor: color, color }}>
+          {label} ×
+        </button>
+      ))}
+    </div>
+  );
+});
+
+// Aviso mientras el rango seleccionado se sigue descargando en segundo plano
+const CoverageNotice = ({ coverage, className = '' }) => (coverage.complete ? null : (
+  <p className={`text-[10px] font-black text-amber-600 uppercase tracking-widest animate-pulse ${className}`}>
+    Datos parciales · {coverage.total === null ? `${coverage.loaded} sesiones cargadas` : `${coverage.loaded} de ${coverage.total} sesiones cargadas`}
+  </p>
+));
+
+// Serie ya reducida en el worker; NaN pasa a null
+const EvolutionChart = React.memo(({ series, overlays, coverage, selectedOverlays, onOverlaysChange, onWidthChange }) => {
+  const containerRef = useRef(null);
+  const { width } = useElementSize(containerRef);
+  useEffect(() => onWidthChange(width), [width, onWidthChange]);
+  const overlaySeries = useMemo(() => overlaySeriesOf(overlays.keys), [overlays]);
+  const canvasSeries = useMemo(() => EVOLUTION_SERIES.concat(overlaySeries), [overlaySeries]);
+  const incompleteLabels = useMemo(() => overlaySeriesOf(overlays.incomplete).map(item => item.label).join(', '), [overlays]);
+  const points = useMemo(
+    () => series.labels.map((fecha, i) => {
+      const point = { fecha, ic: series.ic[i], presencia: series.presencia[i], energia: series.energia[i] };
+      overlays.keys.forEach((key, k) => {
+        const value = overlays.values[k][i];
+        point[key] = value === undefined || Number.isNaN(value) ? null : Math.round(value * 10) / 10;
+      });
+      return point;
+    }),
+    [series, overlays]
+  );
+
+  return (
+    <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 p-10">
+      <div className="flex justify-between items-baseline mb-6">
+        <h2 className="text-2xl font-black text-slate-900 uppercase italic tracking-tighter">Evolución Neuro-Técnica</h2>
+        {series.total > 0 && (
+          <span className="text-[10px] font-black text-slate-400 uppercase tracking-widest">
+            {CHART_GRANULARITY_LABELS[series.granularity]}{points.length < series.total ? ` · ${points.length} de ${series.total} puntos` : ''}
+          </span>
+        )}
+      </div>
+      {series.partial && <CoverageNotice coverage={coverage} className="-mt-4 mb-6" />}
+      <OverlayPicker selected={selectedOverlays} onChange={onOverlaysChange} />
+      {overlays.pending && (
+        <p className="-mt-6 mb-6 text-[10px] font-black text-slate-400 uppercase tracking-widest">Las ventanas móviles se dibujan al terminar de cargar el rango</p>
+      )}
+      {incompleteLabels && (
+        <p className="-mt-6 mb-6 text-[10px] font-black text-amber-600 uppercase tracking-widest">Sin historial suficiente antes del rango (no se dibujan): {incompleteLabels}</p>
+      )}
+      <div ref={containerRef} className="h-[400px] w-full">
+        {points.length < 1 ? (
+          <div className="h-full flex items-center justify-center bg-slate-50 rounded-[2rem] border-4 border-dashed border-slate-100">
+            <p className="text-slate-300 font-black uppercase">Sin registros en este periodo</p>
+          </div>
+        ) : (
+          points.length > CHART_DOTS_MAX_POINTS ? (
+            <SeriesCanvas points={points} series={canvasSeries} />
+          ) : (
+            <React.Suspense fallback={<ChartPlaceholder />}>
+              <EvolutionLineChart chartData={points} overlays={overlaySeries} />
+            </React.Suspense>
+          )
+        )}
+      </div>
+    </section>
+  );
+});
+
+// Correlaciones y atribución del rango filtrado: llegan calculadas del worker sobre columnas tipadas
+const ATTRIBUTION_LABELS = {
+  ic: 'IC', energia: 'Energía', presencia: 'Presencia', revisadoPlan: 'Plan revisado', ritualCoherencia: 'Ritual coherencia',
+  estadoSistemaNervioso: 'Sistema nervioso', pnl: 'PnL', eficiencia: 'Eficiencia plan', respetoStopTP: 'Respeto Stop/TP'
+};
+const bandLabelsOf = (bands) => bands.map((limit, i) => (i === 0 ? `< ${limit}` : `${bands[i - 1]} - ${limit - 1}`)).concat(`≥ ${bands[bands.length - 1]}`);
+const ATTRIBUTION_GROUP_LABELS = {
+  estadoSistemaNervioso: ['🟢 Ventral', '🟡 Simpático', '🔴 Dorsal'],
+  revisadoPlan: ['No', 'Sí'],
+  ritualCoherencia: ['No', 'Sí'],
+  ic: bandLabelsOf(ATTRIBUTION_BANDS.ic),
+  energia: bandLabelsOf(ATTRIBUTION_BANDS.energia),
+  presencia: bandLabelsOf(ATTRIBUTION_BANDS.presencia)
+};
+
+const formatStat = (value, digits = 0, suffix = '') => (Number.isNaN(value) ? '—' : `${value.toFixed(digits)}${suffix}`);
+const correlationStyle = (r) => {
+  if (Number.isNaN(r)) return { color: '#cbd5e1' };
+  const alpha = Math.min(1, Math.abs(r)) * 0.85;
+  return {
+    backgroundColor: r >= 0 ? `rgba(16, 185, 129, ${alpha})` : `rgba(244, 63, 94, ${alpha})`,
+    color: alpha > 0.45 ? '#ffffff' : '#334155'
+  };
+};
+
+const AttributionPanel = React.memo(({ attribution, coverage }) => {
+  const correlationOf = useMemo(() => {
+    const byPair = new Map(attribution.correlations.map(item => [`${item.input}:${item.outcome}`, item]));
+    return (input, outcome) => byPair.get(`${input}:${outcome}`);
+  }, [attribution]);
+  const headerClass = 'px-4 py-3 text-[10px] font-black uppercase tracking-tighter text-slate-500';
+
+  return (
+    <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 p-10">
+      <div className="flex justify-between items-baseline mb-8">
+        <h2 className="text-2xl font-black text-slate-900 uppercase italic tracking-tighter">Atribución Pre-Mercado → Resultado</h2>
+        {attribution.total > 0 && (coverage.complete ? (
+          <span className="text-[10px] font-black text-slate-400 uppercase tracking-widest">{attribution.total} sesiones en el periodo</span>
+        ) : (
+          // Mientras el rango se descarga, el total del periodo sale del count() de Firestore
+          <span className="text-[10px] font-black text-amber-600 uppercase tracking-widest">
+            {attribution.total} sesiones cargadas{coverage.total === null ? '' : ` de ${coverage.total}`}
+          </span>
+        ))}
+      </div>
+      {attribution.total < 1 ? (
+        <div className="h-40 flex items-center justify-center bg-slate-50 rounded-[2rem] border-4 border-dashed border-slate-100">
+          <p className="text-slate-300 font-black uppercase">Sin registros en este periodo</p>
+        </div>
+      ) : (
+        <React.Fragment>
+          <div className="overflow-x-auto mb-10">
+            <table className="w-full text-left">
+              <thead className="bg-slate-50">
+                <tr>
+                  <th className={headerClass}>Correlación (r de Pearson)</th>
+                  {ATTRIBUTION_OUTCOMES.map(outcome => <th key={outcome} className={`${headerClass} text-center`}>{ATTRIBUTION_LABELS[outcome]}</th>)}
+                </tr>
+              </thead>
+              <tbody className="divide-y divide-slate-100">
+                {ATTRIBUTION_INPUTS.map(input => (
+                  <tr key={input}>
+                    <td className="px-4 py-3 font-black text-slate-700 text-xs uppercase">{ATTRIBUTION_LABELS[input]}</td>
+                    {ATTRIBUTION_OUTCOMES.map(outcome => {
+                      const { r, n } = correlationOf(input, outcome);
+                      return (
+                        <td key={outcome} className="px-2 py-2 text-center">
+                          <span title={`${n} sesiones con ambos valores`} className="inline-block min-w-[4rem] px-3 py-1 rounded-full text-xs font-black" style={correlationStyle(r)}>
+                            {formatStat(r, 2)}
+                          </span>
+                        </td>
+                      );
+                    })}
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+
+          <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
+            {attribution.factors.map(({ factor, groups }) => (
+              <div key={factor} className="bg-slate-50 rounded-3xl border border-slate-100 overflow-hidden">
+                <div className="px-5 py-3 text-[10px] font-black uppercase tracking-widest text-slate-500 border-b border-slate-100">{ATTRIBUTION_LABELS[factor]}</div>
+                <table className="w-full text-left">
+                  <thead>
+                    <tr className="text-[9px] font-black uppercase tracking-tighter text-slate-400">
+                      <th className="px-4 py-2">Grupo</th>
+                      <th className="px-2 py-2 text-right">Sesiones</th>
+                      <th className="px-2 py-2 text-right">PnL medio</th>
+                      <th className="px-2 py-2 text-right">% Ganadoras</th>
+                      <th className="px-2 py-2 text-right">Eficiencia</th>
+                      <th className="px-2 py-2 text-right">Stop/TP</th>
+                      <th className="px-4 py-2 text-right">Exceso PnL</th>
+                    </tr>
+                  </thead>
+                  <tbody className="divide-y divide-slate-100 text-xs font-bold text-slate-600">
+                    {groups.map((group, i) => (
+                      <tr key={i}>
+                        <td className="px-4 py-2 font-black text-slate-800">{ATTRIBUTION_GROUP_LABELS[factor][i]}</td>
+                        <td className="px-2 py-2 text-right">{group.count}</td>
+                        <td className={`px-2 py-2 text-right font-black ${group.pnlMedio >= 0 ? 'text-emerald-600' : 'text-rose-600'}`}>{formatStat(group.pnlMedio)}</td>
+                        <td className="px-2 py-2 text-right">{formatStat(group.aciertos * 100, 0, '%')}</td>
+                        <td className="px-2 py-2 text-right">{formatStat(group.eficiencia, 0, '%')}</td>
+                        <td className="px-2 py-2 text-right">{formatStat(group.respetoMedio, 1)}</td>
+                        <td className={`px-4 py-2 text-right font-black ${group.exceso >= 0 ? 'text-emerald-600' : 'text-rose-600'}`}>
+                          {group.exceso > 0 ? '+' : ''}{Math.round(group.exceso)}
+                        </td>
+                      </tr>
+                    ))}
+                  </tbody>
+                </table>
               </div>
+            ))}
+          </div>
+          <p className="mt-6 text-[10px] font-bold text-slate-400 italic">
+            Exceso PnL: lo que el grupo ganó o perdió por encima de lo que habría dado el PnL medio del periodo con las mismas sesiones.
+          </p>
+        </React.Fragment>
+      )}
+    </section>
+  );
+});
+
+const AuditHistoryTable = React.memo(({ audits, coverage, onOpenDetail }) => {
+  const auditRows = useVirtualRows(audits.length, AUDIT_ROW_HEIGHT);
+
+  return (
+    <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 overflow-hidden">
+      <div className="bg-slate-900 p-8 text-white">
+        <h2 className="text-xl font-black uppercase tracking-widest italic">Historial Detallado de Auditorías</h2>
+        <p className="text-slate-400 text-[10px] font-bold uppercase mt-1">Registros completos para análisis de progresión subconsciente</p>
+      </div>
+      <div className="overflow-auto" style={{ maxHeight: VIRTUAL_VIEWPORT_HEIGHT }} onScroll={auditRows.onScroll}>
+        <table className="w-full text-left min-w-[1000px]">
+          <thead className="sticky top-0 z-10 bg-slate-50 text-slate-500 text-[10px] font-black uppercase tracking-tighter">
+            <tr>
+              <th className="px-6 py-4 border-b">Fecha</th>
+              <th className="px-6 py-4 border-b">Hora Inicio</th>
+              <th className="px-6 py-4 border-b">IC Inicial</th>
+              <th className="px-6 py-4 border-b">Energía</th>
+              <th className="px-6 py-4 border-b">Presencia</th>
+              <th className="px-6 py-4 border-b">Plan Rev.</th>
+              <th className="px-6 py-4 border-b">PnL Diaro</th>
+              <th className="px-6 py-4 border-b">Eficiencia Plan</th>
+              <th className="px-6 py-4 border-b">Identidad</th>
+              <th className="px-6 py-4 border-b">SN Final</th>
+            </tr>
+          </thead>
+          <tbody className="divide-y divide-slate-100">
+            {audits.length > 0 ? (
+              <React.Fragment>
+                {auditRows.padTop > 0 && <tr aria-hidden="true" style={{ height: auditRows.padTop }} />}
+                {audits.slice(auditRows.start, auditRows.end).map((audit) => {
+                  return (
+                    <tr key={audit.id} onClick={() => onOpenDetail(audit)} className="hover:bg-indigo-50/30 transition-colors cursor-pointer" style={{ height: AUDIT_ROW_HEIGHT }}>
+                      <td className="px-6 py-4 font-black text-slate-900 text-xs">{audit.dayKey}</td>
+                      <td className="px-6 py-4 font-bold text-indigo-500 text-xs">{audit.horaInicioSesion || "-"}</td>
+                      <td className="px-6 py-4">
+                        <span className={`px-3 py-1 rounded-full text-[10px] font-black ${audit.ic >= 70 ? 'bg-emerald-100 text-emerald-700' : 'bg-rose-100 text-rose-700'}`}>
+                          {audit.ic}%
+                        </span>
+                      </td>
+                      <td className="px-6 py-4 font-bold text-slate-600 text-xs">{audit.energia}/10</td>
+                      <td className="px-6 py-4 font-bold text-slate-600 text-xs">{audit.presencia}/10</td>
+                      <td className="px-6 py-4 font-black text-xs">
+                        {audit.revisadoPlan === 'Sí' ? <span className="text-emerald-600">SÍ</span> : <span className="text-rose-600">NO</span>}
+                      </td>
+                      <td className={`px-6 py-4 font-black text-xs ${audit.pnl >= 0 ? 'text-emerald-600' : 'text-rose-600'}`}>
+                        {audit.pnl}
+                      </td>
+                      <td className="px-6 py-4">
+                        <div className="w-full bg-slate-100 h-1.5 rounded-full overflow-hidden max-w-[80px]">
+                          <div className="h-full bg-indigo-500" style={{ width: `${audit.eficiencia}%` }}></div>
+                        </div>
+                        <span className="text-[9px] font-black text-slate-400 mt-1 block">{audit.eficiencia}%</span>
+                      </td>
+                      <td className="px-6 py-4 font-bold text-indigo-600 text-xs">{audit.anclaje}/10</td>
+                      <td className="px-6 py-4 text-[9px] font-black text-slate-500 max-w-[150px] truncate uppercase">{audit.estadoSistemaNerviosoFinal || '-'}</td>
+                    </tr>
+                  );
+                })}
+                {auditRows.padBottom > 0 && <tr aria-hidden="true" style={{ height: auditRows.padBottom }} />}
+              </React.Fragment>
+            ) : (
+              <tr>
+                <td colSpan="10" className="px-6 py-12 text-center text-slate-300 font-black uppercase tracking-widest text-xs italic">
+                  No hay registros que coincidan con los filtros seleccionados
+                </td>
+              </tr>
+            )}
+          </tbody>
+        </table>
+      </div>
+      {!coverage.complete && (
+        <div className="p-6 text-center border-t border-slate-100">
+          <CoverageNotice coverage={coverage} />
+        </div>
+      )}
+    </section>
+  );
+});
+
+const ReprogrammingHistoryTable = React.memo(({ audits, onOpenDetail }) => {
+  const reprogrammingRows = useVirtualRows(audits.length, REPROGRAMMING_ROW_HEIGHT);
+
+  return (
+    <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 overflow-hidden mb-20">
+      <div className="bg-indigo-900 p-8 text-white">
+        <h2 className="text-xl font-black uppercase tracking-widest italic">Historial de Reprogramación y Cierre (Punto 4)</h2>
+        <p className="text-indigo-300 text-[10px] font-bold uppercase mt-1">Monitoreo de anclajes de identidad y protocolos vagales</p>
+      </div>
+      <div className="overflow-auto" style={{ maxHeight: VIRTUAL_VIEWPORT_HEIGHT }} onScroll={reprogrammingRows.onScroll}>
+        <table className="w-full text-left min-w-[1000px]">
+          <thead className="sticky top-0 z-10 bg-indigo-50 text-indigo-900/40 text-[10px] font-black uppercase tracking-tighter">
+            <tr>
+              <th className="px-6 py-4 border-b">Fecha</th>
+              <th className="px-6 py-4 border-b">Anclaje Identidad</th>
+              <th className="px-6 py-4 border-b">Protocolo Vagal</th>
+              <th className="px-6 py-4 border-b">Creencias Instaladas</th>
+              <th className="px-6 py-4 border-b">Cierres Realizados</th>
+              <th className="px-6 py-4 border-b">Narrativa / Compromiso</th>
+            </tr>
+          </thead>
+          <tbody className="divide-y divide-slate-100">
+            {audits.length > 0 ? (
+              <React.Fragment>
+                {reprogrammingRows.padTop > 0 && <tr aria-hidden="true" style={{ height: reprogrammingRows.padTop }} />}
+                {audits.slice(reprogrammingRows.start, reprogrammingRows.end).map((audit) => (
+                  <tr key={`p4-${audit.id}`} className="hover:bg-indigo-50/20 transition-colors" style={{ height: REPROGRAMMING_ROW_HEIGHT }}>
+                    <td className="px-6 py-4 font-black text-slate-900 text-xs">{audit.dayKey}</td>
+                    <td className="px-6 py-4">
+                      <div className="flex items-center gap-2">
+                        <span className={`w-8 h-8 rounded-lg flex items-center justify-center font-black text-[10px] ${audit.anclaje >= 8 ? 'bg-emerald-500 text-white' : 'bg-amber-500 text-white'}`}>
+                          {audit.anclaje}
+                        </span>
+                        <span className="text-[9px] font-bold text-slate-400 uppercase tracking-tight italic">/10</span>
+                      </div>
+                    </td>
+                    <td className="px-6 py-4 font-black text-[10px] text-indigo-700 uppercase italic">
+                      {audit.protocoloReactivacionVagal || (PROTOCOLOS_VAGALES[audit.protocoloVagal] || {}).val || (audit.protocoloVagal === -1 ? (
+                        <button type="button" onClick={() => onOpenDetail(audit)} className="text-indigo-500 hover:text-indigo-700 uppercase italic">Ver protocolo →</button>
+                      ) : 'No registrado')}
+                    </td>
+                    <td className="px-6 py-4">
+                      <div className="flex flex-wrap gap-1 max-w-[250px] max-h-[72px] overflow-hidden">
+                        {audit.creenciasInstaladas.length > 0 ? (
+                          audit.creenciasInstaladas.map((c, idx) => (
+                            <span key={idx} className="bg-indigo-50 text-indigo-600 px-2 py-0.5 rounded-md text-[8px] font-black uppercase border border-indigo-100">
+                              {c}
+                            </span>
+                          ))
+                        ) : audit.numCreenciasInstaladas > 0 ? (
+                          <button type="button" onClick={() => onOpenDetail(audit)} className="text-[10px] font-black text-indigo-500 hover:text-indigo-700 uppercase italic">
+                            {audit.numCreenciasInstaladas} creencias →
+                          </button>
+                        ) : <span className="text-slate-300 italic text-[9px]">Sin creencias</span>}
+                      </div>
+                    </td>
+                    <td className="px-6 py-4">
+                      <div className="flex items-center gap-1">
+                        <span className="text-emerald-500 font-black text-xs">
+                          {audit.numVisualizacionesCierre}
+                        </span>
+                        <span className="text-[9px] font-bold text-slate-400 uppercase">/3 Pasos</span>
+                      </div>
+                    </td>
+                    <td className="px-6 py-4">
+                      <div className="max-w-[300px]">
+                        {audit.reescrituraNarrativa || !audit.tieneNarrativa ? (
+                          <p className="text-[10px] font-bold text-slate-600 italic line-clamp-2 mb-1">
+                            "{audit.reescrituraNarrativa || 'Sin narrativa...'}"
+                          </p>
+                        ) : (
+                          <button type="button" onClick={() => onOpenDetail(audit)} className="text-[10px] font-black text-indigo-500 hover:text-indigo-700 uppercase italic mb-1">
+                            Leer narrativa →
+                          </button>
+                        )}
+                        {audit.compromisoManana || !audit.tieneCompromiso ? (
+                          <p className="text-[9px] font-black text-indigo-600 uppercase tracking-tighter truncate border-t border-slate-50 pt-1">
+                            🎯 {audit.compromisoManana || 'Sin compromiso'}
+                          </p>
+                        ) : (
+                          <button type="button" onClick={() => onOpenDetail(audit)} className="block text-[9px] font-black text-indigo-500 hover:text-indigo-700 uppercase tracking-tighter border-t border-slate-50 pt-1">
+                            🎯 Ver compromiso →
+                          </button>
+                        )}
+                      </div>
+                    </td>
+                  </tr>
+                ))}
+                {reprogrammingRows.padBottom > 0 && <tr aria-hidden="true" style={{ height: reprogrammingRows.padBottom }} />}
+              </React.Fragment>
+            ) : (
+              <tr>
+                <td colSpan="6" className="px-6 py-12 text-center text-slate-300 font-black uppercase tracking-widest text-xs italic">
+                  Sin datos de reprogramación en este periodo
+                </td>
+              </tr>
+            )}
+          </tbody>
+        </table>
+      </div>
+    </section>
+  );
+});
+
+// --- Detalle completo de una sesión (bajo demanda) ---
+const auditDetails = new Map();
+
+const loadAuditDetail = (id) => {
+  if (!auditDetails.has(id)) {
+    const stop = perfMonitor.start('firestore:auditDetail');
+    const request = getDoc(doc(auditsCollection(), id)).then(snap => {
+      stop();
+      return snap.exists() ? snap.data() : null;
+    });
+    request.catch(() => auditDetails.delete(id));
+    auditDetails.set(id, request);
+  }
+  return auditDetails.get(id);
+};
+
+const useAuditDetail = (id) => {
+  const [state, setState] = useState({ id: null, data: null, error: null });
+  useEffect(() => {
+    let active = true;
+    loadAuditDetail(id).then(
+      (data) => active && setState({ id, data, error: null }),
+      (error) => active && setState({ id, data: null, error })
+    );
+    return () => {
+      active = false;
+    };
+  }, [id]);
+  return state.id === id ? { ...state, loading: false } : { id, data: null, error: null, loading: true };
+};
+
+const AUDIT_DETAIL_TEXTS = [
+  ['detallesSesion', 'Detalles de la sesión'],
+  ['sensacionCorporal', 'Sensación corporal'],
+  ['reescrituraNarrativa', 'Reescritura narrativa'],
+  ['aprendizajeMentor', 'Aprendizaje del mentor'],
+  ['compromisoManana', 'Compromiso de mañana']
+];
+
+const AUDIT_DETAIL_LISTS = [
+  ['sesgosNeuroCognitivos', 'Sesgos neuro-cognitivos'],
+  ['marcadoresSomaticos', 'Marcadores somáticos'],
+  ['emocionesDetectadas', 'Emociones detectadas'],
+  ['creenciasInstaladas', 'Creencias instaladas'],
+  ['visualizacionesCierre', 'Visualizaciones de cierre']
+];
+
+const AuditDetailModal = React.memo(({ audit, onClose }) => {
+  const { data, error, loading } = useAuditDetail(audit.id);
+  // Los mapas por pérdida usan claves 1..n, igual que el formulario
+  const losses = data ? Array.from({ length: Math.min(parseInt(data.numPerdidasHoy, 10) || 0, 20) }, (_, i) => i + 1) : [];
+
+  return (
+    <div className="fixed inset-0 z-50 flex items-center justify-center p-4 bg-slate-900/80 backdrop-blur-sm" onClick={onClose}>
+      <div className="bg-white rounded-[2rem] max-w-2xl w-full max-h-[85vh] shadow-2xl overflow-hidden flex flex-col animate-in zoom-in-95" onClick={(e) => e.stopPropagation()}>
+        <div className="bg-slate-900 p-8 text-white flex justify-between items-start">
+          <div>
+            <h3 className="text-2xl font-black uppercase italic tracking-tighter">{audit.nombreTrader}</h3>
+            <p className="text-slate-400 text-[10px] font-bold uppercase mt-1">{audit.dayKey || 'Sin fecha'} · {audit.horaInicioSesion || '-'}</p>
+          </div>
+          <button type="button" onClick={onClose} className="px-4 py-2 rounded-xl bg-slate-800 hover:bg-slate-700 text-[10px] font-black uppercase">Cerrar</button>
+        </div>
+        <div className="p-8 space-y-6 overflow-y-auto">
+          {loading && <SkeletonBlock className="h-40" />}
+          {error && <p className="text-xs font-black text-rose-600 uppercase">No se pudo cargar el detalle de la sesión.</p>}
+          {!loading && !error && !data && <p className="text-xs font-black text-slate-400 uppercase">La auditoría ya no existe.</p>}
+          {data && (
+            <React.Fragment>
+              {AUDIT_DETAIL_TEXTS.filter(([field]) => data[field]).map(([field, label]) => (
+                <div key={field}>
+                  <span className="block text-[9px] font-black text-slate-400 uppercase tracking-widest mb-1">{label}</span>
+                  <p className="text-sm font-bold text-slate-700 whitespace-pre-wrap">{data[field]}</p>
+                </div>
+              ))}
+              {losses.length > 0 && (
+                <div>
+                  <span className="block text-[9px] font-black text-slate-400 uppercase tracking-widest mb-2">Pérdidas del día</span>
+                  <ul className="space-y-1 text-xs font-bold text-slate-600">
+                    {losses.map(index => (
+                      <li key={index}>Pérdida {index}: {(data.tiposPorPerdida || {})[index] || '-'} · {(data.emocionesPorPerdida || {})[index] || '-'}</li>
+                    ))}
+                  </ul>
+                  {data.sensacionCorporalPerdida && <p className="mt-2 text-xs font-bold text-rose-600">{data.sensacionCorporalPerdida}</p>}
+                </div>
+              )}
+              {AUDIT_DETAIL_LISTS.filter(([field]) => (data[field] || []).length > 0).map(([field, label]) => (
+                <div key={field}>
+                  <span className="block text-[9px] font-black text-slate-400 uppercase tracking-widest mb-2">{label}</span>
+                  <div className="flex flex-wrap gap-1">
+                    {data[field].map((value, idx) => (
+                      <span key={idx} className="bg-indigo-50 text-indigo-600 px-2 py-0.5 rounded-md text-[9px] font-black uppercase border border-indigo-100">{value}</span>
+                    ))}
+                  </div>
+                </div>
+              ))}
+            </React.Fragment>
+          )}
+        </div>
+      </div>
+    </div>
+  );
+});
+
+// Misma rejilla que la versión en divs
+const HEATMAP_DAY_NAMES = ['Domingo', 'Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado'];
+const HEATMAP_HEADER_HEIGHT = 48;
+const HEATMAP_ROW_HEIGHT = 80;
+const HEATMAP_COMPACT_ROW_HEIGHT = 18;
+const EMPTY_HEATMAP_CELL = { count: 0, avgIC: 0, avgPnL: 0 };
+
+const formatMinuteOfDay = (minute) => `${pad2(Math.floor(minute / 60))}:${pad2(minute % 60)}`;
+
+const heatmapLayoutGeometry = (layout, width) => {
+  const columns = layout.config.days.length;
+  const compact = layout.slotsPerDay > 12;
+  const rowHeight = compact ? HEATMAP_COMPACT_ROW_HEIGHT : HEATMAP_ROW_HEIGHT;
+  const gap = compact ? 2 : 8;
+  const columnWidth = (width - columns * 8) / (columns + 1);
+  return {
+    compact,
+    rowHeight,
+    gap,
+    columnWidth,
+    height: HEATMAP_HEADER_HEIGHT + layout.slotsPerDay * (rowHeight + gap),
+    cellX: (di) => (di + 1) * (columnWidth + 8),
+    cellY: (slot) => HEATMAP_HEADER_HEIGHT + gap + slot * (rowHeight + gap)
+  };
+};
+
+// Celda bajo el puntero en O(1): índice de columna y fila por división, descartando los huecos
+const hitTestHeatmap = (layout, width, x, y) => {
+  const { columnWidth, rowHeight, gap } = heatmapLayoutGeometry(layout, width);
+  const column = Math.floor(x / (columnWidth + 8)) - 1;
+  const rowOffset = y - HEATMAP_HEADER_HEIGHT - gap;
+  const row = Math.floor(rowOffset / (rowHeight + gap));
+  if (column < 0 || column >= layout.config.days.length || rowOffset < 0 || row >= layout.slotsPerDay) return null;
+  if (x - (column + 1) * (columnWidth + 8) > columnWidth) return null;
+  if (rowOffset - row * (rowHeight + gap) > rowHeight) return null;
+  return { di: column, slot: row };
+};
+
+const HeatmapCanvas = React.memo(({ heatmapData }) => {
+  const containerRef = useRef(null);
+  const canvasRef = useRef(null);
+  const size = useElementSize(containerRef);
+  const [hover, setHover] = useState(null);
+  const { layout, cells } = heatmapData;
+  const { config, slotsPerDay } = layout;
+  const cellAt = (di, slot) => cells[di * slotsPerDay + slot] || EMPTY_HEATMAP_CELL;
+  const slotStart = (slot) => config.startMinute + slot * config.bucketMinutes;
+
+  const draw = useCallback((ctx, canvasSize, fontFamily) => {
+    const { compact, rowHeight, columnWidth, cellX, cellY } = heatmapLayoutGeometry(layout, canvasSize.width);
+
+    ctx.textBaseline = 'middle';
+    ctx.fillStyle = '#64748b';
+    ctx.textAlign = 'center';
+    config.days.forEach((d, di) => {
+      ctx.fillText(HEATMAP_DAY_NAMES[d].toUpperCase(), cellX(di) + columnWidth / 2, HEATMAP_HEADER_HEIGHT / 2);
+    });
+    ctx.fillStyle = '#94a3b8';
+    ctx.textAlign = 'right';
+    for (let slot = 0; slot < slotsPerDay; slot++) {
+      const minute = slotStart(slot);
+      if (compact && minute % 60 !== 0) continue;
+      ctx.fillText(formatMinuteOfDay(minute), columnWidth - 16, cellY(slot) + rowHeight / 2);
+    }
+
+    ctx.textAlign = 'center';
+    for (let slot = 0; slot < slotsPerDay; slot++) {
+      config.days.forEach((d, di) => {
+        const cell = cellAt(di, slot);
+        const hovered = hover && hover.di === di && hover.slot === slot;
+        const grow = hovered ? 0.025 : 0;
+        const x = cellX(di) - columnWidth * grow;
+        const y = cellY(slot) - rowHeight * grow;
+        const w = columnWidth * (1 + 2 * grow);
+        const h = rowHeight * (1 + 2 * grow);
+        ctx.save();
+        if (hovered) {
+          ctx.shadowColor = 'rgba(0, 0, 0, 0.15)';
+          ctx.shadowBlur = 15;
+          ctx.shadowOffsetY = 6;
+        }
+        ctx.fillStyle = HEATMAP_COLORS[getHeatmapLevel(cell)];
+        roundedRectPath(ctx, x, y, w, h, compact ? 4 : 12);
+        ctx.fill();
+        ctx.restore();
+        if (cell.count > 0 && !compact) {
+          ctx.fillStyle = '#ffffff';
+          ctx.font = `900 12px ${fontFamily}`;
+          ctx.fillText(`${cell.avgIC}% IC`, x + w / 2, y + h / 2 - 8);
+          ctx.globalAlpha = 0.9;
+          ctx.font = `700 10px ${fontFamily}`;
+          ctx.fillText(`$${cell.avgPnL}`, x + w / 2, y + h / 2 + 9);
+          ctx.globalAlpha = 1;
+        }
+      });
+    }
+  }, [layout, cells, hover]);
+
+  useCanvasDraw(canvasRef, size, draw);
+
+  const handleMove = (e) => {
+    const rect = e.currentTarget.getBoundingClientRect();
+    const hit = hitTestHeatmap(layout, size.width, e.clientX - rect.left, e.clientY - rect.top);
+    setHover(prev => (prev === hit || (prev && hit && prev.di === hit.di && prev.slot === hit.slot) ? prev : hit));
+  };
+
+  const geometry = heatmapLayoutGeometry(layout, size.width);
+  const hoveredCell = hover && cellAt(hover.di, hover.slot);
+  const tooltip = hover && { x: geometry.cellX(hover.di) + geometry.columnWidth / 2, y: geometry.cellY(hover.slot) };
+
+  return (
+    <div ref={containerRef} className="relative w-full" style={{ height: geometry.height }}>
+      <canvas
+        ref={canvasRef}
+        className={`absolute inset-0 h-full w-full ${hover ? 'cursor-pointer' : ''}`}
+        onMouseMove={handleMove}
+        onMouseLeave={() => setHover(null)}
+      />
+      <CanvasTooltip tooltip={tooltip}>
+        {hoveredCell && (
+          <React.Fragment>
+            <div className="text-[10px] font-black uppercase text-slate-400 mb-1">
+              {HEATMAP_DAY_NAMES[config.days[hover.di]]} - {formatMinuteOfDay(slotStart(hover.slot))}
+              {config.bucketMinutes !== 60 && ` a ${formatMinuteOfDay(Math.min(slotStart(hover.slot) + config.bucketMinutes, MINUTES_PER_DAY) % MINUTES_PER_DAY)}`}
+            </div>
+            <div className="flex justify-between text-xs font-bold mb-1">
+              <span>Promedio IC:</span>
+              <span className={hoveredCell.avgIC >= 65 ? 'text-emerald-400' : 'text-rose-400'}>{hoveredCell.avgIC}%</span>
+            </div>
+            <div className="flex justify-between text-xs font-bold mb-1">
+              <span>Promedio PnL:</span>
+              <span className={hoveredCell.avgPnL >= 0 ? 'text-emerald-400' : 'text-rose-400'}>${hoveredCell.avgPnL}</span>
+            </div>
+            <div className="flex justify-between text-xs font-bold border-t border-slate-700 pt-1 mt-1">
+              <span>Sesiones registradas:</span>
+              <span>{hoveredCell.count}</span>
+            </div>
+          </React.Fragment>
+        )}
+      </CanvasTooltip>
+    </div>
+  );
+});
+
+// Configuración de la rejilla por trader, guardada en este dispositivo
+const HEATMAP_CONFIG_KEY = 'hipnotrading-heatmap:';
+const HEATMAP_DAY_SETS = {
+  semana: [1, 2, 3, 4, 5],
+  completa: [1, 2, 3, 4, 5, 6, 0]
+};
+const HEATMAP_HOUR_WINDOWS = {
+  mercado: [8 * 60, 17 * 60],
+  completo: [0, MINUTES_PER_DAY]
+};
+const HEATMAP_TIME_ZONES = ['', 'Europe/Madrid', 'Europe/London', 'America/New_York', 'America/Mexico_City', 'America/Bogota', 'Asia/Tokyo', 'Asia/Singapore', 'UTC'];
+
+const loadHeatmapConfig = (traderKey) => {
+  try {
+    const saved = JSON.parse(localStorage.getItem(HEATMAP_CONFIG_KEY + traderKey));
+    return saved ? Object.freeze({ ...DEFAULT_HEATMAP_CONFIG, ...saved }) : DEFAULT_HEATMAP_CONFIG;
+  } catch (error) {
+    return DEFAULT_HEATMAP_CONFIG;
+  }
+};
+
+const saveHeatmapConfig = (traderKey, config) => {
+  localStorage.setItem(HEATMAP_CONFIG_KEY + traderKey, JSON.stringify(config));
+};
+
+const HeatmapConfigBar = ({ config, onChange }) => {
+  const update = (patch) => onChange(Object.freeze({ ...config, ...patch }));
+  const dayKey = config.days.length === 7 ? 'completa' : 'semana';
+  const hourKey = config.startMinute === 0 && config.endMinute === MINUTES_PER_DAY ? 'completo' : 'mercado';
+  const selectClass = 'bg-slate-800 border border-slate-700 rounded-lg px-2 py-1 text-[10px] font-black uppercase text-slate-200 outline-none';
+
+  return (
+    <div className="flex flex-wrap gap-2 items-center">
+      <select value={config.bucketMinutes} onChange={(e) => update({ bucketMinutes: Number(e.target.value) })} className={selectClass}>
+        <option value={60}>1 hora</option>
+        <option value={30}>30 min</option>
+        <option value={15}>15 min</option>
+      </select>
+      <select value={dayKey} onChange={(e) => update({ days: HEATMAP_DAY_SETS[e.target.value] })} className={selectClass}>
+        <option value="semana">Lun - Vie</option>
+        <option value="completa">7 días</option>
+      </select>
+      <select value={hourKey} onChange={(e) => update({ startMinute: HEATMAP_HOUR_WINDOWS[e.target.value][0], endMinute: HEATMAP_HOUR_WINDOWS[e.target.value][1] })} className={selectClass}>
+        <option value="mercado">08:00 - 17:00</option>
+        <option value="completo">24 horas</option>
+      </select>
+      <select value={config.timeZone} onChange={(e) => update({ timeZone: e.target.value })} className={selectClass}>
+        {(HEATMAP_TIME_ZONES.includes(config.timeZone) ? HEATMAP_TIME_ZONES : [config.timeZone, ...HEATMAP_TIME_ZONES]).map(zone => (
+          <option key={zone} value={zone}>{zone || 'Hora local'}</option>
+        ))}
+      </select>
+    </div>
+  );
+};
+
+// Agrega las sesiones descargadas del rango: mientras falten páginas se avisa de que es parcial
+const TemporalHeatmap = React.memo(({ heatmapData, coverage, filterActive, onConfigChange }) => {
+  return (
+    <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 overflow-hidden mb-20">
+      <div className="bg-slate-900 p-8 text-white flex justify-between items-center">
+        <div>
+          <h2 className="text-xl font-black uppercase tracking-widest italic">📊 Mapa de Calor: Rendimiento Temporal</h2>
+          <p className="text-slate-400 text-[10px] font-bold uppercase mt-1">Identifica en qué momentos tu sistema nervioso está más regulado</p>
+        </div>
+        <div className="flex flex-col items-end gap-3">
+          {filterActive && (
+             <div className="bg-indigo-600 px-4 py-2 rounded-xl text-[10px] font-black uppercase animate-pulse">
+                Filtro Activo
+             </div>
+          )}
+          <CoverageNotice coverage={coverage} />
+          <HeatmapConfigBar config={heatmapData.layout.config} onChange={onConfigChange} />
+        </div>
+      </div>
+
+      <div className="p-10 overflow-x-auto">
+        <div className="min-w-[800px]">
+          <HeatmapCanvas heatmapData={heatmapData} />
+        </div>
+
+        <div className="mt-8 flex flex-wrap gap-4 justify-center text-[10px] font-black uppercase text-slate-500">
+          <div className="flex items-center gap-2">
+            <div className="w-4 h-4 rounded bg-[#4CAF50]"></div>
+            <span>Óptimo: IC ≥65% + PnL ≥ 0</span>
+          </div>
+          <div className="flex items-center gap-2">
+            <div className="w-4 h-4 rounded bg-[#FFC107]"></div>
+            <span>Alerta: IC 50-64%</span>
+          </div>
+          <div className="flex items-center gap-2">
+            <div className="w-4 h-4 rounded bg-[#F44336]"></div>
+            <span>Crítico: IC &lt;50% o PnL negativo</span>
+          </div>
+          <div className="flex items-center gap-2">
+            <div className="w-4 h-4 rounded bg-[#E0E0E0]"></div>
+            <span>Sin datos</span>
+          </div>
+        </div>
+      </div>
+    </section>
+  );
+});
+
+// --- Vista de cohorte (panel de coach) ---
+// Sin consultas propias: el resumen de cada trader viaja en su documento del directorio (cohorte)
+const COHORT_ROW_HEIGHT = 56;
+
+const COHORT_COLUMNS = [
+  { key: 'nombreTrader', label: 'Trader' },
+  { key: 'ultimoIC', label: 'Último IC' },
+  { key: 'sesiones', label: 'Sesiones 30 d' },
+  { key: 'pnlMedio', label: 'PnL medio 30 d' },
+  { key: 'adherencia', label: 'Adherencia plan' },
+  { key: 'dorsal', label: 'Sesiones Dorsal' }
+];
+
+const toCohortRow = (trader, fromKey) => {
+  const stats = cohortStatsOf(trader.cohorte, fromKey);
+  const { sesiones } = stats;
+  return {
+    key: trader.key,
+    nombreTrader: trader.nombreTrader,
+    ultimoIC: trader.ultimaSesion ? trader.ultimaSesion.ic : null,
+    ultimaFecha: trader.ultimaSesion?.fecha || '',
+    sesiones,
+    pnlMedio: sesiones > 0 ? Math.round(stats.pnl / sesiones * 100) / 100 : null,
+    adherencia: sesiones > 0 ? Math.round((stats.planSi / sesiones) * 100) : null,
+    dorsal: stats.dorsalSi
+  };
+};
+
+// Sin dato (null) siempre al final, en ambos sentidos
+const compareCohortRows = (column, direction) => (a, b) => {
+  const x = a[column];
+  const y = b[column];
+  if (x === null || y === null) return x === y ? 0 : x === null ? 1 : -1;
+  if (x < y) return -direction;
+  if (x > y) return direction;
+  return 0;
+};
+
+const CohortDashboard = React.memo(({ traders }) => {
+  const { setField } = useFormActions();
+  const [sort, setSort] = useState({ column: 'ultimoIC', direction: 1 });
+  const rows = useMemo(
+    () => perfMonitor.time('memo:cohortRows', () => {
+      const fromKey = cohortFromKey();
+      return traders
+        .map(trader => toCohortRow(trader, fromKey))
+        .sort(compareCohortRows(sort.column, sort.direction));
+    }),
+    [traders, sort]
+  );
+  const cohortRows = useVirtualRows(rows.length, COHORT_ROW_HEIGHT);
+  const toggleSort = (column) => setSort(prev => ({ column, direction: prev.column === column ? -prev.direction : 1 }));
+
+  return (
+    <section className="mb-20 bg-white rounded-[3rem] shadow-2xl border border-slate-200 overflow-hidden">
+      <div className="bg-amber-500 p-8 text-white flex justify-between items-end">
+        <div>
+          <h2 className="text-xl font-black uppercase tracking-widest italic">👥 Cohorte de Traders</h2>
+          <p className="text-amber-100 text-[10px] font-bold uppercase mt-1">Últimos {COHORT_WINDOW_DAYS} días · {traders.length} traders</p>
+        </div>
+      </div>
+      <div className="overflow-auto" style={{ maxHeight: VIRTUAL_VIEWPORT_HEIGHT }} onScroll={cohortRows.onScroll}>
+        <table className="w-full text-left min-w-[800px]">
+          <thead className="sticky top-0 z-10 bg-amber-50 text-amber-900/60 text-[10px] font-black uppercase tracking-tighter">
+            <tr>
+              {COHORT_COLUMNS.map(({ key, label }) => (
+                <th key={key} className="px-6 py-4 border-b">
+                  <button type="button" onClick={() => toggleSort(key)} className="uppercase font-black">
+                    {label}{sort.column === key ? (sort.direction > 0 ? ' ▲' : ' ▼') : ''}
+                  </button>
+                </th>
+              ))}
+            </tr>
+          </thead>
+          <tbody className="divide-y divide-slate-100">
+            {cohortRows.padTop > 0 && <tr aria-hidden="true" style={{ height: cohortRows.padTop }} />}
+            {rows.slice(cohortRows.start, cohortRows.end).map(row => (
+              <tr key={row.key} onClick={() => setField('nombreTrader', row.nombreTrader)} className="hover:bg-amber-50/40 transition-colors cursor-pointer" style={{ height: COHORT_ROW_HEIGHT }}>
+                <td className="px-6 py-2 font-black text-slate-900 text-xs">{row.nombreTrader}</td>
+                <td className="px-6 py-2">
+                  {row.ultimoIC === null ? <span className="text-slate-300 text-xs">-</span> : (
+                    <span className={`px-3 py-1 rounded-full text-[10px] font-black ${row.ultimoIC >= 70 ? 'bg-emerald-100 text-emerald-700' : 'bg-rose-100 text-rose-700'}`} title={row.ultimaFecha}>
+                      {row.ultimoIC}%
+                    </span>
+                  )}
+                </td>
+                <td className="px-6 py-2 font-bold text-slate-600 text-xs">{row.sesiones}</td>
+                <td className={`px-6 py-2 font-black text-xs ${row.pnlMedio === null ? 'text-slate-300' : row.pnlMedio >= 0 ? 'text-emerald-600' : 'text-rose-600'}`}>
+                  {row.pnlMedio ?? '-'}
+                </td>
+                <td className="px-6 py-2 font-bold text-indigo-600 text-xs">{row.adherencia === null ? '-' : `${row.adherencia}%`}</td>
+                <td className={`px-6 py-2 font-black text-xs ${row.dorsal > 0 ? 'text-rose-600' : 'text-slate-400'}`}>{row.dorsal}</td>
+              </tr>
+            ))}
+            {cohortRows.padBottom > 0 && <tr aria-hidden="true" style={{ height: cohortRows.padBottom }} />}
+          </tbody>
+        </table>
+      </div>
+    </section>
+  );
+});
+
+// --- Búsqueda en narrativas (panel de coach) ---
+const SEARCH_FIELD_LABELS = {
+  detallesSesion: 'Detalles de la sesión',
+  reescrituraNarrativa: 'Reescritura narrativa',
+  aprendizajeMentor: 'Aprendizaje del mentor',
+  compromisoManana: 'Compromiso de mañana',
+  sensacionCorporal: 'Sensación corporal'
+};
+
+const EMPTY_SEARCH_RESULTS = { requestId: 0, total: 0, hits: [], timings: null };
+
+const HighlightedSnippet = ({ snippet }) => {
+  const parts = [];
+  let cursor = 0;
+  snippet.marks.forEach(([start, end]) => {
+    if (start > cursor) parts.push(snippet.text.slice(cursor, start));
+    parts.push(<mark key={start} className="bg-amber-200 text-slate-900 rounded px-0.5">{snippet.text.slice(start, end)}</mark>);
+    cursor = end;
+  });
+  parts.push(snippet.text.slice(cursor));
+  return (
+    <p className="text-xs text-slate-600 leading-relaxed">
+      {snippet.truncatedStart && '…'}{parts}{snippet.truncatedEnd && '…'}
+    </p>
+  );
+};
+
+const NarrativeSearchPanel = React.memo(({ traderKey, filterStartDate, filterEndDate, results, searching, partial, onSearch }) => {
+  const { setField } = useFormActions();
+  const [queryText, setQueryText] = useState('');
+  const [scope, setScope] = useState('all');
+  const debouncedQuery = useDebouncedValue(queryText, 250);
+  const scopedTrader = scope === 'trader' ? traderKey : '';
+
+  useEffect(() => {
+    onSearch({ query: debouncedQuery, traderKey: scopedTrader, startDate: filterStartDate, endDate: filterEndDate });
+  }, [debouncedQuery, scopedTrader, filterStartDate, filterEndDate, onSearch]);
+
+  return (
+    <section className="mb-20 bg-white rounded-[3rem] shadow-2xl border border-slate-200 overflow-hidden">
+      <div className="bg-slate-900 p-8 text-white">
+        <h2 className="text-xl font-black uppercase tracking-widest italic">🔎 Búsqueda en Narrativas</h2>
+        <p className="text-slate-400 text-[10px] font-bold uppercase mt-1">Detalles, reescritura, aprendizaje, compromiso y sensación corporal · respeta el filtro de fechas</p>
+      </div>
+      <div className="p-8 space-y-6">
+        <div className="flex flex-col md:flex-row gap-4">
+          <input
+            type="search"
+            value={queryText}
+            onChange={(e) => setQueryText(e.target.value)}
+            placeholder="Ej.: venganza, miedo a perder, sobreoperar..."
+            className="flex-1 p-4 bg-slate-50 border-2 border-slate-100 rounded-2xl text-sm font-bold text-slate-700 outline-none focus:border-indigo-500"
+          />
+          <select value={scope} onChange={(e) => setScope(e.target.value)} className="p-4 bg-slate-50 border-2 border-slate-100 rounded-2xl text-xs font-black uppercase text-slate-600 outline-none">
+            <option value="all">Todos los traders</option>
+            <option value="trader" disabled={!traderKey}>Trader actual</option>
+          </select>
+        </div>
 
-              <div className="space-y-4 pt-8 border-t border-slate-100">
-                <label className="block text-sm font-black text-slate-700 uppercase italic">4.4 VISUALIZACIÓN DE CIERRE</label>
-                <div className="space-y-3">
-                  {[
-                    "He visualizado mi próxima sesión ejecutando perfectamente mi plan",
-                    "He agradecido a mi cuerpo por la información que me dio hoy",
-                    "He cerrado emocionalmente la sesión (ni euforia ni culpa)"
-                  ].map(v => (
-                    <label key={v} className={`p-4 rounded-xl border-2 transition-all cursor-pointer flex items-center gap-3 text-[10px] font-black uppercase ${formData.visualizacionesCierre.includes(v) ? 'bg-emerald-600 border-emerald-600 text-white' : 'bg-slate-50 border-slate-100 text-slate-500 hover:border-emerald-200'}`}>
-                      <input type="checkbox" name="visualizacionesCierre" value={v} checked={formData.visualizacionesCierre.includes(v)} onChange={handleInputChange} className="hidden" />
-                      <div className={`w-4 h-4 rounded border-2 flex items-center justify-center ${formData.visualizacionesCierre.includes(v) ? 'border-white' : 'border-slate-300'}`}>
-                        {formData.visualizacionesCierre.includes(v) && '✓'}
-                      </div>
-                      {v}
-                    </label>
-                  ))}
-                </div>
-              </div>
+        {results.requestId > 0 && (
+          <p className="text-[10px] font-black text-slate-400 uppercase tracking-widest">
+            {results.total} coincidencias{results.total > results.hits.length ? ` · mostrando ${results.hits.length}` : ''}
+            {results.timings ? ` · ${formatMs(results.timings.search)}` : ''}
+            {searching ? ' · buscando en el histórico...' : ''}
+          </p>
+        )}
+        {results.requestId > 0 && partial && !searching && (
+          <p className="text-[10px] font-black text-amber-600 uppercase tracking-widest">
+            Resultados parciales: solo se han revisado las {SEARCH_FETCH_LIMIT} sesiones más recientes con alguno de los {SEARCH_MAX_QUERY_TERMS} primeros términos. Acota por trader o fechas para ver el resto.
+          </p>
+        )}
 
-              <div className="space-y-4 pt-8 border-t border-slate-100">
-                <label className="block text-sm font-black text-slate-700 uppercase italic">4.5 PROTOCOLO DE REACTIVACIÓN VAGAL</label>
-                <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
-                  {[
-                    { val: "🫁 Respiración 4-7-8 (3 minutos)", color: "border-blue-200 bg-blue-50 text-blue-700" },
-                    { val: "🎵 Música + movimiento", color: "border-purple-200 bg-purple-50 text-purple-700" },
-                    { val: "🚶 Caminata consciente", color: "border-green-200 bg-green-50 text-green-700" },
-                    { val: "🧊 Exposición al frío", color: "border-cyan-200 bg-cyan-50 text-cyan-700" },
-                    { val: "🧘 Meditación guiada", color: "border-indigo-200 bg-indigo-50 text-indigo-700" },
-                    { val: "❌ Ninguna (omití el cierre)", color: "border-slate-200 bg-slate-50 text-slate-500" }
-                  ].map(protocolo => (
-                    <label key={protocolo.val} className={`p-4 rounded-xl border-2 cursor-pointer transition-all flex items-center gap-3 ${formData.protocoloReactivacionVagal === protocolo.val ? `${protocolo.color} border-current shadow-md` : 'bg-white border-slate-100 text-slate-400 hover:bg-slate-50'}`}>
-                      <input type="radio" name="protocoloReactivacionVagal" value={protocolo.val} checked={formData.protocoloReactivacionVagal === protocolo.val} onChange={handleInputChange} className="accent-indigo-600" />
-                      <span className="text-[10px] font-black uppercase">{protocolo.val}</span>
-                    </label>
-                  ))}
-                </div>
+        <div className="max-h-[640px] overflow-y-auto divide-y divide-slate-100">
+          {results.hits.map(hit => (
+            <button
+              key={hit.id}
+              type="button"
+              onClick={() => setField('nombreTrader', hit.nombreTrader)}
+              className="w-full text-left py-4 px-2 hover:bg-slate-50 rounded-xl transition-all"
+            >
+              <div className="flex justify-between items-baseline mb-1">
+                <span className="text-sm font-black text-indigo-700">{hit.nombreTrader}</span>
+                <span className="text-[10px] font-bold text-slate-400 uppercase">{hit.dayKey || 'Sin fecha'} · {SEARCH_FIELD_LABELS[hit.snippet.field]}</span>
               </div>
+              <HighlightedSnippet snippet={hit.snippet} />
+            </button>
+          ))}
+        </div>
+      </div>
+    </section>
+  );
+});
 
-              <div className="space-y-4 pt-8 border-t border-slate-100">
-                <label className="block text-sm font-black text-slate-700 uppercase italic">4.6 COMPROMISO CON EL MAÑANA</label>
-                <input type="text" name="compromisoManana" value={formData.compromisoManana} onChange={handleInputChange} placeholder="Escribe tu compromiso..." className="w-full p-6 bg-slate-50 border-2 border-slate-100 rounded-3xl text-sm font-bold text-slate-600 outline-none focus:border-indigo-500 transition-all" />
-              </div>
+const EvaluationModal = React.memo(({ content, onClose }) => {
+  return (
+    <div className="fixed inset-0 z-50 flex items-center justify-center p-4 bg-slate-900/80 backdrop-blur-sm">
+      <div className="bg-white rounded-[2rem] max-w-lg w-full shadow-2xl overflow-hidden animate-in zoom-in-95 border border-white/20">
+         <div className={`${content.colorClass} p-8 text-white text-center`}><h3 className="text-3xl font-black uppercase italic tracking-tighter">{content.title}</h3></div>
+         <div className="p-8 text-center space-y-8 bg-white"><p className="text-slate-600 font-bold text-lg leading-relaxed">{content.text}</p><button onClick={onClose} className={`w-full py-4 rounded-2xl font-black uppercase tracking-widest text-white shadow-xl text-xs ${content.buttonClass}`}>Entiendo</button></div>
+      </div>
+    </div>
+  );
+});
 
-            </div>
-          </section>
+// Benchmark reproducible (modo coach) en su propio chunk: solo se descarga al ejecutarlo
+const loadBenchmark = () => import('./benchmark.jsx').then(({ createBenchmarkSuite }) => createBenchmarkSuite({
+  MS_PER_DAY,
+  AUDITS_PAGE_SIZE,
+  EMPTY_LIST,
+  EMPTY_AUDIT_STORE,
+  EMPTY_OVERLAYS,
+  EMPTY_ANALYTICS,
+  createInitialFormState,
+  normalizeTraderName,
+  pad2,
+  formatDayKey,
+  dayNumberFromKey,
+  buildAuditSummary,
+  normalizeAudit,
+  applyAuditChanges,
+  selectDayRange,
+  buildSeriesView,
+  queryTraderHeatmap,
+  createRollingState,
+  updateRollingState,
+  createAttributionColumns,
+  updateAttributionColumns,
+  analyzeAttribution,
+  applyTraderChanges,
+  createSearchIndex,
+  indexSearchRecord,
+  searchAuditIndex,
+  estimateRecordBytes,
+  loadRecharts,
+  EvolutionChart,
+  AuditHistoryTable,
+  ReprogrammingHistoryTable,
+  TemporalHeatmap,
+  AttributionPanel
+}));
 
-          <div className="text-center py-10">
-            {message && <div className={`mb-8 p-5 rounded-3xl text-xs font-black uppercase ${message.type === 'success' ? 'bg-emerald-500 text-white' : 'bg-rose-500 text-white'}`}>{message.text}</div>}
-            <button type="submit" disabled={loading} className="px-24 py-7 bg-slate-900 text-white rounded-[2.5rem] font-black text-xl shadow-2xl transition-all hover:bg-indigo-600 uppercase tracking-widest">
-              {loading ? 'PROCESANDO...' : 'REGISTRAR SESIÓN NEURO'}
-            </button>
-          </div>
-        </form>
-
-        <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 p-10">
-          <h2 className="text-2xl font-black text-slate-900 uppercase italic tracking-tighter mb-10">Evolución Neuro-Técnica</h2>
-          <div className="h-[400px] w-full">
-            {chartData.length < 1 ? (
-              <div className="h-full flex items-center justify-center bg-slate-50 rounded-[2rem] border-4 border-dashed border-slate-100">
-                <p className="text-slate-300 font-black uppercase">Sin registros en este periodo</p>
-              </div>
-            ) : (
-              <ResponsiveContainer width="100%" height="100%">
-                <LineChart data={chartData}>
-                  <CartesianGrid strokeDasharray="6 6" vertical={false} stroke="#f1f5f9" />
-                  <XAxis dataKey="fecha" stroke="#cbd5e1" fontSize={10} fontWeight="900" />
-                  <YAxis stroke="#cbd5e1" fontSize={10} fontWeight="900" />
-                  <Tooltip contentStyle={{ borderRadius: '20px', border: 'none', boxShadow: '0 10px 15px -3px rgba(0,0,0,0.1)' }} />
-                  <Line type="monotone" dataKey="ic" stroke="#10b981" strokeWidth={5} dot={{ r: 6 }} />
-                  <Line type="monotone" dataKey="presencia" stroke="#6366f1" strokeWidth={3} dot={{ r: 4 }} />
-                </LineChart>
-              </ResponsiveContainer>
-            )}
-          </div>
-        </section>
+const downloadJson = (fileName, data) => {
+  const url = URL.createObjectURL(new Blob([JSON.stringify(data, null, 2)], { type: 'application/json' }));
+  const link = document.createElement('a');
+  link.href = url;
+  link.download = fileName;
+  link.click();
+  URL.revokeObjectURL(url);
+};
 
-        <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 overflow-hidden">
-          <div className="bg-slate-900 p-8 text-white">
-            <h2 className="text-xl font-black uppercase tracking-widest italic">Historial Detallado de Auditorías</h2>
-            <p className="text-slate-400 text-[10px] font-bold uppercase mt-1">Registros completos para análisis de progresión subconsciente</p>
-          </div>
-          <div className="overflow-x-auto">
-            <table className="w-full text-left min-w-[1000px]">
-              <thead className="bg-slate-50 text-slate-500 text-[10px] font-black uppercase tracking-tighter">
-                <tr>
-                  <th className="px-6 py-4 border-b">Fecha</th>
-                  <th className="px-6 py-4 border-b">Hora Inicio</th>
-                  <th className="px-6 py-4 border-b">IC Inicial</th>
-                  <th className="px-6 py-4 border-b">Energía</th>
-                  <th className="px-6 py-4 border-b">Presencia</th>
-                  <th className="px-6 py-4 border-b">Plan Rev.</th>
-                  <th className="px-6 py-4 border-b">PnL Diaro</th>
-                  <th className="px-6 py-4 border-b">Eficiencia Plan</th>
-                  <th className="px-6 py-4 border-b">Identidad</th>
-                  <th className="px-6 py-4 border-b">SN Final</th>
-                </tr>
-              </thead>
-              <tbody className="divide-y divide-slate-100">
-                {filteredAudits.length > 0 ? (
-                  filteredAudits.slice().reverse().map((audit) => {
-                    const totalE = parseInt(audit.numEntradasTotales) || 0;
-                    const planE = parseInt(audit.numEntradasPlan) || 0;
-                    const eficiencia = totalE > 0 ? Math.round((planE / totalE) * 100) : 0;
-                    
-                    return (
-                      <tr key={audit.id} className="hover:bg-indigo-50/30 transition-colors">
-                        <td className="px-6 py-4 font-black text-slate-900 text-xs">{audit.fechaAuditoria || audit.fechaLocal}</td>
-                        <td className="px-6 py-4 font-bold text-indigo-500 text-xs">{audit.horaInicioSesion || "-"}</td>
-                        <td className="px-6 py-4">
-                          <span className={`px-3 py-1 rounded-full text-[10px] font-black ${parseInt(audit.indiceCoherenciaIC) >= 70 ? 'bg-emerald-100 text-emerald-700' : 'bg-rose-100 text-rose-700'}`}>
-                            {audit.indiceCoherenciaIC}%
-                          </span>
-                        </td>
-                        <td className="px-6 py-4 font-bold text-slate-600 text-xs">{audit.energiaMetabolica}/10</td>
-                        <td className="px-6 py-4 font-bold text-slate-600 text-xs">{audit.nivelPresencia}/10</td>
-                        <td className="px-6 py-4 font-black text-xs">
-                          {audit.revisadoPlan === 'Sí' ? <span className="text-emerald-600">SÍ</span> : <span className="text-rose-600">NO</span>}
-                        </td>
-                        <td className={`px-6 py-4 font-black text-xs ${parseFloat(audit.pnlDia) >= 0 ? 'text-emerald-600' : 'text-rose-600'}`}>
-                          {audit.pnlDia}
-                        </td>
-                        <td className="px-6 py-4">
-                          <div className="w-full bg-slate-100 h-1.5 rounded-full overflow-hidden max-w-[80px]">
-                            <div className="h-full bg-indigo-500" style={{ width: `${eficiencia}%` }}></div>
-                          </div>
-                          <span className="text-[9px] font-black text-slate-400 mt-1 block">{eficiencia}%</span>
-                        </td>
-                        <td className="px-6 py-4 font-bold text-indigo-600 text-xs">{audit.anclajeIdentidad}/10</td>
-                        <td className="px-6 py-4 text-[9px] font-black text-slate-500 max-w-[150px] truncate uppercase">{audit.estadoSistemaNerviosoFinal || '-'}</td>
-                      </tr>
-                    );
-                  })
-                ) : (
-                  <tr>
-                    <td colSpan="10" className="px-6 py-12 text-center text-slate-300 font-black uppercase tracking-widest text-xs italic">
-                      No hay registros que coincidan con los filtros seleccionados
-                    </td>
-                  </tr>
-                )}
-              </tbody>
-            </table>
-          </div>
-        </section>
+// --- Instrumentación de rendimiento (opt-in) ---
+const PERF_ENABLED_KEY = 'hipnotrading-perf';
 
-        <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 overflow-hidden mb-20">
-          <div className="bg-indigo-900 p-8 text-white">
-            <h2 className="text-xl font-black uppercase tracking-widest italic">Historial de Reprogramación y Cierre (Punto 4)</h2>
-            <p className="text-indigo-300 text-[10px] font-bold uppercase mt-1">Monitoreo de anclajes de identidad y protocolos vagales</p>
-          </div>
-          <div className="overflow-x-auto">
-            <table className="w-full text-left min-w-[1000px]">
-              <thead className="bg-indigo-50/50 text-indigo-900/40 text-[10px] font-black uppercase tracking-tighter">
-                <tr>
-                  <th className="px-6 py-4 border-b">Fecha</th>
-                  <th className="px-6 py-4 border-b">Anclaje Identidad</th>
-                  <th className="px-6 py-4 border-b">Protocolo Vagal</th>
-                  <th className="px-6 py-4 border-b">Creencias Instaladas</th>
-                  <th className="px-6 py-4 border-b">Cierres Realizados</th>
-                  <th className="px-6 py-4 border-b">Narrativa / Compromiso</th>
-                </tr>
-              </thead>
-              <tbody className="divide-y divide-slate-100">
-                {filteredAudits.length > 0 ? (
-                  filteredAudits.slice().reverse().map((audit) => (
-                    <tr key={`p4-${audit.id}`} className="hover:bg-indigo-50/20 transition-colors">
-                      <td className="px-6 py-4 font-black text-slate-900 text-xs">{audit.fechaAuditoria || audit.fechaLocal}</td>
-                      <td className="px-6 py-4">
-                        <div className="flex items-center gap-2">
-                          <span className={`w-8 h-8 rounded-lg flex items-center justify-center font-black text-[10px] ${parseInt(audit.anclajeIdentidad) >= 8 ? 'bg-emerald-500 text-white' : 'bg-amber-500 text-white'}`}>
-                            {audit.anclajeIdentidad}
-                          </span>
-                          <span className="text-[9px] font-bold text-slate-400 uppercase tracking-tight italic">/10</span>
-                        </div>
-                      </td>
-                      <td className="px-6 py-4 font-black text-[10px] text-indigo-700 uppercase italic">
-                        {audit.protocoloReactivacionVagal || 'No registrado'}
-                      </td>
-                      <td className="px-6 py-4">
-                        <div className="flex flex-wrap gap-1 max-w-[250px]">
-                          {audit.creenciasInstaladas && audit.creenciasInstaladas.length > 0 ? (
-                            audit.creenciasInstaladas.map((c, idx) => (
-                              <span key={idx} className="bg-indigo-50 text-indigo-600 px-2 py-0.5 rounded-md text-[8px] font-black uppercase border border-indigo-100">
-                                {c}
-                              </span>
-                            ))
-                          ) : <span className="text-slate-300 italic text-[9px]">Sin creencias</span>}
-                        </div>
-                      </td>
-                      <td className="px-6 py-4">
-                        <div className="flex items-center gap-1">
-                          <span className="text-emerald-500 font-black text-xs">
-                            {audit.visualizacionesCierre ? audit.visualizacionesCierre.length : 0}
-                          </span>
-                          <span className="text-[9px] font-bold text-slate-400 uppercase">/3 Pasos</span>
-                        </div>
-                      </td>
-                      <td className="px-6 py-4">
-                        <div className="max-w-[300px]">
-                          <p className="text-[10px] font-bold text-slate-600 italic line-clamp-2 mb-1">
-                            "{audit.reescrituraNarrativa || 'Sin narrativa...'}"
-                          </p>
-                          <p className="text-[9px] font-black text-indigo-600 uppercase tracking-tighter truncate border-t border-slate-50 pt-1">
-                            🎯 {audit.compromisoManana || 'Sin compromiso'}
-                          </p>
-                        </div>
-                      </td>
-                    </tr>
-                  ))
-                ) : (
-                  <tr>
-                    <td colSpan="6" className="px-6 py-12 text-center text-slate-300 font-black uppercase tracking-widest text-xs italic">
-                      Sin datos de reprogramación en este periodo
-                    </td>
-                  </tr>
-                )}
-              </tbody>
-            </table>
-          </div>
-        </section>
+const createPerfMonitor = () => {
+  let state = { enabled: localStorage.getItem(PERF_ENABLED_KEY) === '1', metrics: {} };
+  const listeners = new Set();
+  let notifyTimer = null;
+  let markSeq = 0;
+  const notify = () => {
+    notifyTimer = null;
+    listeners.forEach(listener => listener());
+  };
+  // Agrupa los avisos del Profiler
+  const scheduleNotify = () => {
+    if (notifyTimer === null) notifyTimer = setTimeout(notify, 250);
+  };
 
-        {/* MAPA DE CALOR: RENDIMIENTO TEMPORAL */}
-        <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 overflow-hidden mb-20">
-          <div className="bg-slate-900 p-8 text-white flex justify-between items-center">
-            <div>
-              <h2 className="text-xl font-black uppercase tracking-widest italic">📊 Mapa de Calor: Rendimiento Temporal</h2>
-              <p className="text-slate-400 text-[10px] font-bold uppercase mt-1">Identifica en qué momentos tu sistema nervioso está más regulado</p>
-            </div>
-            { (filterStartDate || filterEndDate) && (
-               <div className="bg-indigo-600 px-4 py-2 rounded-xl text-[10px] font-black uppercase animate-pulse">
-                  Filtro Activo
-               </div>
-            )}
-          </div>
-          
-          <div className="p-10 overflow-x-auto">
-            <div className="min-w-[800px] grid grid-cols-6 gap-2">
-              <div className="h-12"></div>
-              {['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes'].map(d => (
-                <div key={d} className="h-12 flex items-center justify-center font-black text-xs uppercase text-slate-500 tracking-wider">
-                  {d}
-                </div>
-              ))}
+  const record = (name, ms) => {
+    if (!state.enabled) return;
+    const prev = state.metrics[name];
+    const next = prev
+      ? { count: prev.count + 1, totalMs: prev.totalMs + ms, maxMs: Math.max(prev.maxMs, ms), lastMs: ms }
+      : { count: 1, totalMs: ms, maxMs: ms, lastMs: ms };
+    state = { ...state, metrics: { ...state.metrics, [name]: next } };
+    scheduleNotify();
+  };
 
-              {[8, 9, 10, 11, 12, 13, 14, 15, 16].map(hour => (
-                <React.Fragment key={hour}>
-                  <div className="h-20 flex items-center justify-end pr-4 font-black text-xs text-slate-400">
-                    {`${hour.toString().padStart(2, '0')}:00`}
-                  </div>
-                  {[1, 2, 3, 4, 5].map(day => {
-                    const key = `${day}-${hour}`;
-                    const cell = heatmapData[key] || { count: 0, avgIC: 0, avgPnL: 0 };
-                    const bgColor = getHeatmapColor(cell);
-                    return (
-                      <div 
-                        key={key} 
-                        className={`group relative h-20 rounded-xl ${bgColor} transition-all duration-300 hover:scale-105 hover:shadow-lg flex flex-col items-center justify-center cursor-pointer`}
-                      >
-                         {cell.count > 0 && (
-                            <div className="text-white text-center">
-                              <div className="text-xs font-black">{cell.avgIC}% IC</div>
-                              <div className="text-[10px] font-bold opacity-90">${cell.avgPnL}</div>
-                            </div>
-                         )}
-                         <div className="absolute z-10 bottom-full mb-2 hidden group-hover:block w-48 bg-slate-800 text-white p-3 rounded-xl shadow-xl border border-slate-700">
-                            <div className="text-[10px] font-black uppercase text-slate-400 mb-1">
-                              {['Domingo','Lunes','Martes','Miércoles','Jueves','Viernes','Sábado'][day]} - {hour}:00
-                            </div>
-                            <div className="flex justify-between text-xs font-bold mb-1">
-                               <span>Promedio IC:</span>
-                               <span className={cell.avgIC >= 65 ? 'text-emerald-400' : 'text-rose-400'}>{cell.avgIC}%</span>
-                            </div>
-                            <div className="flex justify-between text-xs font-bold mb-1">
-                               <span>Promedio PnL:</span>
-                               <span className={cell.avgPnL >= 0 ? 'text-emerald-400' : 'text-rose-400'}>${cell.avgPnL}</span>
-                            </div>
-                            <div className="flex justify-between text-xs font-bold border-t border-slate-700 pt-1 mt-1">
-                               <span>Sesiones registradas:</span>
-                               <span>{cell.count}</span>
-                            </div>
-                         </div>
-                      </div>
-                    );
-                  })}
-                </React.Fragment>
-              ))}
-            </div>
+  return {
+    getState: () => state,
+    subscribe: (listener) => {
+      listeners.add(listener);
+      return () => listeners.delete(listener);
+    },
+    setEnabled: (enabled) => {
+      localStorage.setItem(PERF_ENABLED_KEY, enabled ? '1' : '0');
+      state = { enabled, metrics: enabled ? state.metrics : {} };
+      notify();
+    },
+    reset: () => {
+      state = { ...state, metrics: {} };
+      notify();
+    },
+    record,
+    // Marca de inicio en la línea de tiempo de performance; la función devuelta cierra la medida.
+    start: (name) => {
+      if (!state.enabled) return () => {};
+      const mark = `${name}#${++markSeq}`;
+      performance.mark(mark);
+      return () => {
+        const measure = performance.measure(name, mark);
+        performance.clearMarks(mark);
+        record(name, measure.duration);
+      };
+    },
+    time: (name, fn) => {
+      if (!state.enabled) return fn();
+      const t0 = performance.now();
+      const result = fn();
+      record(name, performance.now() - t0);
+      return result;
+    },
+    exportReport: () => ({
+      schema: 'hipnotrading-perf/1',
+      generatedAt: new Date().toISOString(),
+      userAgent: navigator.userAgent,
+      metrics: Object.fromEntries(Object.entries(state.metrics).map(([name, m]) => [name, { ...m, avgMs: m.totalMs / m.count }]))
+    })
+  };
+};
 
-            <div className="mt-8 flex flex-wrap gap-4 justify-center text-[10px] font-black uppercase text-slate-500">
-              <div className="flex items-center gap-2">
-                <div className="w-4 h-4 rounded bg-[#4CAF50]"></div>
-                <span>Óptimo: IC ≥65% + PnL ≥ 0</span>
-              </div>
-              <div className="flex items-center gap-2">
-                <div className="w-4 h-4 rounded bg-[#FFC107]"></div>
-                <span>Alerta: IC 50-64%</span>
-              </div>
-              <div className="flex items-center gap-2">
-                <div className="w-4 h-4 rounded bg-[#F44336]"></div>
-                <span>Crítico: IC &lt;50% o PnL negativo</span>
-              </div>
-              <div className="flex items-center gap-2">
-                <div className="w-4 h-4 rounded bg-[#E0E0E0]"></div>
-                <span>Sin datos</span>
-              </div>
-            </div>
-          </div>
-        </section>
+const perfMonitor = createPerfMonitor();
+
+// --- Arranque en paralelo ---
+const startupMarks = new Set();
+const reportStartup = (name) => {
+  if (startupMarks.has(name)) return;
+  startupMarks.add(name);
+  performance.mark(`startup:${name}`);
+  perfMonitor.record(`startup:${name}`, performance.now());
+};
+
+const decodeTokenUid = (token) => {
+  try {
+    const payload = token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/');
+    return JSON.parse(atob(payload)).uid || null;
+  } catch (error) {
+    return null;
+  }
+};
+
+// Sesión restaurada al cargar el módulo, en paralelo con App
+const startAuthSession = async () => {
+  const stopAuth = perfMonitor.start('auth:initAuth');
+  try {
+    await auth.authStateReady();
+    const token = typeof __initial_auth_token !== 'undefined' && __initial_auth_token ? __initial_auth_token : null;
+    const cached = auth.currentUser;
+    if (!cached || (token && cached.uid !== decodeTokenUid(token))) {
+      if (token) {
+        await signInWithCustomToken(auth, token);
+      } else {
+        await signInAnonymously(auth);
+      }
+    }
+    stopAuth();
+    reportStartup('authReady');
+  } catch (error) {
+    console.error("Error de autenticación:", error);
+  }
+};
+
+startAuthSession();
+
+const SkeletonBlock = ({ className }) => <div className={`bg-slate-100 rounded-[2rem] animate-pulse ${className}`} />;
+
+// Hueco de las vistas de análisis mientras llega el primer snapshot del trader
+const AnalyticsSkeleton = React.memo(() => {
+  return (
+    <div aria-busy="true">
+      <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 p-10">
+        <SkeletonBlock className="h-8 w-1/3 mb-10" />
+        <SkeletonBlock className="h-[400px] w-full" />
+      </section>
+      <section className="mt-16 bg-white rounded-[3rem] shadow-2xl border border-slate-200 p-10 space-y-4">
+        <SkeletonBlock className="h-8 w-1/4 mb-6" />
+        {[0, 1, 2, 3, 4].map(i => <SkeletonBlock key={i} className="h-12 w-full" />)}
+      </section>
+      <section className="mt-16 mb-20 bg-white rounded-[3rem] shadow-2xl border border-slate-200 p-10">
+        <SkeletonBlock className="h-8 w-1/3 mb-8" />
+        <SkeletonBlock className="h-64 w-full" />
+      </section>
+    </div>
+  );
+});
+
+const onProfilerRender = (id, phase, actualDuration) => perfMonitor.record(`render:${id}`, actualDuration);
 
+const formatMs = (ms) => `${ms.toFixed(ms < 10 ? 2 : 0)} ms`;
+
+const DiagnosticsPanel = React.memo(() => {
+  const { enabled, metrics } = useSyncExternalStore(perfMonitor.subscribe, perfMonitor.getState);
+  const names = Object.keys(metrics).sort();
+
+  return (
+    <details className="mb-20 bg-white rounded-[2rem] shadow-xl border border-slate-200 p-8">
+      <summary className="cursor-pointer text-[10px] font-black text-slate-400 uppercase tracking-widest italic">Diagnóstico de rendimiento</summary>
+      <div className="mt-6 flex flex-wrap gap-3">
+        <button type="button" onClick={() => perfMonitor.setEnabled(!enabled)} className={`px-4 py-2 rounded-xl text-[10px] font-black uppercase ${enabled ? 'bg-emerald-500 text-white' : 'bg-slate-100 text-slate-600'}`}>
+          {enabled ? 'Instrumentación activa' : 'Activar instrumentación'}
+        </button>
+        <button type="button" onClick={perfMonitor.reset} className="px-4 py-2 rounded-xl bg-slate-100 text-slate-600 text-[10px] font-black uppercase">Reiniciar</button>
+        <button type="button" onClick={() => downloadJson(`perf-${new Date().toISOString().slice(0, 19)}.json`, perfMonitor.exportReport())} className="px-4 py-2 rounded-xl bg-indigo-600 text-white text-[10px] font-black uppercase">Exportar JSON</button>
       </div>
+      {names.length === 0 ? (
+        <p className="mt-6 text-xs text-slate-400 italic">{enabled ? 'Sin medidas todavía.' : 'Activa la instrumentación y recarga para medir también el arranque.'}</p>
+      ) : (
+        <table className="mt-6 w-full text-left text-xs">
+          <thead className="text-[9px] font-black text-slate-400 uppercase tracking-widest">
+            <tr>
+              <th className="py-2">Métrica</th>
+              <th className="py-2 text-right">Veces</th>
+              <th className="py-2 text-right">Media</th>
+              <th className="py-2 text-right">Máx.</th>
+              <th className="py-2 text-right">Última</th>
+            </tr>
+          </thead>
+          <tbody className="font-mono text-slate-700">
+            {names.map(name => (
+              <tr key={name} className="border-t border-slate-100">
+                <td className="py-2">{name}</td>
+                <td className="py-2 text-right">{metrics[name].count}</td>
+                <td className="py-2 text-right">{formatMs(metrics[name].totalMs / metrics[name].count)}</td>
+                <td className="py-2 text-right">{formatMs(metrics[name].maxMs)}</td>
+                <td className="py-2 text-right">{formatMs(metrics[name].lastMs)}</td>
+              </tr>
+            ))}
+          </tbody>
+        </table>
+      )}
+    </details>
+  );
+});
 
-      {showModal && modalContent && (
-        <div className="fixed inset-0 z-50 flex items-center justify-center p-4 bg-slate-900/80 backdrop-blur-sm">
-          <div className="bg-white rounded-[2rem] max-w-lg w-full shadow-2xl overflow-hidden animate-in zoom-in-95 border border-white/20">
-             <div className={`${modalContent.colorClass} p-8 text-white text-center`}><h3 className="text-3xl font-black uppercase italic tracking-tighter">{modalContent.title}</h3></div>
-             <div className="p-8 text-center space-y-8 bg-white"><p className="text-slate-600 font-bold text-lg leading-relaxed">{modalContent.text}</p><button onClick={() => setShowModal(false)} className={`w-full py-4 rounded-2xl font-black uppercase tracking-widest text-white shadow-xl text-xs ${modalContent.buttonClass}`}>Entiendo</button></div>
-          </div>
+const App = () => {
+  const [user, setUser] = useState(() => auth.currentUser);
+  const [chartWidth, setChartWidth] = useState(0);
+  const [chartOverlays, setChartOverlays] = useState(EMPTY_LIST);
+  const [searchResults, setSearchResults] = useState(EMPTY_SEARCH_RESULTS);
+  const [searching, setSearching] = useState(false);
+  const [searchPartial, setSearchPartial] = useState(false);
+  const [uniqueTradersList, setUniqueTradersList] = useState([]);
+  const [loading, setLoading] = useState(false);
+  const [message, setMessage] = useState(null);
+  const [pendingWrites, setPendingWrites] = useState(0);
+  const [accessCode, setAccessCode] = useState("");
+  
+  // Filtros de Fecha para Análisis
+  const [filterStartDate, setFilterStartDate] = useState("");
+  const [filterEndDate, setFilterEndDate] = useState("");
+  
+  // Estado para el Modal de Evaluación
+  const [modalContent, setModalContent] = useState(null);
+  const closeModal = useCallback(() => setModalContent(null), []);
+  const [detailAudit, setDetailAudit] = useState(null);
+  const closeDetail = useCallback(() => setDetailAudit(null), []);
+
+  const [formStore] = useState(() => createFormStore(createInitialFormState()));
+  const nombreTraderInput = useSyncExternalStore(formStore.subscribe, () => formStore.getState().nombreTrader);
+
+  // La sesión ya se está restaurando desde la carga del módulo; aquí solo se escucha el resultado.
+  useEffect(() => {
+    const unsubscribe = onAuthStateChanged(auth, setUser);
+    const frame = requestAnimationFrame(() => reportStartup('firstPaint'));
+    return () => {
+      unsubscribe();
+      cancelAnimationFrame(frame);
+    };
+  }, []);
+
+  const traderKey = useDebouncedValue(normalizeTraderName(nombreTraderInput), 300);
+  const isCoach = accessCode === "COACH2024";
+
+  // Resultados del worker por trader
+  const analyticsClientRef = useRef(null);
+  const sentAtRef = useRef(0);
+  const searchRequestRef = useRef(0);
+  // Búsqueda local inmediata y candidatos de Firestore; fetchKey → parcial
+  const fetchedSearchesRef = useRef(new Map());
+  const sendToAnalytics = useCallback((message) => {
+    sentAtRef.current = performance.now();
+    analyticsClientRef.current.send(message);
+  }, []);
+  const [traderSessions] = useState(() => createTraderSessions(sendToAnalytics));
+
+  useEffect(() => {
+    const client = createAnalyticsClient((result) => {
+      if (result.type === 'searchResult') {
+        perfMonitor.record('worker:search', result.timings.search);
+        if (result.requestId === searchRequestRef.current) setSearchResults(result);
+        return;
+      }
+      if (result.type === 'evicted') {
+        traderSessions.close(result.traderKeys);
+        fetchedSearchesRef.current.clear();
+        return;
+      }
+      if (result.type === 'searchEvicted') {
+        fetchedSearchesRef.current.clear();
+        return;
+      }
+      perfMonitor.record('worker:roundTrip', performance.now() - sentAtRef.current);
+      Object.keys(result.timings).forEach(name => perfMonitor.record(`worker:${name}`, result.timings[name]));
+      traderSessions.receive(result);
+    }, () => {
+      fetchedSearchesRef.current.clear();
+      traderSessions.reload();
+    });
+    analyticsClientRef.current = client;
+    return () => {
+      traderSessions.closeAll();
+      client.terminate();
+    };
+  }, [traderSessions]);
+
+  // Sin sesión de Firebase no queda ninguna suscripción abierta
+  useEffect(() => {
+    if (!user) traderSessions.closeAll();
+  }, [user, traderSessions]);
+
+  // El trader activo abre (o reutiliza) su sesión con el rango visible
+  useEffect(() => {
+    if (user && traderKey) traderSessions.open(traderKey, filterStartDate, filterEndDate);
+  }, [user, appId, traderKey, filterStartDate, filterEndDate, traderSessions]);
+
+  // Filtrado por nombre y fechas en el worker
+  const searchKey = normalizeTraderName(nombreTraderInput);
+  const session = useSyncExternalStore(traderSessions.subscribe, () => traderSessions.get(searchKey));
+
+  // Interactivo: sesión disponible y, si hay trader, su primer snapshot (caché o servidor) ya pintado
+  useEffect(() => {
+    if (user && (!traderKey || session.ready)) reportStartup('interactive');
+  }, [user, traderKey, session.ready]);
+
+  // Ya interactivo, el chunk de gráficas se precarga en segundo plano
+  useEffect(() => prefetchWhenIdle(loadRecharts), []);
+
+  const rollupPeriod = useMemo(
+    () => rollupPeriodFor(session.monthRollups, filterStartDate, filterEndDate),
+    [session.monthRollups, filterStartDate, filterEndDate]
+  );
+
+  useEffect(() => {
+    setUniqueTradersList([]);
+    if (!user || !isCoach) return;
+    const unsubscribe = onSnapshot(query(tradersCollection(), orderBy('nombreTraderKey')), (snapshot) => {
+      setUniqueTradersList(prev => applyTraderChanges(prev, snapshot.docChanges()));
+    }, (error) => console.error("Error en Firestore:", error));
+    return () => unsubscribe();
+  }, [user, appId, isCoach]);
+
+  useEffect(() => {
+    sendToAnalytics({ type: 'view', traderKey: searchKey, startDate: filterStartDate, endDate: filterEndDate, chartWidth, rollupPeriod, overlays: chartOverlays });
+  }, [searchKey, filterStartDate, filterEndDate, chartWidth, rollupPeriod, chartOverlays, sendToAnalytics]);
+
+  const current = searchKey ? session.analytics : EMPTY_ANALYTICS;
+  // Vista única de más reciente a más antigua, compartida por las dos tablas de historial
+  const recentFirstAudits = current.rows;
+  const heatmapData = useMemo(
+    () => perfMonitor.time('memo:heatmapData', () => {
+      const layout = heatmapLayoutFor(current.heatmap.config);
+      return { layout, cells: summarizeHeatmapCells(layout, current.heatmap.totals) };
+    }),
+    [current.heatmap]
+  );
+
+  const searchNarratives = useCallback(async (params) => {
+    const requestId = ++searchRequestRef.current;
+    const allTerms = searchQueryTerms(params.query);
+    if (allTerms.length === 0) {
+      setSearchResults(EMPTY_SEARCH_RESULTS);
+      setSearchPartial(false);
+      setSearching(false);
+      return;
+    }
+    const search = { type: 'search', requestId, ...params };
+    sendToAnalytics(search);
+
+    const terms = allTerms.slice(0, SEARCH_MAX_QUERY_TERMS);
+    const fetchKey = JSON.stringify([terms, params.traderKey, params.startDate, params.endDate]);
+    if (!user || fetchedSearchesRef.current.has(fetchKey)) {
+      setSearchPartial(Boolean(fetchedSearchesRef.current.get(fetchKey)));
+      setSearching(false);
+      return;
+    }
+    setSearching(true);
+    try {
+      const stopFetch = perfMonitor.start('firestore:search');
+      const snapshot = await getDocs(buildSearchQuery({ terms, ...params }));
+      stopFetch();
+      const partial = snapshot.size >= SEARCH_FETCH_LIMIT || allTerms.length > terms.length;
+      fetchedSearchesRef.current.set(fetchKey, partial);
+      if (requestId === searchRequestRef.current) setSearchPartial(partial);
+      if (snapshot.size > 0) sendToAnalytics({ type: 'searchDocs', docs: snapshot.docs.map(snap => toAuditMessage(snap)) });
+      if (requestId === searchRequestRef.current) sendToAnalytics(search);
+    } catch (error) {
+      console.error("Error en Firestore:", error);
+    } finally {
+      if (requestId === searchRequestRef.current) setSearching(false);
+    }
+  }, [user, sendToAnalytics]);
+
+  const changeHeatmapConfig = useCallback((config) => {
+    if (!traderKey) return;
+    saveHeatmapConfig(traderKey, config);
+    sendToAnalytics({ type: 'heatmapConfig', traderKey, config });
+  }, [traderKey, sendToAnalytics]);
+
+  const saveAudit = async (e) => {
+    e.preventDefault();
+    const formData = formStore.getState();
+    if (!formData.nombreTrader.trim()) {
+      setMessage({ type: 'error', text: 'El nombre del trader es obligatorio.' });
+      return;
+    }
+    setLoading(true);
+    try {
+      const payload = buildAuditPayload(formData);
+
+      // Sin esperar al servidor; auditoría, resumen, agregados y directorio en el mismo lote
+      const stopSave = perfMonitor.start('saveAudit:serverAck');
+      const auditRef = doc(auditsCollection());
+      const batch = writeBatch(db);
+      batch.set(auditRef, payload);
+      batch.set(doc(summariesCollection(), auditRef.id), buildAuditSummary(payload));
+      const record = normalizeAudit(auditRef.id, payload);
+      const rollups = accumulateRollups(new Map(), record);
+      addRollupWrites(batch, rollups);
+      addDirectoryWrites(batch, new Map([[payload.nombreTraderKey, payload.nombreTrader]]), rollups);
+      const synced = batch.commit()
+        .then(() => mergeRollupExtremes(rollups, latestSessionsOf([record])).catch(error => console.error("Error al fusionar extremos de agregados:", error)));
+      trackPendingWrite(synced);
+      synced.then(stopSave, () => {});
+
+      if (navigator.onLine) {
+        setMessage({ type: 'success', text: 'Registro neurobiológico guardado correctamente.' });
+      } else {
+        setMessage({ type: 'pending', text: 'Sin conexión: registro guardado en este dispositivo, se sincronizará al recuperar la red.' });
+      }
+      formStore.setState({ ...createInitialFormState(), nombreTrader: formData.nombreTrader });
+    } catch (error) {
+      setMessage({ type: 'error', text: 'Error al guardar datos.' });
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const trackPendingWrite = (synced) => {
+    setPendingWrites(n => n + 1);
+    synced
+      .then(() => setPendingWrites(n => n - 1))
+      .catch((error) => {
+        console.error("Error en Firestore:", error);
+        setPendingWrites(n => n - 1);
+        setMessage({ type: 'error', text: 'Error al sincronizar un registro guardado sin conexión.' });
+      });
+  };
+
+  // Estado de la cola de escritura en el banner de mensajes
+  useEffect(() => {
+    if (pendingWrites === 0) {
+      setMessage(prev => (prev && prev.type === 'pending' ? { type: 'success', text: 'Registros pendientes sincronizados con el servidor.' } : prev));
+      return;
+    }
+    const showQueue = () => {
+      setMessage({ type: 'pending', text: `Sin conexión: ${pendingWrites} registro(s) pendientes de sincronizar.` });
+    };
+    if (!navigator.onLine) showQueue();
+    window.addEventListener('offline', showQueue);
+    return () => window.removeEventListener('offline', showQueue);
+  }, [pendingWrites]);
+
+  useEffect(() => {
+    if (message?.type !== 'success') return;
+    const timer = setTimeout(() => setMessage(null), 4000);
+    return () => clearTimeout(timer);
+  }, [message]);
+
+  // Escrituras que quedaron en cola en una sesión anterior (persistidas en IndexedDB)
+  useEffect(() => {
+    if (!user) return;
+    trackPendingWrite(waitForPendingWrites(db));
+  }, [user]);
+
+  const runTraderBackfill = useCallback(async () => {
+    setLoading(true);
+    try {
+      const total = await backfillTraderIndex((processed) => setMessage({ type: 'success', text: `Reindexando histórico... ${processed} registros` }));
+      await backfillAuditSummaries((processed) => setMessage({ type: 'success', text: `Generando resúmenes... ${processed} de ${total} registros` }));
+      setMessage({ type: 'success', text: `Histórico reindexado: ${total} registros.` });
+    } catch (error) {
+      console.error("Error en Firestore:", error);
+      setMessage({ type: 'error', text: 'Error al reindexar el histórico.' });
+    } finally {
+      setLoading(false);
+    }
+  }, []);
+
+  const runRollupRebuild = useCallback(async () => {
+    setLoading(true);
+    try {
+      const { audits, rollups } = await rebuildRollups((processed) => setMessage({ type: 'pending', text: `Recalculando agregados... ${processed} registros` }));
+      setMessage({ type: 'success', text: `Agregados recalculados: ${rollups} documentos a partir de ${audits} registros.` });
+    } catch (error) {
+      console.error("Error en Firestore:", error);
+      setMessage({ type: 'error', text: 'Error al recalcular los agregados.' });
+    } finally {
+      setLoading(false);
+    }
+  }, []);
+
+  const runBulkImport = useCallback(async (file) => {
+    setLoading(true);
+    try {
+      const text = await file.text();
+      const { records, errors } = prepareImport(parseImportFile(file.name, text));
+      if (errors.length > 0) {
+        console.warn("Filas rechazadas en la importación:", errors);
+        const first = errors[0];
+        setMessage({ type: 'error', text: `Importación cancelada: ${errors.length} fila(s) inválidas (fila ${first.row}: ${first.error}).` });
+        return;
+      }
+      const importId = hashText(text);
+      const resumed = loadImportProgress(importId);
+      const total = await importAudits(records, importId, (done, count) => setMessage({
+        type: 'pending',
+        text: `${resumed > 0 ? 'Reanudando importación' : 'Importando'}... ${done} / ${count} registros`
+      }));
+      setMessage({ type: 'success', text: `Importación completada: ${total} registros.` });
+    } catch (error) {
+      console.error("Error en Firestore:", error);
+      setMessage({ type: 'error', text: 'Error en la importación. Vuelve a cargar el mismo fichero para reanudarla.' });
+    } finally {
+      setLoading(false);
+    }
+  }, []);
+
+  const runBenchmark = useCallback(async () => {
+    setLoading(true);
+    try {
+      setMessage({ type: 'pending', text: 'Benchmark: cargando...' });
+      const { runBenchmarkSuite } = await loadBenchmark();
+      const report = await runBenchmarkSuite({
+        onProgress: (size) => setMessage({ type: 'pending', text: `Benchmark: midiendo ${size} registros...` })
+      });
+      downloadJson(`benchmark-${report.generatedAt.slice(0, 10)}.json`, report);
+      setMessage({ type: 'success', text: 'Benchmark completado: informe JSON descargado.' });
+    } catch (error) {
+      console.error("Error en el benchmark:", error);
+      setMessage({ type: 'error', text: 'Error al ejecutar el benchmark.' });
+    } finally {
+      setLoading(false);
+    }
+  }, []);
+
+  return (
+    <FormStoreContext.Provider value={formStore}>
+      <div className="min-h-screen bg-[#f8fafc] p-4 md:p-8 text-slate-800 font-sans selection:bg-indigo-100">
+        <div className="max-w-6xl mx-auto">
+          <header className="mb-12 text-center">
+            <h1 className="text-5xl font-black text-slate-900 tracking-tighter uppercase mb-3 text-transparent bg-clip-text bg-gradient-to-r from-slate-900 to-indigo-700 italic">Auditoría Neuro-Biología Trading</h1>
+            <div className="h-1.5 w-24 bg-indigo-600 mx-auto rounded-full mb-4"></div>
+            <p className="text-slate-500 font-bold italic text-sm">HIPNOTRADING - Supervisión de Coherencia y Sistema Nervioso</p>
+          </header>
+
+          <form onSubmit={saveAudit} className="space-y-10">
+            <TraderSection
+              accessCode={accessCode}
+              setAccessCode={setAccessCode}
+              uniqueTradersList={uniqueTradersList}
+              filterStartDate={filterStartDate}
+              setFilterStartDate={setFilterStartDate}
+              filterEndDate={filterEndDate}
+              setFilterEndDate={setFilterEndDate}
+              runTraderBackfill={runTraderBackfill}
+              runRollupRebuild={runRollupRebuild}
+              runBulkImport={runBulkImport}
+              runBenchmark={runBenchmark}
+              loading={loading}
+            />
+
+            {/* FASE 1: PRE-MERCADO */}
+            <React.Profiler id="form:preMercado" onRender={onProfilerRender}>
+              <PreMarketSection onEvaluate={setModalContent} />
+            </React.Profiler>
+
+            {/* FASE 2: EJECUCIÓN */}
+            <React.Profiler id="form:ejecucion" onRender={onProfilerRender}>
+              <ExecutionSection />
+            </React.Profiler>
+
+            {/* FASE 3: ANÁLISIS INTEGRAL DE PÉRDIDAS */}
+            <React.Profiler id="form:perdidas" onRender={onProfilerRender}>
+              <LossAnalysisSection />
+            </React.Profiler>
+
+            {/* SECCIÓN 4: REPROGRAMACIÓN SUBCONSCIENTE POST-SESIÓN */}
+            <React.Profiler id="form:reprogramacion" onRender={onProfilerRender}>
+              <ReprogrammingSection />
+            </React.Profiler>
+
+            <SubmitBar message={message} loading={loading} />
+          </form>
+
+          {searchKey && !session.ready ? (
+            <AnalyticsSkeleton />
+          ) : (
+            <DeferredView fallback={<AnalyticsSkeleton />}>
+              <React.Profiler id="chart:evolucion" onRender={onProfilerRender}>
+                <EvolutionChart
+                  series={current.series}
+                  overlays={current.overlays}
+                  coverage={current.coverage}
+                  selectedOverlays={chartOverlays}
+                  onOverlaysChange={setChartOverlays}
+                  onWidthChange={setChartWidth}
+                />
+              </React.Profiler>
+
+              <React.Profiler id="analysis:atribucion" onRender={onProfilerRender}>
+                <AttributionPanel attribution={current.attribution} coverage={current.coverage} />
+              </React.Profiler>
+
+              <React.Profiler id="table:historial" onRender={onProfilerRender}>
+                <AuditHistoryTable
+                  audits={recentFirstAudits}
+                  coverage={current.coverage}
+                  onOpenDetail={setDetailAudit}
+                />
+              </React.Profiler>
+
+              <React.Profiler id="table:reprogramacion" onRender={onProfilerRender}>
+                <ReprogrammingHistoryTable audits={recentFirstAudits} onOpenDetail={setDetailAudit} />
+              </React.Profiler>
+
+              {/* MAPA DE CALOR: RENDIMIENTO TEMPORAL */}
+              <React.Profiler id="heatmap" onRender={onProfilerRender}>
+                <TemporalHeatmap heatmapData={heatmapData} coverage={current.coverage} filterActive={Boolean(filterStartDate || filterEndDate)} onConfigChange={changeHeatmapConfig} />
+              </React.Profiler>
+            </DeferredView>
+          )}
+
+          {isCoach && uniqueTradersList.length > 0 && (
+            <React.Profiler id="coach:cohorte" onRender={onProfilerRender}>
+              <CohortDashboard traders={uniqueTradersList} />
+            </React.Profiler>
+          )}
+
+          {isCoach && (
+            <NarrativeSearchPanel
+              traderKey={traderKey}
+              filterStartDate={filterStartDate}
+              filterEndDate={filterEndDate}
+              results={searchResults}
+              searching={searching}
+              partial={searchPartial}
+              onSearch={searchNarratives}
+            />
+          )}
+
+          {isCoach && <DiagnosticsPanel />}
         </div>
-      )}
-    </div>
+
+        {modalContent && <EvaluationModal content={modalContent} onClose={closeModal} />}
+        {detailAudit && <AuditDetailModal audit={detailAudit} onClose={closeDetail} />}
+      </div>
+    </FormStoreContext.Provider>
   );
 };
 
@@ -0,0 +1,54 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createAnalyticsCore, createTestHandler, flushHandler } from './load-core.mjs';
+
+const { DEFAULT_HEATMAP_CONFIG } = createAnalyticsCore();
+
+const sessions = (prefix, days) => days.map((fechaAuditoria, i) => ({
+  type: 'added',
+  id: `${prefix}${i}`,
+  data: { nombreTrader: 'Ana', fechaAuditoria, indiceCoherenciaIC: 50 + i, pnlDia: 10 }
+}));
+
+const view = (startDate, endDate) => ({ type: 'view', traderKey: 'ana', startDate, endDate, chartWidth: 0, rollupPeriod: null, overlays: [] });
+
+test('reset descarta los registros del rango anterior', async () => {
+  const { handle, messages } = createTestHandler();
+  handle({ type: 'select', traderKey: 'ana', config: DEFAULT_HEATMAP_CONFIG });
+  handle({ type: 'changes', traderKey: 'ana', changes: sessions('enero', ['2024-01-10', '2024-01-20']) });
+  handle(view('', ''));
+  await flushHandler();
+  assert.equal(messages.at(-1).rows.length, 2);
+
+  handle({ type: 'reset', traderKey: 'ana' });
+  handle({ type: 'changes', traderKey: 'ana', changes: sessions('marzo', ['2024-03-05']) });
+  await flushHandler();
+  const result = messages.at(-1);
+  assert.deepEqual(result.rows.map(row => row.id), ['marzo0']);
+  assert.equal(result.attribution.total, 1);
+  assert.equal(result.heatmap.config, DEFAULT_HEATMAP_CONFIG);
+});
+
+test('coverage marca los datos como parciales hasta completar el rango', async () => {
+  const { handle, messages } = createTestHandler();
+  handle({ type: 'select', traderKey: 'ana', config: DEFAULT_HEATMAP_CONFIG });
+  handle({ type: 'changes', traderKey: 'ana', changes: sessions('enero', ['2024-01-10', '2024-01-20']) });
+  handle(view('', ''));
+  await flushHandler();
+  assert.deepEqual(messages.at(-1).coverage, { loaded: 2, total: null, complete: false });
+  assert.equal(messages.at(-1).series.partial, true);
+
+  handle({ type: 'coverage', traderKey: 'ana', total: 3 });
+  await flushHandler();
+  assert.deepEqual(messages.at(-1).coverage, { loaded: 2, total: 3, complete: false });
+
+  handle({ type: 'changes', traderKey: 'ana', changes: sessions('febrero', ['2024-02-01']) });
+  handle({ type: 'coverage', traderKey: 'ana', complete: true });
+  await flushHandler();
+  assert.deepEqual(messages.at(-1).coverage, { loaded: 3, total: 3, complete: true });
+  assert.equal(messages.at(-1).series.partial, false);
+
+  handle({ type: 'reset', traderKey: 'ana' });
+  await flushHandler();
+  assert.equal(messages.at(-1).coverage.complete, false);
+});
@@ -0,0 +1,105 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createAnalyticsCore, createSeededRandom } from './load-core.mjs';
+
+const {
+  normalizeAudit, applyAuditChanges, createAttributionColumns, updateAttributionColumns, analyzeAttribution, planEfficiency,
+  formatDayKey, EMPTY_AUDIT_STORE
+} = createAnalyticsCore();
+
+const ESTADOS = ['🟢 Vagal Ventral (Calma Activa)', '🟡 Simpático (Lucha/Caza)', '🔴 Dorsal Vagal (Parálisis)'];
+const random = createSeededRandom(11);
+const store = applyAuditChanges(EMPTY_AUDIT_STORE, Array.from({ length: 2000 }, (_, i) => {
+  const ic = Math.floor(random() * 80 + 20);
+  const totales = Math.floor(random() * 6);
+  return {
+    type: 'added',
+    record: normalizeAudit(`s${i}`, {
+      nombreTrader: 'Ana',
+      fechaAuditoria: formatDayKey(new Date(2015, 0, 1 + Math.floor(i / 5))),
+      indiceCoherenciaIC: ic,
+      nivelPresencia: Math.floor(random() * 10) + 1,
+      energiaMetabolica: Math.floor(random() * 10) + 1,
+      pnlDia: Math.round((ic - 55) * 10 + (random() - 0.5) * 1500),
+      numEntradasTotales: totales,
+      numEntradasPlan: Math.floor(random() * (totales + 1)),
+      revisadoPlan: random() < 0.6 ? 'Sí' : (random() < 0.5 ? 'No' : ''),
+      ritualCoherencia: random() < 0.5 ? 'Sí' : 'No',
+      estadoSistemaNervioso: ESTADOS[Math.floor(random() * 3)],
+      respetoStopTP: random() < 0.3 ? undefined : Math.floor(random() * 10) + 1
+    })
+  };
+}));
+const list = store.byTrader.get('ana');
+
+const yesNo = (value) => (value === 'Sí' ? 1 : value === 'No' ? 0 : NaN);
+const VALUES = {
+  ic: audit => audit.ic,
+  energia: audit => audit.energia,
+  presencia: audit => audit.presencia,
+  revisadoPlan: audit => yesNo(audit.revisadoPlan),
+  ritualCoherencia: audit => yesNo(audit.ritualCoherencia),
+  pnl: audit => audit.pnl,
+  eficiencia: audit => planEfficiency(audit.entradasPlan, audit.entradasTotales),
+  respetoStopTP: audit => (audit.respetoStopTP === null ? NaN : audit.respetoStopTP)
+};
+
+// Pearson de dos pasadas sobre las filas con ambos valores
+const naivePearson = (rows, input, outcome) => {
+  const pairs = rows.map(audit => [VALUES[input](audit), VALUES[outcome](audit)]).filter(([x, y]) => !Number.isNaN(x) && !Number.isNaN(y));
+  const n = pairs.length;
+  const mx = pairs.reduce((total, [x]) => total + x, 0) / n;
+  const my = pairs.reduce((total, [, y]) => total + y, 0) / n;
+  let sxy = 0;
+  let sxx = 0;
+  let syy = 0;
+  pairs.forEach(([x, y]) => {
+    sxy += (x - mx) * (y - my);
+    sxx += (x - mx) ** 2;
+    syy += (y - my) ** 2;
+  });
+  return { r: sxy / Math.sqrt(sxx * syy), n };
+};
+
+test('las correlaciones coinciden con Pearson directo y usan solo filas con ambos valores', () => {
+  const columns = updateAttributionColumns(createAttributionColumns(), list);
+  [[0, list.length], [400, 1300]].forEach(([from, to]) => {
+    const { total, correlations } = analyzeAttribution(columns, from, to);
+    assert.equal(total, to - from);
+    correlations.forEach(({ input, outcome, r, n }) => {
+      const expected = naivePearson(list.slice(from, to), input, outcome);
+      assert.equal(n, expected.n);
+      assert.ok(Math.abs(r - expected.r) < 1e-9, `${input}/${outcome}`);
+    });
+  });
+});
+
+test('los grupos por factor cuentan y promedian sus sesiones', () => {
+  const { overall, factors } = analyzeAttribution(updateAttributionColumns(createAttributionColumns(), list), 0, list.length);
+  const plan = factors.find(({ factor }) => factor === 'revisadoPlan');
+  const si = list.filter(audit => audit.revisadoPlan === 'Sí');
+  assert.equal(plan.groups[1].count, si.length);
+  assert.ok(Math.abs(plan.groups[1].pnlMedio - si.reduce((total, audit) => total + audit.pnl, 0) / si.length) < 1e-9);
+
+  const nervous = factors.find(({ factor }) => factor === 'estadoSistemaNervioso');
+  assert.equal(nervous.groups[2].count, list.filter(audit => audit.estadoSistemaNervioso.includes('Dorsal')).length);
+
+  const ic = factors.find(({ factor }) => factor === 'ic');
+  assert.equal(ic.groups.reduce((total, group) => total + group.count, 0), list.length);
+  assert.ok(Math.abs(ic.groups.reduce((total, group) => total + group.exceso, 0)) < 1e-6);
+
+  const entradasPlan = list.reduce((total, audit) => total + audit.entradasPlan, 0);
+  const entradasTotales = list.reduce((total, audit) => total + audit.entradasTotales, 0);
+  assert.ok(Math.abs(overall.eficiencia - planEfficiency(entradasPlan, entradasTotales)) < 1e-9);
+});
+
+test('las columnas se actualizan desde la primera sesión distinta', () => {
+  const columns = updateAttributionColumns(createAttributionColumns(), list);
+  const next = applyAuditChanges(store, [
+    { type: 'added', record: normalizeAudit('nuevo', { nombreTrader: 'Ana', fechaAuditoria: '2099-01-01', indiceCoherenciaIC: 99, pnlDia: 5 }) }
+  ]).byTrader.get('ana');
+  updateAttributionColumns(columns, next);
+  assert.equal(columns.values.ic[list.length], 99);
+  assert.ok(Number.isNaN(columns.values.eficiencia[list.length]));
+  assert.deepEqual(analyzeAttribution(columns, 0, next.length), analyzeAttribution(updateAttributionColumns(createAttributionColumns(), next), 0, next.length));
+});
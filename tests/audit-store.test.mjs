@@ -0,0 +1,56 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createAnalyticsCore } from './load-core.mjs';
+
+const { normalizeAudit, applyAuditChanges, EMPTY_AUDIT_STORE } = createAnalyticsCore();
+
+const change = (type, id, data) => ({ type, record: normalizeAudit(id, { nombreTrader: 'Ana', ...data }) });
+const ids = (list) => list.map(audit => audit.id);
+
+test('applyAuditChanges mantiene la lista del trader ordenada por día', () => {
+  const store = applyAuditChanges(EMPTY_AUDIT_STORE, [
+    change('added', 'b', { fechaAuditoria: '2024-01-02' }),
+    change('added', 'c', { fechaAuditoria: '2024-01-03' }),
+    change('added', 'a', { fechaAuditoria: '2024-01-01' })
+  ]);
+  assert.deepEqual(ids(store.byTrader.get('ana')), ['a', 'b', 'c']);
+  assert.equal(store.byId.size, 3);
+});
+
+test('modified reubica el registro y removed lo borra', () => {
+  let store = applyAuditChanges(EMPTY_AUDIT_STORE, [
+    change('added', 'a', { fechaAuditoria: '2024-01-01' }),
+    change('added', 'b', { fechaAuditoria: '2024-01-02' })
+  ]);
+  store = applyAuditChanges(store, [change('modified', 'a', { fechaAuditoria: '2024-01-05' })]);
+  assert.deepEqual(ids(store.byTrader.get('ana')), ['b', 'a']);
+  store = applyAuditChanges(store, [change('removed', 'b', { fechaAuditoria: '2024-01-02' })]);
+  assert.deepEqual(ids(store.byTrader.get('ana')), ['a']);
+  assert.equal(store.byId.has('b'), false);
+});
+
+test('un added repetido equivale a modified', () => {
+  let store = applyAuditChanges(EMPTY_AUDIT_STORE, [change('added', 'a', { fechaAuditoria: '2024-01-01', indiceCoherenciaIC: 10 })]);
+  store = applyAuditChanges(store, [change('added', 'a', { fechaAuditoria: '2024-01-01', indiceCoherenciaIC: 20 })]);
+  assert.equal(store.byTrader.get('ana').length, 1);
+  assert.equal(store.byId.get('a').ic, 20);
+});
+
+test('un registro que cambia de trader sale de la lista anterior', () => {
+  let store = applyAuditChanges(EMPTY_AUDIT_STORE, [change('added', 'a', { fechaAuditoria: '2024-01-01' })]);
+  store = applyAuditChanges(store, [change('modified', 'a', { nombreTrader: 'Bea', fechaAuditoria: '2024-01-01' })]);
+  assert.equal(store.byTrader.has('ana'), false);
+  assert.deepEqual(ids(store.byTrader.get('bea')), ['a']);
+});
+
+test('solo se copia la lista del trader afectado', () => {
+  const before = applyAuditChanges(EMPTY_AUDIT_STORE, [
+    change('added', 'a', { fechaAuditoria: '2024-01-01' }),
+    change('added', 'b', { nombreTrader: 'Bea', fechaAuditoria: '2024-01-01' })
+  ]);
+  const after = applyAuditChanges(before, [change('added', 'c', { fechaAuditoria: '2024-01-02' })]);
+  assert.equal(after.byTrader.get('bea'), before.byTrader.get('bea'));
+  assert.notEqual(after.byTrader.get('ana'), before.byTrader.get('ana'));
+  assert.deepEqual(ids(before.byTrader.get('ana')), ['a']);
+  assert.equal(applyAuditChanges(after, []), after);
+});
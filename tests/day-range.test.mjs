@@ -0,0 +1,47 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createAnalyticsCore } from './load-core.mjs';
+
+const { toDayKey, lowerBound, selectDayRange, normalizeAudit, applyAuditChanges, EMPTY_AUDIT_STORE } = createAnalyticsCore();
+
+const listOf = (days) => {
+  const changes = days.map((fechaAuditoria, i) => ({
+    type: 'added',
+    record: normalizeAudit(`a${i}`, { nombreTrader: 'Ana', fechaAuditoria, createdAt: { seconds: 1000 + i } })
+  }));
+  return applyAuditChanges(EMPTY_AUDIT_STORE, changes).byTrader.get('ana');
+};
+
+test('toDayKey prefiere fechaAuditoria y acepta fechas locales antiguas', () => {
+  assert.equal(toDayKey({ fechaAuditoria: '2024-03-05', fechaLocal: '1/1/2020' }), '2024-03-05');
+  assert.equal(toDayKey({ fechaLocal: '5/3/2024' }), '2024-03-05');
+  assert.equal(toDayKey({ fechaLocal: '3/25/2024' }), '2024-03-25');
+  assert.equal(toDayKey({ fechaLocal: '2024/3/5' }), '2024-03-05');
+  assert.equal(toDayKey({}), '');
+});
+
+test('lowerBound devuelve la primera posición no menor', () => {
+  const list = [1, 3, 3, 5, 9];
+  const compare = (a, b) => a - b;
+  assert.equal(lowerBound(list, 0, compare), 0);
+  assert.equal(lowerBound(list, 3, compare), 1);
+  assert.equal(lowerBound(list, 4, compare), 3);
+  assert.equal(lowerBound(list, 10, compare), 5);
+  assert.equal(lowerBound([], 1, compare), 0);
+});
+
+test('selectDayRange es inclusivo en ambos extremos', () => {
+  const list = listOf(['2024-01-09', '2024-01-03', '2024-01-01', '2024-01-05', '2024-01-03']);
+  const days = (selected) => selected.map(audit => audit.dayKey);
+  assert.deepEqual(days(list), ['2024-01-01', '2024-01-03', '2024-01-03', '2024-01-05', '2024-01-09']);
+  assert.deepEqual(days(selectDayRange(list, '2024-01-03', '2024-01-05')), ['2024-01-03', '2024-01-03', '2024-01-05']);
+  assert.deepEqual(days(selectDayRange(list, '2024-01-04', '')), ['2024-01-05', '2024-01-09']);
+  assert.deepEqual(days(selectDayRange(list, '', '2024-01-02')), ['2024-01-01']);
+  assert.deepEqual(selectDayRange(list, '2024-02-01', '2024-03-01'), []);
+});
+
+test('selectDayRange devuelve la misma lista si el rango la cubre entera', () => {
+  const list = listOf(['2024-01-01', '2024-01-02']);
+  assert.equal(selectDayRange(list, '', ''), list);
+  assert.equal(selectDayRange(list, '2023-12-01', '2024-02-01'), list);
+});
@@ -0,0 +1,71 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createAnalyticsCore, createSeededRandom } from './load-core.mjs';
+
+const {
+  normalizeAudit, applyAuditChanges, setTraderHeatmapConfig, selectDayRange, queryTraderHeatmap, formatDayKey,
+  EMPTY_AUDIT_STORE, DEFAULT_HEATMAP_CONFIG
+} = createAnalyticsCore();
+
+const random = createSeededRandom(5);
+const changes = Array.from({ length: 400 }, (_, i) => {
+  const date = new Date(2023, 0, 1 + Math.floor(random() * 200));
+  return {
+    type: 'added',
+    record: normalizeAudit(`a${i}`, {
+      nombreTrader: 'Ana',
+      fechaAuditoria: formatDayKey(date),
+      horaInicioSesion: `${String(7 + Math.floor(random() * 11)).padStart(2, '0')}:${String(Math.floor(random() * 60)).padStart(2, '0')}`,
+      indiceCoherenciaIC: Math.floor(random() * 100),
+      pnlDia: Math.floor(random() * 400 - 200)
+    })
+  };
+});
+
+// Referencia directa: recorre las sesiones del rango con la definición de celda del formulario
+const bruteForce = (list, config) => {
+  const slots = Math.ceil((config.endMinute - config.startMinute) / config.bucketMinutes);
+  const cells = Array.from({ length: config.days.length * slots }, () => ({ ic: 0, pnl: 0, count: 0 }));
+  list.forEach(audit => {
+    const date = new Date(audit.sessionMs);
+    const day = config.days.indexOf(date.getDay());
+    const minute = date.getHours() * 60 + date.getMinutes();
+    if (day < 0 || minute < config.startMinute || minute >= config.endMinute) return;
+    const cell = cells[day * slots + Math.floor((minute - config.startMinute) / config.bucketMinutes)];
+    cell.ic += audit.ic;
+    cell.pnl += audit.pnl;
+    cell.count += 1;
+  });
+  return cells;
+};
+
+const assertMatches = (store, config, startDate, endDate) => {
+  const list = store.byTrader.get('ana');
+  const { cells } = queryTraderHeatmap(store.heatmaps.get('ana'), list, startDate, endDate);
+  const expected = bruteForce(selectDayRange(list, startDate, endDate), config);
+  assert.equal(cells.length, expected.length);
+  cells.forEach((cell, i) => {
+    assert.equal(cell.count, expected[i].count);
+    assert.ok(Math.abs(cell.totalIC - expected[i].ic) < 1e-9);
+    assert.ok(Math.abs(cell.totalPnL - expected[i].pnl) < 1e-9);
+  });
+};
+
+test('el agregado por bloques coincide con el recorrido directo en cualquier rango', () => {
+  const store = applyAuditChanges(EMPTY_AUDIT_STORE, changes);
+  [['', ''], ['2023-02-03', '2023-02-20'], ['2023-01-15', '2023-06-10'], ['2023-03-01', ''], ['', '2023-01-31']]
+    .forEach(([startDate, endDate]) => assertMatches(store, DEFAULT_HEATMAP_CONFIG, startDate, endDate));
+});
+
+test('las bajas restan su celda', () => {
+  let store = applyAuditChanges(EMPTY_AUDIT_STORE, changes);
+  store = applyAuditChanges(store, changes.slice(0, 150).map(({ record }) => ({ type: 'removed', record })));
+  assertMatches(store, DEFAULT_HEATMAP_CONFIG, '', '');
+});
+
+test('cambiar la rejilla recalcula el agregado del trader', () => {
+  const config = { timeZone: '', bucketMinutes: 30, days: [0, 1, 2, 3, 4, 5, 6], startMinute: 7 * 60, endMinute: 18 * 60 };
+  const store = setTraderHeatmapConfig(applyAuditChanges(EMPTY_AUDIT_STORE, changes), 'ana', config);
+  assertMatches(store, config, '', '');
+  assertMatches(store, config, '2023-02-10', '2023-05-01');
+});
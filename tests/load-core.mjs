@@ -0,0 +1,28 @@
+// Núcleo de análisis tal como lo serializa el worker: se extrae de streamlit_app.py y se evalúa aparte
+import { readFileSync } from 'node:fs';
+
+const source = readFileSync(new URL('../streamlit_app.py', import.meta.url), 'utf8');
+
+const extract = (name) => {
+  const start = source.indexOf(`const ${name} = (`);
+  const end = source.indexOf('\n};\n', start) + 3;
+  return new Function(`${source.slice(start, end)}\nreturn ${name};`)();
+};
+
+export const createAnalyticsCore = extract('createAnalyticsCore');
+
+// Manejador del worker con su núcleo; `messages` recoge lo que publica
+export const createTestHandler = () => {
+  const messages = [];
+  const handle = extract('createAnalyticsHandler')(createAnalyticsCore(), (message) => messages.push(message));
+  return { handle, messages };
+};
+
+// El manejador publica en un setTimeout(0) tras cada lote de mensajes
+export const flushHandler = () => new Promise(resolve => setTimeout(resolve, 5));
+
+// Generador con semilla para datos reproducibles
+export const createSeededRandom = (seed) => () => {
+  seed = (seed * 16807) % 2147483647;
+  return seed / 2147483647;
+};
@@ -0,0 +1,50 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createAnalyticsCore } from './load-core.mjs';
+
+const { normalizeAudit, dayNumberFromKey } = createAnalyticsCore();
+
+test('normalizeAudit parsea los campos numéricos una sola vez', () => {
+  const record = normalizeAudit('a1', {
+    nombreTrader: '  Ana Pérez ',
+    fechaAuditoria: '2024-03-05',
+    horaInicioSesion: '09:30',
+    indiceCoherenciaIC: '72',
+    energiaMetabolica: 6,
+    nivelPresencia: '',
+    pnlDia: '-125.5',
+    numEntradasTotales: '4',
+    numEntradasPlan: '3',
+    createdAt: { seconds: 1709630000, nanoseconds: 500000000 }
+  });
+  assert.equal(record.nombreTrader, 'Ana Pérez');
+  assert.equal(record.traderKey, 'ana pérez');
+  assert.equal(record.dayKey, '2024-03-05');
+  assert.equal(record.dayNumber, dayNumberFromKey('2024-03-05'));
+  assert.equal(record.ic, 72);
+  assert.equal(record.energia, 6);
+  assert.equal(record.presencia, 0);
+  assert.equal(record.pnl, -125.5);
+  assert.equal(record.eficiencia, 75);
+  assert.equal(record.createdMs, 1709630000500);
+  assert.ok(Object.isFrozen(record));
+});
+
+test('normalizeAudit resuelve la sesión desde fecha y hora del formulario', () => {
+  const record = normalizeAudit('a1', { nombreTrader: 'Ana', fechaAuditoria: '2024-03-05', horaInicioSesion: '09:30' });
+  assert.equal(record.sessionMs, new Date(2024, 2, 5, 9, 30).getTime());
+  assert.equal(record.sessionMinute, Math.floor(record.sessionMs / 60000));
+});
+
+test('normalizeAudit tolera registros antiguos sin fecha', () => {
+  const record = normalizeAudit('a1', { nombreTrader: 'Ana' });
+  assert.equal(record.dayKey, '');
+  assert.equal(record.dayNumber, null);
+  assert.equal(record.sessionMs, null);
+  assert.equal(record.eficiencia, 0);
+  assert.equal(record.respetoStopTP, null);
+});
+
+test('normalizeAudit usa la clave guardada del trader si existe', () => {
+  assert.equal(normalizeAudit('a1', { nombreTrader: 'ANA', nombreTraderKey: 'ana' }).traderKey, 'ana');
+});
@@ -0,0 +1,114 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createAnalyticsCore, createSeededRandom, createTestHandler, flushHandler } from './load-core.mjs';
+
+const {
+  normalizeAudit, applyAuditChanges, createRollingState, updateRollingState, rollingValueAt, rollingOverlayId, parseRollingOverlay,
+  buildRollingOverlays, ROLLING_METRICS, ROLLING_WINDOWS, ROLLING_LOOKBACK, formatDayKey, EMPTY_AUDIT_STORE, DEFAULT_HEATMAP_CONFIG
+} = createAnalyticsCore();
+
+const random = createSeededRandom(7);
+const sessionData = (i) => ({
+  nombreTrader: 'Ana',
+  fechaAuditoria: formatDayKey(new Date(2021, 0, 1 + Math.floor(i * 1.3))),
+  indiceCoherenciaIC: Math.floor(random() * 100),
+  nivelPresencia: Math.floor(random() * 10),
+  energiaMetabolica: Math.floor(random() * 10),
+  pnlDia: Math.floor(random() * 2000 - 1000),
+  numEntradasTotales: 5,
+  numEntradasPlan: Math.floor(random() * 6)
+});
+// Datos de Firestore equivalentes a un registro ya normalizado
+const sessionDataOf = (audit) => ({
+  nombreTrader: 'Ana',
+  fechaAuditoria: audit.dayKey,
+  indiceCoherenciaIC: audit.ic,
+  nivelPresencia: audit.presencia,
+  energiaMetabolica: audit.energia,
+  pnlDia: audit.pnl,
+  numEntradasTotales: audit.entradasTotales,
+  numEntradasPlan: audit.entradasPlan
+});
+const store = applyAuditChanges(EMPTY_AUDIT_STORE, Array.from({ length: 400 }, (_, i) => ({ type: 'added', record: normalizeAudit(`s${i}`, sessionData(i)) })));
+const list = store.byTrader.get('ana');
+
+// Referencia directa sobre la ventana que termina en la sesión i
+const expected = (metric, stat, window, i) => {
+  if (i + 1 < window) return NaN;
+  const values = list.slice(i + 1 - window, i + 1).map(audit => audit[metric]);
+  const mean = values.reduce((total, value) => total + value, 0) / window;
+  if (stat === 'media') return mean;
+  if (stat === 'desviacion') return Math.sqrt(values.reduce((total, value) => total + (value - mean) ** 2, 0) / window);
+  let ewma = list.slice(0, window).reduce((total, audit) => total + audit[metric], 0) / window;
+  for (let k = window; k <= i; k++) ewma += (2 / (window + 1)) * (list[k][metric] - ewma);
+  return ewma;
+};
+
+const assertClose = (actual, wanted) => {
+  if (Number.isNaN(wanted)) assert.ok(Number.isNaN(actual));
+  else assert.ok(Math.abs(actual - wanted) < 1e-6, `${actual} != ${wanted}`);
+};
+
+test('media, desviación y EWMA coinciden con el cálculo directo', () => {
+  const state = updateRollingState(createRollingState(), list);
+  ROLLING_METRICS.forEach(metric => ROLLING_WINDOWS.forEach(window => {
+    [0, 5, 6, 29, 89, 250, 399].forEach(i => {
+      ['media', 'desviacion', 'ewma'].forEach(stat => assertClose(rollingValueAt(state, { metric, stat, window }, i), expected(metric, stat, window, i)));
+    });
+  }));
+});
+
+test('sin N sesiones no hay valor', () => {
+  const state = updateRollingState(createRollingState(), list);
+  assert.ok(Number.isNaN(rollingValueAt(state, { metric: 'ic', stat: 'media', window: 7 }, 5)));
+  assert.ok(Number.isNaN(rollingValueAt(state, { metric: 'ic', stat: 'media', window: 7 }, list.length)));
+});
+
+test('la actualización incremental equivale a recalcular desde cero', () => {
+  const state = updateRollingState(createRollingState(), list);
+  const next = applyAuditChanges(store, [
+    { type: 'added', record: normalizeAudit('medio', { ...sessionData(200), indiceCoherenciaIC: 77 }) },
+    { type: 'added', record: normalizeAudit('final', { ...sessionData(400), fechaAuditoria: '2030-01-01' }) }
+  ]).byTrader.get('ana');
+  updateRollingState(state, next);
+  const fresh = updateRollingState(createRollingState(), next);
+  for (let i = 0; i < next.length; i++) {
+    ROLLING_METRICS.forEach(metric => {
+      const overlay = { metric, stat: 'desviacion', window: 30 };
+      assertClose(rollingValueAt(state, overlay, i), rollingValueAt(fresh, overlay, i));
+    });
+  }
+});
+
+test('los ids de superposición son reversibles', () => {
+  assert.equal(rollingOverlayId('pnl', 'ewma', 30), 'pnl:ewma:30');
+  assert.deepEqual(parseRollingOverlay('pnl:ewma:30'), { metric: 'pnl', stat: 'ewma', window: 30 });
+});
+
+test('las ventanas sin historial suficiente no se dibujan', () => {
+  const state = updateRollingState(createRollingState(), list);
+  const overlays = buildRollingOverlays(state, ['ic:media:7', 'ic:ewma:90'], Int32Array.from([-1, 50, 120]));
+  assert.deepEqual(overlays.keys, ['ic:media:7']);
+  assert.deepEqual(overlays.incomplete, ['ic:ewma:90']);
+  assert.ok(Number.isNaN(overlays.values[0][0]));
+  assertClose(overlays.values[0][2], expected('ic', 'media', 7, 120));
+});
+
+test('las superposiciones esperan a que el rango y su historial previo estén completos', async () => {
+  const { handle, messages } = createTestHandler();
+  const changes = (from, to) => list.slice(from, to).map(audit => ({ type: 'added', id: audit.id, data: sessionDataOf(audit) }));
+  const startDate = list[200].dayKey;
+  handle({ type: 'select', traderKey: 'ana', config: DEFAULT_HEATMAP_CONFIG });
+  handle({ type: 'changes', traderKey: 'ana', changes: changes(200, 400) });
+  handle({ type: 'view', traderKey: 'ana', startDate, endDate: '', chartWidth: 0, rollupPeriod: null, overlays: ['ic:media:90'] });
+  await flushHandler();
+  assert.equal(messages.at(-1).overlays.pending, true);
+
+  handle({ type: 'changes', traderKey: 'ana', changes: changes(200 - ROLLING_LOOKBACK, 200) });
+  handle({ type: 'coverage', traderKey: 'ana', complete: true });
+  await flushHandler();
+  const { overlays, rows } = messages.at(-1);
+  assert.equal(rows.length, 200);
+  assert.deepEqual(overlays.keys, ['ic:media:90']);
+  assert.ok(overlays.values[0].every(value => !Number.isNaN(value)));
+});
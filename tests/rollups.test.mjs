@@ -0,0 +1,104 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createAnalyticsCore, createSeededRandom } from './load-core.mjs';
+
+const {
+  normalizeAudit, applyAuditChanges, accumulateRollups, buildRollupSeriesView, buildSeriesView, selectDayRange,
+  seriesSessionIndices, cohortDaysOf, cohortStatsOf, cohortFromKey, COHORT_WINDOW_DAYS, planEfficiency, formatDayKey, EMPTY_AUDIT_STORE
+} = createAnalyticsCore();
+
+const random = createSeededRandom(3);
+const list = applyAuditChanges(EMPTY_AUDIT_STORE, Array.from({ length: 1500 }, (_, i) => ({
+  type: 'added',
+  record: normalizeAudit(`a${i}`, {
+    nombreTrader: 'Ana',
+    fechaAuditoria: formatDayKey(new Date(2020, 0, 1 + Math.floor(random() * 1500))),
+    indiceCoherenciaIC: Math.floor(random() * 100),
+    nivelPresencia: Math.floor(random() * 10),
+    energiaMetabolica: Math.floor(random() * 10),
+    pnlDia: Math.floor(random() * 200 - 100),
+    revisadoPlan: random() < 0.5 ? 'Sí' : 'No',
+    numEntradasTotales: Math.floor(random() * 4),
+    numEntradasPlan: 1
+  })
+}))).byTrader.get('ana');
+
+const rollups = new Map();
+list.forEach(audit => accumulateRollups(rollups, audit));
+const ofPeriod = (period) => [...rollups.values()].filter(rollup => rollup.periodo === period);
+
+test('planEfficiency no inventa eficiencia sin entradas', () => {
+  assert.equal(planEfficiency(3, 4), 75);
+  assert.ok(Number.isNaN(planEfficiency(0, 0)));
+});
+
+test('cada periodo suma todas las sesiones una vez', () => {
+  ['day', 'week', 'month'].forEach(period => {
+    const group = ofPeriod(period);
+    assert.equal(group.reduce((total, rollup) => total + rollup.count, 0), list.length);
+    assert.equal(group.reduce((total, rollup) => total + rollup.pnl.suma, 0), list.reduce((total, audit) => total + audit.pnl, 0));
+  });
+});
+
+test('recuentos, extremos y entradas de un mes coinciden con sus sesiones', () => {
+  const month = ofPeriod('month').find(rollup => rollup.clave === '2021-03');
+  const sessions = list.filter(audit => audit.dayKey.startsWith('2021-03'));
+  assert.equal(month.inicio, '2021-03-01');
+  assert.equal(month.count, sessions.length);
+  assert.equal(month.planSi, sessions.filter(audit => audit.revisadoPlan === 'Sí').length);
+  assert.equal(month.ic.min, Math.min(...sessions.map(audit => audit.ic)));
+  assert.equal(month.ic.max, Math.max(...sessions.map(audit => audit.ic)));
+  assert.equal(month.entradasTotales, sessions.reduce((total, audit) => total + audit.entradasTotales, 0));
+  assert.equal(month.entradasPlan, sessions.length);
+});
+
+test('la serie desde agregados coincide con la serie desde auditorías', () => {
+  const fromAudits = buildSeriesView(list, '2019-12-01', '2024-12-31', 0);
+  const fromRollups = buildRollupSeriesView(ofPeriod('month'), 'month', '2019-12-01', '2024-12-31', 0);
+  assert.equal(fromAudits.granularity, 'month');
+  assert.deepEqual(fromRollups.labels, fromAudits.labels);
+  assert.deepEqual(Array.from(fromRollups.ic), Array.from(fromAudits.ic));
+  assert.deepEqual(Array.from(fromRollups.presencia), Array.from(fromAudits.presencia));
+
+  // Los agregados cubren periodos completos: el rango semanal acaba en domingo
+  const weeks = selectDayRange(list, '2020-01-06', '2022-07-03');
+  const weeklyAudits = buildSeriesView(weeks, '2020-01-06', '2022-07-03', 0);
+  const weeklyRollups = buildRollupSeriesView(ofPeriod('week'), 'week', '2020-01-06', '2022-07-03', 0);
+  assert.equal(weeklyAudits.granularity, 'week');
+  assert.deepEqual(weeklyRollups.labels, weeklyAudits.labels);
+  assert.deepEqual(Array.from(weeklyRollups.energia), Array.from(weeklyAudits.energia));
+});
+
+test('entre 91 y 365 días la serie sale de los agregados diarios', () => {
+  const days = selectDayRange(list, '2021-01-01', '2021-09-30');
+  const dailyAudits = buildSeriesView(days, '2021-01-01', '2021-09-30', 0);
+  const dailyRollups = buildRollupSeriesView(ofPeriod('day'), 'day', '2021-01-01', '2021-09-30', 0);
+  assert.equal(dailyAudits.granularity, 'day');
+  assert.equal(dailyRollups.granularity, 'day');
+  assert.deepEqual(dailyRollups.labels, dailyAudits.labels);
+  assert.deepEqual(Array.from(dailyRollups.ic), Array.from(dailyAudits.ic));
+
+  // Cada punto diario apunta a la última sesión de su día en la lista completa
+  const indices = seriesSessionIndices(list, days, { granularity: 'day', labels: dailyRollups.labels, ends: dailyRollups.labels.map(() => -1) });
+  dailyRollups.labels.forEach((label, i) => {
+    assert.equal(list[indices[i]].dayKey, label);
+    assert.ok(indices[i] + 1 === list.length || list[indices[i] + 1].dayKey > label);
+  });
+});
+
+test('la cohorte suma los agregados diarios de la ventana', () => {
+  const fromKey = '2023-11-01';
+  const cohorte = cohortDaysOf(rollups, fromKey).get('ana');
+  const sessions = list.filter(audit => audit.dayKey >= fromKey);
+  assert.ok(Object.keys(cohorte).every(day => day >= fromKey));
+  assert.deepEqual(cohortStatsOf(cohorte, fromKey), {
+    sesiones: sessions.length,
+    pnl: sessions.reduce((total, audit) => total + audit.pnl, 0),
+    planSi: sessions.filter(audit => audit.revisadoPlan === 'Sí').length,
+    dorsalSi: 0
+  });
+  // Días ya fuera de la ventana que aún no se han podado del directorio no cuentan
+  const later = '2023-12-01';
+  assert.equal(cohortStatsOf(cohorte, later).sesiones, sessions.filter(audit => audit.dayKey >= later).length);
+  assert.equal(cohortFromKey(new Date(2024, 0, 30, 12).getTime()), formatDayKey(new Date(2024, 0, 31 - COHORT_WINDOW_DAYS)));
+});
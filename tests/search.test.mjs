@@ -0,0 +1,96 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createAnalyticsCore } from './load-core.mjs';
+
+const {
+  tokenizeSearchText, searchTermsOf, createSearchIndex, indexSearchRecord, searchAuditIndex, removeSearchTraders, trimSearchIndex, normalizeAudit
+} = createAnalyticsCore();
+
+const audit = (id, detallesSesion, data = {}) => normalizeAudit(id, { nombreTrader: 'Ana', fechaAuditoria: '2024-01-10', detallesSesion, ...data });
+
+const indexOf = (records) => {
+  const index = createSearchIndex();
+  records.forEach(record => indexSearchRecord(index, record));
+  return index;
+};
+
+test('tokenizeSearchText pliega acentos, quita vacías y reduce variantes a la misma raíz', () => {
+  assert.deepEqual(tokenizeSearchText('Miedo y MIEDOS'), ['mied', 'mied']);
+  assert.equal(tokenizeSearchText('operación')[0], tokenizeSearchText('operaciones')[0]);
+  assert.equal(tokenizeSearchText('ansiedad')[0], tokenizeSearchText('ansiedades')[0]);
+  assert.deepEqual(tokenizeSearchText('de la que por'), []);
+});
+
+test('searchTermsOf devuelve términos únicos de los campos de narrativa', () => {
+  const terms = searchTermsOf({ detallesSesion: 'Miedo y más miedo', compromisoManana: 'Respetar el stop', pnlDia: 'miedo' });
+  assert.equal(new Set(terms).size, terms.length);
+  assert.ok(terms.includes('mied'));
+  assert.ok(terms.includes('stop'));
+});
+
+test('primero las auditorías con más términos de la consulta', () => {
+  const index = indexOf([
+    audit('a', 'Entré por venganza después del stop'),
+    audit('b', 'Venganza y miedo en la apertura'),
+    audit('c', 'Sesión tranquila, respeté el plan')
+  ]);
+  const { total, hits } = searchAuditIndex(index, { query: 'venganza miedo' });
+  assert.equal(total, 2);
+  assert.deepEqual(hits.map(hit => hit.id), ['b', 'a']);
+  assert.equal(hits[0].matched, 2);
+  assert.equal(hits[0].snippet.field, 'detallesSesion');
+});
+
+test('a igualdad de términos gana el documento más corto (BM25)', () => {
+  const index = indexOf([
+    audit('largo', 'Venganza tras una mañana larga con muchas dudas sobre el tamaño de la posición'),
+    audit('corto', 'Venganza otra vez')
+  ]);
+  assert.deepEqual(searchAuditIndex(index, { query: 'venganza' }).hits.map(hit => hit.id), ['corto', 'largo']);
+});
+
+test('filtra por trader y por rango de fechas', () => {
+  const index = indexOf([
+    audit('a', 'miedo', { fechaAuditoria: '2024-01-01' }),
+    audit('b', 'miedo', { fechaAuditoria: '2024-02-01' }),
+    audit('c', 'miedo', { nombreTrader: 'Bea', fechaAuditoria: '2024-02-01' })
+  ]);
+  assert.deepEqual(searchAuditIndex(index, { query: 'miedo', traderKey: 'ana' }).hits.map(hit => hit.id).sort(), ['a', 'b']);
+  assert.deepEqual(searchAuditIndex(index, { query: 'miedo', startDate: '2024-01-15', endDate: '2024-03-01' }).hits.map(hit => hit.id).sort(), ['b', 'c']);
+});
+
+test('reindexar un registro retira sus términos anteriores', () => {
+  const index = indexOf([audit('a', 'palabrarara'), audit('b', 'otra cosa')]);
+  indexSearchRecord(index, audit('a', 'texto nuevo'));
+  assert.equal(searchAuditIndex(index, { query: 'palabrarara' }).total, 0);
+  assert.equal(searchAuditIndex(index, { query: 'nuevo' }).total, 1);
+  assert.equal(index.docCount, 2);
+});
+
+test('limit acota los resultados pero no el total', () => {
+  const index = indexOf(Array.from({ length: 20 }, (_, i) => audit(`a${i}`, `miedo ${'x'.repeat(i + 1)}`)));
+  const { total, hits } = searchAuditIndex(index, { query: 'miedo', limit: 5 });
+  assert.equal(total, 20);
+  assert.equal(hits.length, 5);
+});
+
+test('los candidatos de un trader desalojado salen del índice', () => {
+  const index = indexOf([
+    audit('a', 'Venganza tras el stop'),
+    audit('b', 'Venganza en la apertura', { nombreTrader: 'Luis' })
+  ]);
+  const before = index.bytes;
+  removeSearchTraders(index, new Set(['ana']));
+  assert.deepEqual(searchAuditIndex(index, { query: 'venganza' }).hits.map(hit => hit.id), ['b']);
+  assert.ok(index.bytes > 0 && index.bytes < before);
+  assert.equal(index.postings.get(tokenizeSearchText('stop')[0]), undefined);
+});
+
+test('el índice se recorta por orden de llegada hasta el presupuesto', () => {
+  const index = indexOf(['a', 'b', 'c', 'd'].map(id => audit(id, `Miedo en la sesión ${id}`)));
+  const perRecord = index.bytes / 4;
+  assert.equal(trimSearchIndex(index, index.bytes), 0);
+  assert.equal(trimSearchIndex(index, perRecord * 2.5), 2);
+  assert.deepEqual(searchAuditIndex(index, { query: 'miedo' }).hits.map(hit => hit.id).sort(), ['c', 'd']);
+  assert.equal(index.docCount, 2);
+});
@@ -0,0 +1,59 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { createAnalyticsCore } from './load-core.mjs';
+
+const { normalizeAudit, applyAuditChanges, buildSeriesView, formatDayKey, EMPTY_AUDIT_STORE } = createAnalyticsCore();
+
+// Una sesión diaria desde 2020-01-01 con un pico aislado en la sesión 777
+const list = applyAuditChanges(EMPTY_AUDIT_STORE, Array.from({ length: 2000 }, (_, i) => ({
+  type: 'added',
+  record: normalizeAudit(`a${i}`, {
+    nombreTrader: 'Ana',
+    fechaAuditoria: formatDayKey(new Date(2020, 0, 1 + i)),
+    indiceCoherenciaIC: i === 777 ? 100 : 50 + Math.round(20 * Math.sin(i / 30)),
+    nivelPresencia: 5,
+    energiaMetabolica: i % 10
+  })
+}))).byTrader.get('ana');
+
+test('la granularidad pasa de sesiones a medias diarias, semanales y mensuales según el rango', () => {
+  const granularity = (endDate) => buildSeriesView(list, '2021-01-01', endDate, 0).granularity;
+  assert.equal(granularity('2021-03-31'), 'exact');
+  assert.equal(granularity('2021-04-01'), 'day');
+  assert.equal(granularity('2022-01-01'), 'week');
+  assert.equal(granularity('2024-01-01'), 'month');
+});
+
+test('la serie semanal agrupa por lunes y promedia', () => {
+  const view = buildSeriesView(list.slice(0, 700), '', '', 0);
+  assert.equal(view.granularity, 'week');
+  assert.equal(view.labels[0], '2019-12-30');
+  assert.equal(view.labels[1], '2020-01-06');
+  assert.equal(view.presencia[0], 5);
+  assert.equal(view.total, view.labels.length);
+});
+
+test('la serie mensual usa claves YYYY-MM', () => {
+  const view = buildSeriesView(list, '', '', 0);
+  assert.equal(view.granularity, 'month');
+  assert.equal(view.labels[0], '2020-01');
+  assert.equal(view.ic.length, view.labels.length);
+});
+
+test('LTTB reduce al ancho y conserva extremos y picos', () => {
+  const exact = buildSeriesView(list.slice(700, 790), '', '', 0);
+  assert.equal(exact.granularity, 'exact');
+  const reduced = buildSeriesView(list.slice(700, 790), '', '', 120);
+  assert.equal(reduced.labels.length, 30);
+  assert.equal(reduced.total, 90);
+  assert.equal(reduced.labels[0], exact.labels[0]);
+  assert.equal(reduced.labels[29], exact.labels[89]);
+  assert.ok(reduced.labels.includes(list[777].dayKey));
+  assert.equal(Math.max(...reduced.ic), 100);
+});
+
+test('sin ancho no se reduce la serie', () => {
+  const view = buildSeriesView(list.slice(0, 60), '', '', 0);
+  assert.equal(view.labels.length, 60);
+  assert.deepEqual(Array.from(view.ends.slice(0, 3)), [0, 1, 2]);
+});